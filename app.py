@@ -1,4 +1,5 @@
-from flask import Flask, render_template, jsonify, request, session
+from flask import Flask, render_template, jsonify, request, session, Response
+import json
 from legal_scraper import LegalScraper
 import logging
 import uuid
@@ -9,10 +10,12 @@ import os
 import tempfile
 from flask_cors import CORS
 from scraper_store import scrapers, scrapers_lock
-from database import DatabaseManager
+from extraction_jobs import ExtractionJob, JobConflictError, submit_job, get_job, get_active_job
+from database import DatabaseManager, get_pool_status
 import atexit
 from fraudeCheck.routes import fraude_bp
-from config import DEBUG_ENABLED, CustomFilter, get_logger
+from fraudeCheck.fraud_recertification import FraudRecertificationService, RecertificationInProgressError
+from config import DEBUG_ENABLED, CustomFilter, get_logger, RECERTIFY_AFTER_EXTRACTION
 from werkzeug.serving import WSGIRequestHandler
 
 # Configurar logging - usar o logger do config.py
@@ -57,7 +60,7 @@ Session(app)
 session_checker_thread = None
 session_checker_running = True
 
-# Inicializa o gerenciador de banco de dados
+# Inicializa o gerenciador de banco de dados (cria o engine compartilhado e verifica o schema)
 db_manager = DatabaseManager()
 
 def check_sessions():
@@ -68,13 +71,19 @@ def check_sessions():
             sessions_to_remove = []
             
             for user_id, scraper_data in scrapers.items():
+                # Job de extração em andamento: o navegador e o pool estão em uso pela thread do
+                # job (mesmo com a aba fechada) e não podem ser fechados nem consultados aqui
+                if get_active_job(user_id) is not None:
+                    scraper_data['last_activity'] = current_time
+                    continue
+
                 # Se a última atividade foi há mais de 30 minutos
                 if (current_time - scraper_data['last_activity']) > timedelta(minutes=30):
                     try:
                         logger.info(f"Removendo sessão inativa {user_id}")
                         scraper = scraper_data['scraper']
-                        if hasattr(scraper, 'driver'):
-                            scraper.driver.quit()
+                        # Fecha o navegador principal e os do pool de extração
+                        scraper.close()
                         sessions_to_remove.append(user_id)
                     except Exception as e:
                         logger.error(f"Erro ao limpar sessão {user_id}: {str(e)}")
@@ -190,8 +199,110 @@ def initialize():
             'message': f'Erro durante a inicialização: {str(e)}'
         }), 500
 
+def format_process_result(process_id, process_data):
+    """Formata os dados de um processo extraído para a resposta da API"""
+    acordo_details = []
+    if process_data.get('detalhes_acordo'):
+        acordo = process_data.get('detalhes_acordo', [])
+        acordo_details = [{
+            'id':process_id,
+            'valor': acordo.get('valor', ''),
+            'status': acordo.get('status', ''),
+            'data_pagamento': acordo.get('data_pagamento', ''),
+            'nome_titular': acordo.get('nome_titular', ''),
+            'cpf_titular': acordo.get('cpf_titular', ''),
+            'cpf_cnpj_titular': acordo.get('cpf_cnpj_titular', ''),
+            'is_acordo': acordo.get('is_acordo', False),
+            'suspeita_fraude': acordo.get('suspeita_fraude', False),
+            'motivo_suspeita': acordo.get('motivo_suspeita', ''),
+            'documentos': acordo.get('documentos', []),
+            'historico': acordo.get('historico', [])
+        }]
+
+    return {
+        'processo': {
+            'id': process_id,
+            'numero': process_data.get('processo').get('numero'),
+            'escritorio': process_data['processo'].get('escritorio_celula', ''),
+            'comarca': process_data['processo'].get('comarca', ''),
+            'estado': process_data['processo'].get('estado', ''),
+            'status': process_data['processo'].get('status', ''),
+            'fase': process_data['processo'].get('fase', '')
+        },
+        'partes': process_data.get('partes', {}),
+        'acordo': acordo_details
+    }
+
+def run_extraction_job(job, scraper):
+    """Executa a extração de um job (em thread própria, fora do contexto da requisição)"""
+    data = job.params
+    process_numbers = data.get('process_numbers', [])
+    data_inicial = data.get('data_inicial', '')
+    data_final = data.get('data_final', '')
+    status = data.get('status', 'Todos')
+    acordo = data.get('acordo', 'Todos')
+    suspeita_fraude = data.get('suspeita_fraude', 'Todos')
+    acordo_filter = None if acordo == 'Todos' else acordo
+    suspeita_fraude_filter = None if suspeita_fraude == 'Todos' else suspeita_fraude
+
+    # Cada processo concluído que passa nos filtros entra nos resultados parciais do job
+    def result_handler(process_id, process_data):
+        if not LegalScraper.matches_result_filters(process_data, acordo_filter, suspeita_fraude_filter):
+            return None
+        return format_process_result(process_id, process_data)
+    job.result_handler = result_handler
+
+    # Se não houver números de processo, faz uma busca geral
+    if not process_numbers:
+        process_numbers = ['']
+    job.searches_total = len(process_numbers)
+
+    # Realiza a extração
+    for process_number in process_numbers:
+        if job.cancelled:
+            break
+        job.begin_search()
+        try:
+            logger.debug(f"Iniciando busca do processo {process_number}")
+            results = scraper.search_processes(
+                process_number=process_number,
+                start_date=data_inicial if data_inicial else None,
+                end_date=data_final if data_final else None,
+                status='-1' if status == 'Todos' else status,
+                acordo=acordo_filter,
+                suspeita_fraude=suspeita_fraude_filter,
+                progress=job,
+                keep_results=False  # Os resultados são entregues ao job à medida que ficam prontos
+            )
+
+            job.searches_done += 1
+            logger.debug(f"Processo {process_number} extraído com sucesso")
+            logger.debug(f"Resultados encontrados: {job.results_total}")
+
+        except Exception as e:
+            logger.error(f"Erro ao extrair processo {process_number}: {str(e)}")
+            raise Exception(f'Erro ao extrair processo {process_number}: {str(e)}')
+
+        # Mantém a sessão ativa enquanto o job estiver rodando
+        with scrapers_lock:
+            if job.user_id in scrapers:
+                scrapers[job.user_id]['last_activity'] = datetime.now()
+
+    # Reavalia apenas os acordos cujas entradas mudaram com esta extração
+    if RECERTIFY_AFTER_EXTRACTION and not job.cancelled:
+        job.message = "Recertificando avaliações de fraude"
+        try:
+            stats = FraudRecertificationService().recertify_fraud_assessments(incremental=True)
+            logger.info(f"Recertificação incremental após o job {job.id}: {stats}")
+        except RecertificationInProgressError:
+            logger.info(f"Recertificação após o job {job.id} ignorada: já existe uma em andamento")
+        except Exception as e:
+            logger.error(f"Erro na recertificação após o job {job.id}: {str(e)}")
+            job.errors.append(f"Recertificação: {str(e)}")
+
 @app.route('/api/extract', methods=['POST'])
 def extract():
+    """Submete uma extração como job em segundo plano e retorna o seu ID"""
     try:
         logger.debug(f"Recebida requisição de extração. Session ID: {session.get('user_id')}")
         logger.debug(f"Dados da requisição: {request.json}")
@@ -221,108 +332,31 @@ def extract():
             scrapers[user_id]['last_activity'] = datetime.now()
             scraper = scrapers[user_id]['scraper']
             logger.debug(f"Scraper encontrado para sessão {user_id}")
+
+        # O navegador da sessão só pode executar uma extração por vez: a verificação e o
+        # registro do job são atômicos em submit_job
+        try:
+            job = submit_job(
+                ExtractionJob(user_id, request.json or {}),
+                lambda job: run_extraction_job(job, scraper)
+            )
+        except JobConflictError as e:
+            return jsonify({
+                'status': 'error',
+                'message': 'Uma extração já está em andamento',
+                'job_id': e.job.id
+            }), 409
         
         # Limpa os dados anteriores
-        all_results = []
         session['process_details'] = {}
         session['grid_data'] = []
         logger.debug("Dados anteriores limpos com sucesso")
-        
-        # Extrai os dados da requisição
-        data = request.json
-        process_numbers = data.get('process_numbers', [])
-        data_inicial = data.get('data_inicial', '')
-        data_final = data.get('data_final', '')
-        status = data.get('status', 'Todos')
-        acordo = data.get('acordo', 'Todos')
-        suspeita_fraude = data.get('suspeita_fraude', 'Todos')
-        
-        # Se não houver números de processo, faz uma busca geral
-        if not process_numbers:
-            process_numbers = ['']
-        
-        # Realiza a extração
-        for process_number in process_numbers:
-            try:
-                logger.debug(f"Iniciando busca do processo {process_number}")
-                results = scraper.search_processes(
-                    process_number=process_number,
-                    start_date=data_inicial if data_inicial else None,
-                    end_date=data_final if data_final else None,
-                    status='-1' if status == 'Todos' else status,
-                    acordo=None if acordo == 'Todos' else acordo,
-                    suspeita_fraude=None if suspeita_fraude == 'Todos' else suspeita_fraude
-                )
-                
-                # Debug dos resultados
-                logger.debug(f"Resultado bruto da busca: {results}")
-                
-                # Se a busca retornou resultados, processa e formata
-                if results:
-                    if isinstance(results, dict):
-                        # Salva grid_data na sessão
-                        if 'grid_data' in results:
-                            session['grid_data'] = results['grid_data']
-                        
-                        # Converte resultado único em lista
-                        results = [results]
-                    
-                    # Processa cada resultado
-                    for result in results:
-                        if 'raw_data' in result:
-                            for process_id, process_data in result['raw_data'].items():
-
-                                acordo_details = []
-                                if process_data.get('detalhes_acordo'):
-                                    acordo = process_data.get('detalhes_acordo', [])
-                                    acordo_details = [{
-                                        'id':process_id,
-                                        'valor': acordo.get('valor', ''),
-                                        'status': acordo.get('status', ''),
-                                        'data_pagamento': acordo.get('data_pagamento', ''),
-                                        'nome_titular': acordo.get('nome_titular', ''),
-                                        'cpf_titular': acordo.get('cpf_titular', ''),
-                                        'cpf_cnpj_titular': acordo.get('cpf_cnpj_titular', ''),
-                                        'is_acordo': acordo.get('is_acordo', False),
-                                        'suspeita_fraude': acordo.get('suspeita_fraude', False),
-                                        'documentos': acordo.get('documentos', []),
-                                        'historico': acordo.get('historico', [])
-                                    }]
-
-                                formatted_result = {
-                                    'processo': {
-                                        'id': process_id,
-                                        'numero': process_data.get('processo').get('numero'),
-                                        'escritorio': process_data['processo'].get('escritorio_celula', ''),
-                                        'comarca': process_data['processo'].get('comarca', ''),
-                                        'estado': process_data['processo'].get('estado', ''),
-                                        'status': process_data['processo'].get('status', ''),
-                                        'fase': process_data['processo'].get('fase', '')
-                                    },
-                                    'partes': process_data.get('partes', {}),
-                                    'acordo': acordo_details
-                                }
-                                all_results.append(formatted_result)
-                        else:
-                            all_results.append(result)
-                        
-                logger.debug(f"Processo {process_number} extraído com sucesso")
-                logger.debug(f"Resultados encontrados: {len(all_results)}")
-                
-            except Exception as e:
-                logger.error(f"Erro ao extrair processo {process_number}: {str(e)}")
-                return jsonify({
-                    'status': 'error',
-                    'message': f'Erro ao extrair processo {process_number}: {str(e)}'
-                }), 500
-        
-        # Debug da resposta final
-        response_data = {
-            'status': 'success',
-            'data': all_results if all_results else [],
-            'grid_data': session.get('grid_data', []) if session else []
-        }
-        return jsonify(response_data)
+        logger.info(f"Job de extração {job.id} submetido para a sessão {user_id}")
+
+        return jsonify({
+            'status': 'accepted',
+            'job_id': job.id
+        }), 202
         
     except Exception as e:
         logger.error(f"Erro geral na extração: {str(e)}")
@@ -331,6 +365,89 @@ def extract():
             'message': f'Erro na extração: {str(e)}'
         }), 500
 
+def _get_session_job(job_id):
+    """Retorna o job se ele existir e pertencer à sessão atual"""
+    job = get_job(job_id)
+    if job is None or job.user_id != session.get('user_id'):
+        return None
+    return job
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Progresso, ETA e resultados parciais de um job (a partir de ?offset=N)"""
+    job = _get_session_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job não encontrado'}), 404
+    try:
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        offset = 0
+    return jsonify({'status': 'success', 'job': job.to_dict(offset)})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Solicita o cancelamento de um job em andamento"""
+    job = _get_session_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job não encontrado'}), 404
+    job.cancel()
+    return jsonify({'status': 'success', 'message': 'Cancelamento solicitado', 'job': job.to_dict(include_results=False)})
+
+def _sse_event(event, data, event_id=None):
+    """Formata um evento Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Transmite os resultados de um job via Server-Sent Events, à medida que cada processo é concluído
+
+    Eventos: 'result' (resultado formatado e linha do grid; o id é o offset seguinte),
+    'progress' (estado do job, também usado como keep-alive), 'dropped' (resultados que
+    saíram do buffer antes de serem enviados) e 'end' (estado final do job).
+    Retoma a partir de ?offset=N ou do cabeçalho Last-Event-ID.
+    """
+    job = _get_session_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job não encontrado'}), 404
+    try:
+        offset = int(request.headers.get('Last-Event-ID') or request.args.get('offset', 0))
+    except ValueError:
+        offset = 0
+
+    def generate(offset):
+        last_progress = None
+        while True:
+            job.wait_for_update(offset, timeout=15)
+            finished = job.finished
+
+            items, start = job.results_since(offset)
+            if start > offset:
+                yield _sse_event('dropped', {'count': start - offset, 'next_offset': start})
+            for position, (result, grid_row) in enumerate(items, start + 1):
+                yield _sse_event('result', {'result': result, 'grid_row': grid_row}, event_id=position)
+            offset = start + len(items)
+
+            progress = job.to_dict(include_results=False)
+            if finished and offset >= progress['next_offset']:
+                yield _sse_event('end', progress)
+                return
+            if progress != last_progress:
+                yield _sse_event('progress', progress)
+                last_progress = progress
+            else:
+                yield ": keep-alive\n\n"
+
+    return Response(generate(offset), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/healthcheck', methods=['GET'])
 def healthcheck():
     """Endpoint para verificar o status da sessão"""
@@ -360,6 +477,15 @@ def healthcheck():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+@app.route('/api/db/pool', methods=['GET'])
+def db_pool_status():
+    """Endpoint para acompanhar o uso do pool de conexões do banco"""
+    try:
+        return jsonify({'status': 'success', 'pool': get_pool_status()})
+    except Exception as e:
+        logger.error(f"Erro ao obter estatísticas do pool: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/api/config/debug', methods=['POST'])
 def toggle_debug():
     try:
@@ -0,0 +1,164 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+from config import get_logger
+
+logger = get_logger(__name__)
+
+# Tempo que um job finalizado fica disponível para consulta
+JOB_RETENTION = timedelta(hours=1)
+
+
+class BackgroundJob:
+    """
+    Estado comum de um job executado em segundo plano (extração, recertificação)
+
+    Cada subclasse acrescenta os seus contadores de progresso, eta_seconds e to_dict. O
+    job é o objeto de progresso repassado ao serviço que ele executa: o serviço consulta
+    cancelled entre uma etapa e outra.
+    """
+
+    def __init__(self, user_id, params):
+        """
+        Args:
+            user_id (str): Sessão que submeteu o job
+            params (dict): Parâmetros do job (corpo da requisição)
+        """
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.params = params
+        self.status = 'queued'
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        # Acorda quem espera por mudanças no job (ex.: consumidores de streaming)
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def cancel(self):
+        """Solicita o cancelamento; o job para na próxima verificação de cancelled"""
+        if not self.finished:
+            logger.info(f"Cancelamento solicitado para o job {self.id}")
+            self._cancel_event.set()
+
+    def set_status(self, status):
+        with self._lock:
+            self.status = status
+            if self.finished:
+                self.finished_at = datetime.now()
+            self._changed.notify_all()
+
+    def _state_dict(self):
+        """Campos comuns de to_dict (chamado com self._lock adquirido)"""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobConflictError(Exception):
+    """Submissão recusada: já existe um job em andamento que impede o novo (em job)"""
+
+    def __init__(self, job):
+        super().__init__(f"Job {job.id} já está em andamento")
+        self.job = job
+
+
+class JobRegistry:
+    """Jobs de um tipo, mantidos em memória e executados cada um em uma thread própria"""
+
+    def __init__(self, name, label, retention=JOB_RETENTION):
+        """
+        Args:
+            name (str): Tipo dos jobs, usado no nome das threads (ex.: 'extraction')
+            label (str): Tipo dos jobs nos logs (ex.: 'extração')
+            retention (timedelta): Tempo que um job finalizado fica disponível para consulta
+        """
+        self.name = name
+        self.label = label
+        self.retention = retention
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def find_active(self, predicate=None):
+        """Retorna o primeiro job em andamento (que satisfaça predicate, se informado)"""
+        with self.lock:
+            return self._find_active(predicate)
+
+    def _find_active(self, predicate=None):
+        for job in self.jobs.values():
+            if not job.finished and (predicate is None or predicate(job)):
+                return job
+        return None
+
+    def prune(self):
+        """Remove os jobs finalizados há mais tempo que retention"""
+        limit = datetime.now() - self.retention
+        with self.lock:
+            for job_id in [job_id for job_id, job in self.jobs.items()
+                           if job.finished and job.finished_at and job.finished_at < limit]:
+                del self.jobs[job_id]
+
+    def submit(self, job, target, exclusive=False, key=None):
+        """
+        Registra o job e o executa em uma thread própria
+
+        A verificação de exclusividade e o registro acontecem sob o mesmo lock: duas
+        submissões simultâneas não passam ambas pela verificação.
+
+        Args:
+            job (BackgroundJob): Job a executar
+            target (callable): Função que recebe o job e realiza o trabalho
+            exclusive (bool): Recusa o job se já houver outro em andamento
+            key (callable): Com exclusive, recusa apenas se o job em andamento tiver a mesma
+                chave (ex.: lambda job: job.user_id, um job por sessão)
+
+        Returns:
+            BackgroundJob: O job submetido
+
+        Raises:
+            JobConflictError: Se recusado por exclusive (com o job em andamento)
+        """
+        self.prune()
+        with self.lock:
+            if exclusive:
+                active = self._find_active(None if key is None else lambda other: key(other) == key(job))
+                if active is not None:
+                    raise JobConflictError(active)
+            self.jobs[job.id] = job
+
+        def run():
+            job.started_at = datetime.now()
+            job.set_status('running')
+            try:
+                target(job)
+                job.set_status('cancelled' if job.cancelled else 'completed')
+            except Exception as e:
+                logger.error(f"Erro no job de {self.label} {job.id}: {str(e)}")
+                job.error = str(e)
+                job.set_status('failed')
+            finally:
+                logger.info(f"Job de {self.label} {job.id} finalizado com status {job.status}")
+
+        thread = threading.Thread(target=run, name=f"{self.name}-job-{job.id[:8]}", daemon=True)
+        thread.start()
+        return job
@@ -0,0 +1,215 @@
+"""
+Benchmark e regressão da comparação de nomes
+
+Sobre casos sintéticos determinísticos (benchmarks/synthetic_names.py) mede, para cada
+métrica, pares por segundo, latência p50/p99 por chamada e pico de memória (tracemalloc,
+em uma passada separada), e confere as decisões contra o arquivo golden:
+
+    python benchmarks/name_matching_benchmark.py                 # mede e confere
+    python benchmarks/name_matching_benchmark.py --gerar-golden  # regrava o golden
+
+Uma otimização só pode ser aceita se a conferência passar: mesmas flags de fraude e
+motivos (check_fraud, check_name_matches e as versões em lote), mesmas decisões de
+names_match/match_name_pairs, mesma normalização e scores iguais até 1e-6.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from scraper.name_matching import (
+    normalize_name, calculate_name_similarity, names_match, score_name_pairs, match_name_pairs, _name_profile
+)
+from scraper.process_details_scraper import ProcessDetailsScraper
+from synthetic_names import generate_cases
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'name_decisions.jsonl')
+SCORE_TOLERANCE = 1e-6
+BATCH_SIZE = 500
+# Casos gravados no golden (os casos medidos vêm de --casos)
+GOLDEN_CASES = 2000
+
+
+def _limpar_caches():
+    normalize_name.cache_clear()
+    _name_profile.cache_clear()
+
+
+def _lotes(itens, tamanho=BATCH_SIZE):
+    return [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+
+
+def metricas(scraper, casos):
+    """
+    Métricas medidas: (nome, função chamada uma vez por item, itens, total de pares ou nomes)
+
+    As versões em lote são chamadas por lote de BATCH_SIZE; a latência é a do lote inteiro.
+    """
+    nomes = [c['nome_titular'] for c in casos] + [c['process_details']['partes']['parte_adversa'] for c in casos]
+    pares = [(c['nome_titular'], c['grid_data'][0]['grid_data'][3]) for c in casos]
+    pares_norm = [(normalize_name(a), normalize_name(b)) for a, b in pares]
+    argumentos = [(c['nome_titular'], c['cpf_titular'], c['process_details'], c['grid_data']) for c in casos]
+    lotes_pares = [([a for a, _ in lote], [b for _, b in lote]) for lote in _lotes(pares_norm)]
+    return [
+        ('normalize_name', lambda nome: normalize_name.__wrapped__(nome), nomes, len(nomes)),
+        ('calculate_name_similarity', lambda par: calculate_name_similarity(*par), pares, len(pares)),
+        ('names_match', lambda par: names_match(*par), pares_norm, len(pares_norm)),
+        ('score_name_pairs', lambda lote: score_name_pairs(*lote, normalized=True), lotes_pares, len(pares_norm)),
+        ('match_name_pairs', lambda lote: match_name_pairs(*lote, normalized=True), lotes_pares, len(pares_norm)),
+        ('check_name_matches', lambda a: scraper.check_name_matches(a[0], a[2], a[3]), argumentos, len(argumentos)),
+        ('check_fraud', lambda a: scraper.check_fraud(*a), argumentos, len(argumentos)),
+        ('check_fraud_batch', scraper.check_fraud_batch, _lotes(argumentos), len(argumentos)),
+    ]
+
+
+def medir(nome, funcao, itens, total_pares):
+    """Tempo por chamada (passada sem tracemalloc) e pico de memória (passada com tracemalloc)"""
+    _limpar_caches()
+    gc.collect()
+    latencias = np.empty(len(itens))
+    inicio = time.perf_counter()
+    for i, item in enumerate(itens):
+        t0 = time.perf_counter()
+        funcao(item)
+        latencias[i] = time.perf_counter() - t0
+    total = time.perf_counter() - inicio
+
+    _limpar_caches()
+    gc.collect()
+    tracemalloc.start()
+    for item in itens:
+        funcao(item)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'metrica': nome,
+        'chamadas': len(itens),
+        'pares_s': total_pares / total,
+        'p50_us': float(np.percentile(latencias, 50)) * 1e6,
+        'p99_us': float(np.percentile(latencias, 99)) * 1e6,
+        'pico_kib': pico / 1024,
+    }
+
+
+def decisoes(scraper, casos):
+    """
+    Decisões de cada caso, no formato do arquivo golden
+
+    Returns:
+        tuple: (decisões das funções por caso, as mesmas decisões pelas versões em lote)
+    """
+    argumentos = [(c['nome_titular'], c['cpf_titular'], c['process_details'], c['grid_data']) for c in casos]
+    titulares = [normalize_name(c['nome_titular']) for c in casos]
+    partes = [normalize_name(c['grid_data'][0]['grid_data'][3]) for c in casos]
+
+    individuais = []
+    for i, (caso, argumento) in enumerate(zip(casos, argumentos)):
+        suspeita, motivo = scraper.check_fraud(*argumento)
+        individuais.append({
+            'caso': i,
+            'titular_normalizado': titulares[i],
+            'parte_normalizada': partes[i],
+            'similaridade': round(calculate_name_similarity(caso['nome_titular'], caso['grid_data'][0]['grid_data'][3]), 6),
+            'names_match': names_match(titulares[i], partes[i]),
+            'check_name_matches': scraper.check_name_matches(argumento[0], argumento[2], argumento[3]),
+            'suspeita_fraude': suspeita,
+            'motivo': motivo,
+        })
+
+    scores = score_name_pairs(titulares, partes, normalized=True)
+    matches = match_name_pairs(titulares, partes, normalized=True)
+    fraudes, nomes = [], []
+    for lote in _lotes(argumentos):
+        fraudes.extend(scraper.check_fraud_batch(lote))
+        nomes.extend(scraper.check_name_matches_batch([(a[0], a[2], a[3]) for a in lote]))
+    em_lote = [
+        dict(decisao, similaridade=round(float(scores[i]), 6), names_match=bool(matches[i]),
+             check_name_matches=nomes[i], suspeita_fraude=fraudes[i][0], motivo=fraudes[i][1])
+        for i, decisao in enumerate(individuais)
+    ]
+    return individuais, em_lote
+
+
+def gravar_golden(resultado, seed, total):
+    os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+    with open(GOLDEN_PATH, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(json.dumps({'seed': seed, 'casos': total}) + '\n')
+        for decisao in resultado:
+            arquivo.write(json.dumps(decisao, ensure_ascii=False, sort_keys=True) + '\n')
+
+
+def ler_golden():
+    with open(GOLDEN_PATH, encoding='utf-8') as arquivo:
+        cabecalho = json.loads(arquivo.readline())
+        return cabecalho, [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+def conferir(resultado, golden, origem=''):
+    """Lista as divergências entre as decisões atuais e as do golden"""
+    divergencias = []
+    if len(resultado) != len(golden):
+        return [f"{origem}{len(resultado)} casos, golden tem {len(golden)}"]
+    for atual, esperado in zip(resultado, golden):
+        for campo, valor in esperado.items():
+            obtido = atual.get(campo)
+            if campo.startswith('similaridade'):
+                igual = obtido is not None and abs(obtido - valor) <= SCORE_TOLERANCE
+            else:
+                igual = obtido == valor
+            if not igual:
+                divergencias.append(f"{origem}caso {esperado['caso']}: {campo} = {obtido!r}, golden = {valor!r}")
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--casos', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--gerar-golden', action='store_true', help='regrava o arquivo golden com as decisões atuais')
+    parser.add_argument('--sem-medicao', action='store_true', help='apenas confere as decisões')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    scraper = ProcessDetailsScraper(None)
+
+    if args.gerar_golden:
+        individuais, em_lote = decisoes(scraper, generate_cases(GOLDEN_CASES, args.seed))
+        divergencias = conferir(em_lote, individuais, 'lote, ')
+        if divergencias:
+            print(f"ERRO: versões em lote divergem das individuais: {divergencias[:5]}")
+            sys.exit(1)
+        gravar_golden(individuais, args.seed, GOLDEN_CASES)
+        print(f"Golden gravado em {GOLDEN_PATH} ({GOLDEN_CASES} casos, semente {args.seed})")
+        return
+
+    if not args.sem_medicao:
+        casos = generate_cases(args.casos, args.seed)
+        print(f"{'métrica':<26} {'chamadas':>9} {'pares/s':>11} {'p50 (µs)':>10} {'p99 (µs)':>10} {'pico (KiB)':>11}")
+        for metrica in metricas(scraper, casos):
+            r = medir(*metrica)
+            print(f"{r['metrica']:<26} {r['chamadas']:>9} {r['pares_s']:>11.0f} {r['p50_us']:>10.1f} "
+                  f"{r['p99_us']:>10.1f} {r['pico_kib']:>11.1f}")
+
+    cabecalho, golden = ler_golden()
+    individuais, em_lote = decisoes(scraper, generate_cases(cabecalho['casos'], cabecalho['seed']))
+    divergencias = conferir(individuais, golden) + conferir(em_lote, golden, 'lote, ')
+    if divergencias:
+        print(f"ERRO: {len(divergencias)} decisões diferentes do golden")
+        for divergencia in divergencias[:20]:
+            print(f"    {divergencia}")
+        sys.exit(1)
+    print(f"Decisões idênticas ao golden ({len(golden)} casos, semente {cabecalho['seed']})")
+
+
+if __name__ == '__main__':
+    main()
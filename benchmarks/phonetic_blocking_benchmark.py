@@ -0,0 +1,150 @@
+"""
+Benchmark do bloqueio fonético de nomes: poda de candidatos x recall
+
+Gera nomes sintéticos com variações de grafia comuns (Luiz/Luis, Souza/Sousa, th/t, y/i,
+letras dobradas, h mudo, sobrenomes omitidos), compara todos os pares com match_name_pairs
+(a comparação completa) e mede, para os pares que compartilham um bloco:
+
+    poda   = 1 - pares candidatos / todos os pares
+    recall = matches entre os candidatos / matches da comparação completa
+
+O recall também é medido só entre grafias da mesma pessoa: com o limiar padrão, a
+comparação completa também junta pessoas diferentes que só dividem um nome ou sobrenome.
+
+Esquemas medidos: 'primeiro+último nome' (blocked_pairs, usado no agrupamento de titulares),
+com e sem limite de nomes por bloco, e 'palavra' (alguma palavra com a mesma chave
+fonética, como as chaves gravadas no índice e usadas por TitularIndex.find_similar).
+
+Uso:
+    python benchmarks/phonetic_blocking_benchmark.py --pessoas 1500
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scraper.name_matching import normalize_name, match_name_pairs, SIMILARITY_THRESHOLD
+from scraper.phonetics import phonetic_keys, blocked_pairs
+
+NOMES = ['Maria', 'José', 'Ana', 'João', 'Antônio', 'Francisca', 'Carlos', 'Paulo', 'Luiz', 'Thiago',
+         'Raphael', 'Stephanie', 'Cecília', 'Guilherme', 'Kátia', 'Érika', 'Wanderley', 'Yara', 'Helena', 'Marcello',
+         'Jéssica', 'Matheus', 'Elizabeth', 'Isabel', 'Cristian', 'Juliana', 'Sebastião', 'Raimundo', 'Quitéria', 'Gisele']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Rodrigues', 'Gonçalves', 'Nascimento', 'Conceição', 'Assunção',
+              'Pereira', 'Lima', 'Thomaz', 'Mattos', 'Bezerra', 'Vasconcellos', 'Ribeiro', 'Coelho', 'Carvalho',
+              'Figueiredo', 'Albuquerque', 'Magalhães', 'Sampaio', 'Queiroz', 'Barbosa', 'Rocha', 'Cavalcanti']
+
+# Trocas de grafia aplicadas às variantes de um mesmo nome
+VARIANTES = [('z', 's'), ('s', 'z'), ('th', 't'), ('ph', 'f'), ('y', 'i'), ('i', 'y'), ('ll', 'l'), ('tt', 't'),
+             ('ss', 's'), ('ç', 'ss'), ('w', 'v'), ('k', 'c'), ('qu', 'k'), ('ce', 'se'), ('ci', 'si'), ('lh', 'li')]
+
+
+def gerar_nomes(pessoas, seed=42):
+    """
+    Nomes distintos (normalizados), cada pessoa com 1 a 3 grafias
+
+    Returns:
+        tuple: (nomes ordenados, dicionário nome -> pessoas que o usam)
+    """
+    rng = random.Random(seed)
+    donos = defaultdict(set)
+    for pessoa in range(pessoas):
+        partes = [rng.choice(NOMES)] + rng.sample(SOBRENOMES, rng.randint(1, 3))
+        for _ in range(rng.randint(1, 3)):
+            variante = [parte.lower() for parte in partes]
+            if len(variante) > 2 and rng.random() < 0.3:
+                del variante[rng.randrange(1, len(variante) - 1)]
+            for _ in range(rng.randint(0, 2)):
+                origem, destino = rng.choice(VARIANTES)
+                i = rng.randrange(len(variante))
+                variante[i] = variante[i].replace(origem, destino, 1)
+            if rng.random() < 0.1:
+                variante[0] = 'h' + variante[0]
+            nome = normalize_name(' '.join(variante))
+            if nome:
+                donos[nome].add(pessoa)
+    return sorted(donos), donos
+
+
+def comparacao_completa(nomes, threshold, lote=200000):
+    """Pares (i, j) que dão match comparando todos contra todos"""
+    matches = set()
+    pares1, pares2, indices = [], [], []
+
+    def pontuar():
+        for par, match in zip(indices, match_name_pairs(pares1, pares2, threshold, normalized=True)):
+            if match:
+                matches.add(par)
+        pares1.clear()
+        pares2.clear()
+        indices.clear()
+
+    for i, nome1 in enumerate(nomes):
+        for j in range(i + 1, len(nomes)):
+            pares1.append(nome1)
+            pares2.append(nomes[j])
+            indices.append((i, j))
+        if len(pares1) >= lote:
+            pontuar()
+    pontuar()
+    return matches
+
+
+def pares_por_palavra(nomes):
+    """Bloco = chave fonética de qualquer palavra (phonetic_keys)"""
+    blocos = defaultdict(list)
+    for i, nome in enumerate(nomes):
+        for chave in phonetic_keys(nome):
+            blocos[chave].append(i)
+    return {(i, j) for membros in blocos.values() for a, i in enumerate(membros) for j in membros[a + 1:]}, 0
+
+
+def _recall(esperados, candidatos):
+    encontrados = len(esperados & candidatos)
+    return f"{encontrados / len(esperados) if esperados else 1.0:.4f} ({encontrados}/{len(esperados)})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pessoas', type=int, default=1500)
+    parser.add_argument('--threshold', type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-bloco', type=int, default=300, help='limite de nomes por bloco (MAX_BLOCK_NAMES no agrupamento)')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    nomes, donos = gerar_nomes(args.pessoas, args.seed)
+    total_pares = len(nomes) * (len(nomes) - 1) // 2
+    print(f"{len(nomes)} nomes distintos, {total_pares} pares")
+
+    inicio = time.perf_counter()
+    matches = comparacao_completa(nomes, args.threshold)
+    tempo_completo = time.perf_counter() - inicio
+    # Matches entre grafias da mesma pessoa (os demais juntam pessoas que só dividem um nome)
+    mesma_pessoa = {(i, j) for i, j in matches if donos[nomes[i]] & donos[nomes[j]]}
+    print(f"Comparação completa: {len(matches)} matches ({len(mesma_pessoa)} da mesma pessoa) "
+          f"em {tempo_completo:.1f}s")
+
+    esquemas = [
+        ('primeiro+último nome', lambda: blocked_pairs(nomes)),
+        (f"primeiro+último nome, blocos de até {args.max_bloco}", lambda: blocked_pairs(nomes, args.max_bloco)),
+        ('palavra', lambda: pares_por_palavra(nomes)),
+    ]
+    for esquema, gerar_pares in esquemas:
+        inicio = time.perf_counter()
+        candidatos, descartados = gerar_pares()
+        tempo_bloqueio = time.perf_counter() - inicio
+        print(f"Bloqueio '{esquema}': {len(candidatos)} pares candidatos em {tempo_bloqueio:.2f}s"
+              f"{f', {descartados} blocos descartados' if descartados else ''}")
+        print(f"    poda {1 - len(candidatos) / total_pares:.4f}  "
+              f"recall {_recall(matches, candidatos)}  "
+              f"recall da mesma pessoa {_recall(mesma_pessoa, candidatos)}")
+
+
+if __name__ == '__main__':
+    main()
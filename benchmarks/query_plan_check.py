@@ -0,0 +1,206 @@
+"""
+Conferência dos planos de consulta e da atualização versionada do schema (SQLite)
+
+Cria uma base SQLite temporária, monta as consultas que a aplicação faz por external_id,
+por valor e na fila de fraude (as mesmas expressões do ORM) e confere com EXPLAIN QUERY PLAN que todas usam
+índice: nenhuma varredura completa de processes, agreements ou fraud_assessments e nenhuma
+ordenação em B-tree temporária (avaliação mais recente, maiores acordos, fila de fraude em
+cada ordenação e o total limitado da busca).
+
+Também confere a atualização de uma base antiga (tabelas sem os índices novos e com
+external_id repetido em processes): upgrade_schema remove as repetições, cria os índices,
+registra as versões e não falha ao rodar de novo; e, se uma migração falhar, as seguintes
+são aplicadas mesmo assim (a fila de fraude continua mostrando as avaliações existentes).
+
+    python benchmarks/query_plan_check.py
+
+Sai com código 1 se alguma conferência falhar.
+"""
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, inspect, select, func, text
+from sqlalchemy.orm import Session, selectinload
+from database.models import Base, Process, Agreement, FraudAssessment, SchemaVersion, CurrentAssessment
+from database.migrations import MIGRATIONS, upgrade_schema
+from fraudeCheck.service import FraudeService
+
+TABELAS = ('processes', 'agreements', 'fraud_assessments', 'current_assessments')
+# Consultas com ORDER BY ... LIMIT ou contagem limitada: percorrer o índice na ordem (SCAN ...
+# USING [COVERING] INDEX) para após as primeiras linhas e é o plano esperado
+ORDENADAS_POR_INDICE = {'maiores acordos', 'fila de fraude (primeira página)', 'fila de fraude por processo',
+                        'fila de fraude por resultado (crescente)', 'total da fila de fraude'}
+
+
+def consultas(session):
+    """Consultas da aplicação por external_id: (descrição, instrução SQL compilada com os valores)"""
+    ids = ['1001', '1002', '1003']
+    instrucoes = [
+        ('processo por external_id (get_process_by_id)',
+         session.query(Process).filter(Process.external_id == '1001').statement),
+        ('acordo existente (save_process_data)',
+         session.query(Agreement).filter_by(external_id='1001', cpf_cnpj_titular='12345678900', valor='R$ 1.000,00').statement),
+        ('avaliação mais recente',
+         session.query(FraudAssessment).filter_by(external_id='1001')
+         .order_by(FraudAssessment.assessment_date.desc()).limit(1).statement),
+        ('avaliação pendente (create_initial_fraud_assessment)',
+         session.query(FraudAssessment).filter_by(external_id='1001', assessment_result='Pendente').statement),
+        ('processos em lote (get_processes_by_ids)',
+         session.query(Process).filter(Process.external_id.in_(ids)).statement),
+        ('acordos em lote (selectinload)',
+         select(Agreement).where(Agreement.external_id.in_(ids))),
+        ('avaliações em lote (selectinload)',
+         select(FraudAssessment).where(FraudAssessment.external_id.in_(ids))),
+        ('acordos por faixa de valor',
+         select(Agreement).where(Agreement.valor_centavos >= 500000, Agreement.valor_centavos < 1000000)),
+        ('maiores acordos',
+         select(Agreement).order_by(Agreement.valor_centavos.desc()).limit(10)),
+        ('fila de fraude (primeira página)', FraudeService._fila_query({}, 100)),
+        ('fila de fraude (página seguinte)', FraudeService._fila_query({}, 100, after=(datetime(2025, 3, 1), 1001))),
+        ('fila de fraude por resultado',
+         FraudeService._fila_query({'assessment_result': 'Pendente'}, 100, after=(datetime(2025, 3, 1), 1001))),
+        ('fila de fraude por período',
+         FraudeService._fila_query({'start_date': '01/02/2025', 'end_date': '28/02/2025'}, 100)),
+        ('fila de fraude por processo', FraudeService._fila_query({}, 100, sort='processo', order='asc')),
+        ('fila de fraude por processo (página seguinte)',
+         FraudeService._fila_query({}, 100, after=('0001234-56.2024.8.26.0100', 1001), sort='processo')),
+        ('fila de fraude por resultado (crescente)',
+         FraudeService._fila_query({}, 100, sort='assessment_result', order='asc')),
+        ('fila de fraude por resultado (página seguinte)',
+         FraudeService._fila_query({}, 100, after=('Pendente', datetime(2025, 3, 1), 1001), sort='assessment_result')),
+        ('total da fila de fraude', FraudeService._fila_total_query({})),
+        ('total da fila de fraude por resultado', FraudeService._fila_total_query({'assessment_result': 'Negativa'})),
+    ]
+    dialeto = session.get_bind().dialect
+    return [(descricao, str(instrucao.compile(dialect=dialeto, compile_kwargs={'literal_binds': True})))
+            for descricao, instrucao in instrucoes]
+
+
+def conferir_planos(engine):
+    falhas = []
+    with Session(engine) as session:
+        for descricao, sql in consultas(session):
+            plano = [linha[-1] for linha in session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+            problemas = [passo for passo in plano
+                         if (any(passo.startswith(f'SCAN {tabela}') for tabela in TABELAS)
+                             and not (descricao in ORDENADAS_POR_INDICE and 'INDEX' in passo))
+                         or 'TEMP B-TREE' in passo]
+            if not any('USING' in passo and 'INDEX' in passo for passo in plano):
+                problemas.append('nenhum índice usado')
+            print(f"{'FALHA' if problemas else 'ok':<6} {descricao}: {'; '.join(plano)}")
+            if problemas:
+                falhas.append(f"{descricao}: {'; '.join(problemas)}")
+    return falhas
+
+
+def conferir_atualizacao(caminho):
+    """Base antiga: tabelas criadas sem os índices novos e sem schema_versions, com processos repetidos"""
+    engine = create_engine(f'sqlite:///{caminho}')
+    novos = {'ux_processes_external_id', 'ix_agreements_ext_tit_valor', 'ix_fraud_assess_ext_date',
+             'ix_agreements_valor_centavos', 'ix_current_assess_process'}
+    # current_assessments e titular_index são criadas pelo create_all de _ensure_schema antes das migrações
+    with engine.begin() as conn:
+        for tabela in TABELAS:
+            indices = [indice for indice in Base.metadata.tables[tabela].indexes if indice.name in novos]
+            for indice in indices:
+                Base.metadata.tables[tabela].indexes.discard(indice)
+            try:
+                Base.metadata.tables[tabela].create(conn)
+            finally:
+                Base.metadata.tables[tabela].indexes.update(indices)
+        Base.metadata.tables['titular_index'].create(conn)
+        SchemaVersion.__table__.create(conn)
+        # Base antiga com external_id repetido em processes, uma suspeita pendente e um acordo
+        for numero in ('0001234-56.2024.8.26.0100', '0001234-56.2024.8.26.0100 (repetido)'):
+            conn.execute(Process.__table__.insert().values(external_id=1001, numero=numero))
+        conn.execute(FraudAssessment.__table__.insert().values(
+            external_id=1001, process_number='0001234-56.2024.8.26.0100', assessment_result='Pendente',
+            assessment_date=datetime(2025, 3, 1)))
+        conn.execute(Agreement.__table__.insert().values(external_id=1001, nome_titular='Maria da Silva',
+                                                         valor='R$ 1.234,56'))
+
+    falhas = []
+    versao_final = MIGRATIONS[-1][0]
+    for rodada in (1, 2):
+        versao = upgrade_schema(engine)
+        if versao != versao_final:
+            falhas.append(f"atualização (rodada {rodada}): versão {versao}, esperada {versao_final}")
+    existentes = {indice['name'] for tabela in TABELAS for indice in inspect(engine).get_indexes(tabela)}
+    if novos - existentes:
+        falhas.append(f"atualização: índices ausentes {sorted(novos - existentes)}")
+    with engine.connect() as conn:
+        registradas = conn.execute(select(func.count()).select_from(SchemaVersion)).scalar()
+        processos = conn.execute(select(Process.numero).where(Process.external_id == 1001)).scalars().all()
+        atuais = conn.execute(select(func.count()).select_from(CurrentAssessment)).scalar()
+        centavos = conn.execute(select(Agreement.valor_centavos)).scalar()
+    if registradas != len(MIGRATIONS):
+        falhas.append(f"atualização: {registradas} versões registradas, esperadas {len(MIGRATIONS)}")
+    if processos != ['0001234-56.2024.8.26.0100']:
+        falhas.append(f"atualização: processos repetidos não removidos ({processos})")
+    if atuais != 1 or centavos != 123456:
+        falhas.append(f"atualização: {atuais} avaliações atuais (esperada 1), valor_centavos {centavos}")
+    print(f"{'FALHA' if falhas else 'ok':<6} atualização de base antiga: versão {versao_final}, "
+          f"índices {sorted(novos & existentes)}")
+    engine.dispose()
+    return falhas
+
+
+def conferir_falha_isolada(caminho):
+    """Uma migração que falha não impede as seguintes e é aplicada na próxima inicialização"""
+    engine = create_engine(f'sqlite:///{caminho}')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Process(external_id=1001, numero='0001234-56.2024.8.26.0100'))
+        session.add(FraudAssessment(external_id=1001, process_number='0001234-56.2024.8.26.0100',
+                                    assessment_result='Pendente'))
+        session.commit()
+
+    def falha(conn):
+        raise RuntimeError('falha simulada')
+
+    com_falha = [(versao, descricao, falha if versao == 2 else migrar) for versao, descricao, migrar in MIGRATIONS]
+    falhas = []
+    versao = upgrade_schema(engine, com_falha)
+    with engine.connect() as conn:
+        registradas = set(conn.execute(select(SchemaVersion.version)).scalars().all())
+        atuais = conn.execute(select(func.count()).select_from(CurrentAssessment)).scalar()
+    esperadas = {versao for versao, _, _ in MIGRATIONS} - {2}
+    if versao != 1 or registradas != esperadas:
+        falhas.append(f"migração com falha: versão {versao}, registradas {sorted(registradas)}")
+    if atuais != 1:
+        falhas.append(f"migração com falha: {atuais} avaliações atuais, esperada 1")
+    versao = upgrade_schema(engine)
+    if versao != MIGRATIONS[-1][0]:
+        falhas.append(f"migração com falha: versão {versao} na inicialização seguinte")
+    print(f"{'FALHA' if falhas else 'ok':<6} migração com falha: seguintes aplicadas, avaliações atuais {atuais}")
+    engine.dispose()
+    return falhas
+
+
+def main():
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'nova.db')}")
+        Base.metadata.create_all(engine)
+        upgrade_schema(engine)
+        falhas = conferir_planos(engine)
+        engine.dispose()
+        falhas += conferir_atualizacao(os.path.join(pasta, 'antiga.db'))
+        falhas += conferir_falha_isolada(os.path.join(pasta, 'falha.db'))
+
+    if falhas:
+        print(f"ERRO: {len(falhas)} conferências falharam")
+        for falha in falhas:
+            print(f"    {falha}")
+        sys.exit(1)
+    print("Todas as consultas usam índice")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark da recertificação de fraudes: modo serial x pool de processos
+
+Gera uma base SQLite sintética (por padrão 200 mil acordos, com os nomes e CPFs de
+benchmarks/synthetic_names.py), executa a recertificação completa nos dois modos e
+confere que as avaliações gravadas são idênticas.
+
+Uso:
+    python benchmarks/recertification_benchmark.py --acordos 200000 --workers 4
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_names import NameGenerator
+
+
+def gerar_base(total_acordos, seed=42):
+    """Popula a base com processos de 1 a 3 acordos; parte dos titulares difere da parte adversa"""
+    from sqlalchemy import insert
+    from database import DatabaseManager, Process, Agreement
+
+    gen = NameGenerator(seed)
+    rng = gen.rng
+    db = DatabaseManager()
+    session = db.Session()
+    processos, acordos = [], []
+    external_id = 0
+    while len(acordos) < total_acordos:
+        external_id += 1
+        parte = gen.pessoa()
+        cpf_parte = gen.cpf() if rng.random() < 0.4 else None
+        processos.append({
+            'external_id': external_id, 'numero': f"{external_id:07d}-00.2020.8.06.0001",
+            'parte_adversa': parte, 'cpf_cnpj_parte_adverso': cpf_parte,
+            'advogados_adversos': f"{gen.advogado()} (OAB/CE {rng.randint(1000, 99999)})"
+        })
+        for _ in range(min(rng.randint(1, 3), total_acordos - len(acordos))):
+            sorteio = rng.random()
+            if sorteio < 0.6:
+                titular, cpf = parte, cpf_parte
+            elif sorteio < 0.8:
+                titular, cpf = gen.variante(parte), None
+            else:
+                titular, cpf = gen.pessoa(), gen.cpf() if rng.random() < 0.5 else None
+            acordos.append({
+                'external_id': external_id, 'nome_titular': titular, 'cpf_cnpj_titular': cpf,
+                'valor': f"R$ {rng.randint(500, 50000)},00"
+            })
+    for inicio in range(0, len(processos), 20000):
+        session.execute(insert(Process), processos[inicio:inicio + 20000])
+    for inicio in range(0, len(acordos), 20000):
+        session.execute(insert(Agreement), acordos[inicio:inicio + 20000])
+    session.commit()
+    session.close()
+    return len(processos), len(acordos)
+
+
+def limpar_avaliacoes():
+    from database import DatabaseManager, Agreement, FraudAssessment, CurrentAssessment
+    session = DatabaseManager().Session()
+    session.query(FraudAssessment).delete(synchronize_session=False)
+    session.query(CurrentAssessment).delete(synchronize_session=False)
+    session.query(Agreement).update({Agreement.assessment_hash: None}, synchronize_session=False)
+    session.commit()
+    session.close()
+
+
+def snapshot():
+    """Avaliações e hashes gravados, sem ids e datas"""
+    from database import DatabaseManager, Agreement, FraudAssessment
+    session = DatabaseManager().Session()
+    avaliacoes = session.query(
+        FraudAssessment.external_id, FraudAssessment.process_number,
+        FraudAssessment.assessment_result, FraudAssessment.suspicion_reason
+    ).order_by(FraudAssessment.external_id).all()
+    hashes = session.query(Agreement.id, Agreement.assessment_hash).order_by(Agreement.id).all()
+    session.close()
+    return [tuple(a) for a in avaliacoes], [tuple(h) for h in hashes]
+
+
+def executar(workers):
+    from fraudeCheck.fraud_recertification import FraudRecertificationService
+    limpar_avaliacoes()
+    inicio = time.perf_counter()
+    stats = FraudRecertificationService().recertify_fraud_assessments(incremental=False, workers=workers)
+    return time.perf_counter() - inicio, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--acordos', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['SQLITE_DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='recert-bench-'), 'bench.db')
+    logging.disable(logging.WARNING)
+
+    inicio = time.perf_counter()
+    total_processos, total_acordos = gerar_base(args.acordos, args.seed)
+    print(f"Base sintética: {total_processos} processos, {total_acordos} acordos "
+          f"({time.perf_counter() - inicio:.1f}s) em {os.environ['SQLITE_DATABASE_PATH']}")
+
+    tempo_serial, stats = executar(1)
+    resultado_serial = snapshot()
+    print(f"Serial:           {tempo_serial:7.1f}s  {total_acordos / tempo_serial:9.0f} acordos/s  {stats}")
+
+    tempo_pool, stats = executar(args.workers)
+    resultado_pool = snapshot()
+    print(f"Pool ({args.workers} workers): {tempo_pool:7.1f}s  {total_acordos / tempo_pool:9.0f} acordos/s  {stats}")
+
+    print(f"Speedup: {tempo_serial / tempo_pool:.2f}x")
+    if stats['total_processos'] != total_processos:
+        print(f"ERRO: {stats['total_processos']} processos contados, {total_processos} na base")
+        sys.exit(1)
+    if resultado_serial != resultado_pool:
+        print("ERRO: avaliações diferentes entre o modo serial e o pool")
+        sys.exit(1)
+    print(f"Resultados idênticos ({len(resultado_serial[0])} avaliações)")
+
+
+if __name__ == '__main__':
+    main()
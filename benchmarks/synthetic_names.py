@@ -0,0 +1,167 @@
+"""
+Gerador determinístico de nomes brasileiros e de casos de verificação de fraude
+
+Mesma semente, mesmos nomes e casos: a base do benchmark de nomes e do arquivo golden de
+decisões. Inclui acentos, partículas (da, de, dos), prefixos de tratamento (Dr., Dra.),
+sufixos empresariais (LTDA, ME, EIRELI, S/A) e erros de digitação.
+"""
+import random
+
+PRIMEIROS_NOMES = [
+    'Maria', 'José', 'Ana', 'João', 'Antônio', 'Francisca', 'Carlos', 'Paulo', 'Luiz', 'Luís', 'Thiago',
+    'Raphael', 'Stephanie', 'Cecília', 'Guilherme', 'Kátia', 'Érika', 'Wanderley', 'Yara', 'Helena',
+    'Marcello', 'Jéssica', 'Matheus', 'Elizabeth', 'Isabel', 'Cristian', 'Juliana', 'Sebastião',
+    'Raimundo', 'Quitéria', 'Gisele', 'Conceição', 'Fátima', 'Adriana', 'Márcia', 'Luíza', 'Vinícius',
+    'Gonçalo', 'Inês', 'Rosângela', 'Célia', 'Benedito', 'Iolanda', 'Edson', 'Neusa', 'Thereza'
+]
+SOBRENOMES = [
+    'Silva', 'Souza', 'Sousa', 'Oliveira', 'Santos', 'Rodrigues', 'Gonçalves', 'Nascimento', 'Conceição',
+    'Assunção', 'Pereira', 'Lima', 'Thomaz', 'Mattos', 'Bezerra', 'Vasconcellos', 'Ribeiro', 'Coelho',
+    'Carvalho', 'Figueiredo', 'Albuquerque', 'Magalhães', 'Sampaio', 'Queiroz', 'Barbosa', 'Rocha',
+    'Cavalcanti', 'Araújo', 'Simões', 'Brandão', 'Falcão', 'Guimarães', 'Peixoto', 'Damasceno', 'Aragão'
+]
+PARTICULAS = ['da', 'de', 'do', 'dos', 'das']
+PREFIXOS = ['Dr.', 'Dra.', 'Dr', 'DRA.', 'Doutor', 'Adv.']
+RAMOS = ['Comércio de Alimentos', 'Construções', 'Transportes', 'Serviços Médicos', 'Distribuidora',
+         'Materiais de Construção', 'Advocacia', 'Consultoria Empresarial', 'Indústria Têxtil', 'Farmácia']
+SUFIXOS_EMPRESA = ['LTDA', 'Ltda.', 'ME', 'EIRELI', 'S/A', 'S.A.', 'EPP', 'LTDA - ME']
+
+# Relações entre o titular do acordo e a parte adversa
+RELACOES = ['mesmo', 'variante', 'digitacao', 'sobrenome_omitido', 'outra_pessoa',
+            'empresa', 'empresa_variante', 'outra_empresa']
+
+
+class NameGenerator:
+    """Nomes de pessoas e empresas, e variações de grafia de um nome, a partir de uma semente"""
+
+    def __init__(self, seed=42):
+        self.rng = random.Random(seed)
+
+    def pessoa(self):
+        rng = self.rng
+        partes = [rng.choice(PRIMEIROS_NOMES)]
+        if rng.random() < 0.3:
+            partes.append(rng.choice(PRIMEIROS_NOMES))
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.25:
+                partes.append(rng.choice(PARTICULAS))
+            partes.append(rng.choice(SOBRENOMES))
+        return ' '.join(partes)
+
+    def advogado(self):
+        nome = self.pessoa()
+        return f"{self.rng.choice(PREFIXOS)} {nome}" if self.rng.random() < 0.5 else nome
+
+    def empresa(self):
+        rng = self.rng
+        base = rng.choice([f"{rng.choice(SOBRENOMES)} {rng.choice(RAMOS)}",
+                           f"{rng.choice(SOBRENOMES)} & {rng.choice(SOBRENOMES)} {rng.choice(RAMOS)}",
+                           f"{self.pessoa()}"])
+        return f"{base} {rng.choice(SUFIXOS_EMPRESA)}"
+
+    def variante(self, nome):
+        """Mesmo nome com outra capitalização, sem acentos, com/sem partículas ou sufixos"""
+        rng = self.rng
+        palavras = nome.split()
+        if rng.random() < 0.4:
+            palavras = [p for p in palavras if p.lower() not in PARTICULAS] or palavras
+        variante = ' '.join(palavras)
+        sorteio = rng.random()
+        if sorteio < 0.3:
+            variante = variante.upper()
+        elif sorteio < 0.5:
+            variante = variante.lower()
+        if rng.random() < 0.3:
+            variante = variante.translate(str.maketrans('áâãàéêíóôõúüçÁÂÃÀÉÊÍÓÔÕÚÜÇ', 'aaaaeeiooouucAAAAEEIOOOUUC'))
+        if rng.random() < 0.2:
+            variante = f"{rng.choice(PREFIXOS)} {variante}"
+        return variante
+
+    def digitacao(self, nome):
+        """Um ou dois erros de digitação: troca, omissão, duplicação ou substituição de letra"""
+        rng = self.rng
+        letras = list(nome)
+        for _ in range(rng.randint(1, 2)):
+            posicoes = [i for i, c in enumerate(letras) if c.isalpha()]
+            if len(posicoes) < 3:
+                break
+            i = rng.choice(posicoes[1:-1])
+            erro = rng.randrange(4)
+            if erro == 0:
+                letras[i], letras[i + 1] = letras[i + 1], letras[i]
+            elif erro == 1:
+                del letras[i]
+            elif erro == 2:
+                letras.insert(i, letras[i])
+            else:
+                letras[i] = rng.choice('aeiourstnlm')
+        return ''.join(letras)
+
+    def sobrenome_omitido(self, nome):
+        palavras = nome.split()
+        if len(palavras) > 2:
+            del palavras[self.rng.randrange(1, len(palavras) - 1)]
+        return ' '.join(palavras)
+
+    def cpf(self):
+        digits = [self.rng.randint(0, 9) for _ in range(9)]
+        for pesos in (range(10, 1, -1), range(11, 1, -1)):
+            resto = sum(d * w for d, w in zip(digits, pesos)) % 11
+            digits.append(0 if resto < 2 else 11 - resto)
+        numero = ''.join(map(str, digits))
+        return f"{numero[:3]}.{numero[3:6]}.{numero[6:9]}-{numero[9:]}" if self.rng.random() < 0.5 else numero
+
+
+def generate_cases(total, seed=42):
+    """
+    Casos de verificação de fraude no formato de check_fraud
+
+    Returns:
+        list: Dicionários com 'relacao', 'nome_titular', 'cpf_titular', 'process_details' e
+              'grid_data' (o mesmo formato que a extração monta para cada acordo)
+    """
+    gen = NameGenerator(seed)
+    rng = gen.rng
+    casos = []
+    for _ in range(total):
+        relacao = rng.choice(RELACOES)
+        if 'empresa' in relacao:
+            parte = gen.empresa()
+        else:
+            parte = gen.pessoa()
+        titular = {
+            'mesmo': lambda: parte,
+            'variante': lambda: gen.variante(parte),
+            'digitacao': lambda: gen.digitacao(parte),
+            'sobrenome_omitido': lambda: gen.sobrenome_omitido(parte),
+            'outra_pessoa': gen.pessoa,
+            'empresa': lambda: parte,
+            'empresa_variante': lambda: gen.variante(gen.digitacao(parte) if rng.random() < 0.5 else parte),
+            'outra_empresa': gen.empresa,
+        }[relacao]()
+
+        # Documentos: parte dos casos decide por CPF, parte tem documentos ausentes ou inválidos
+        cpf_parte = gen.cpf() if rng.random() < 0.4 else None
+        sorteio = rng.random()
+        if cpf_parte and sorteio < 0.5:
+            cpf_titular = cpf_parte if relacao not in ('outra_pessoa', 'outra_empresa') else gen.cpf()
+        elif sorteio < 0.6:
+            cpf_titular = '000.000.000-00'
+        else:
+            cpf_titular = None
+
+        advogados = [{'nome': gen.advogado()} for _ in range(rng.randint(0, 3))]
+        parte_no_processo = parte if rng.random() < 0.85 else 'N/A'
+        casos.append({
+            'relacao': relacao,
+            'nome_titular': titular if rng.random() < 0.98 else '',
+            'cpf_titular': cpf_titular,
+            'process_details': {'partes': {
+                'parte_adversa': f"AUTOR - {parte_no_processo}" if rng.random() < 0.2 else parte_no_processo,
+                'cpf_cnpj_parte_adverso': cpf_parte,
+                'advogado_interno': gen.advogado() if rng.random() < 0.5 else '',
+                'advogados_adversos': advogados,
+            }},
+            'grid_data': [{'grid_data': ['', '', '', parte, cpf_parte]}],
+        })
+    return casos
@@ -8,6 +8,44 @@ OLLAMA_HOST = os.environ.get('OLLAMA_HOST', 'http://localhost:11434')
 VECTOR_STORE_DIR = "vector_stores"
 DEBUG_ENABLED = True  # Nova configuração para controle de debug
 
+# Configurações do pool de conexões do banco de dados (SQLite e Oracle)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # Segundos aguardando uma conexão livre
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # Segundos até reciclar uma conexão
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'sim')
+
+# Extração paralela: quantidade de navegadores autenticados e limite de memória por navegador
+EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', 1))  # 1 = extração sequencial
+WORKER_MAX_RSS_MB = int(os.environ.get('WORKER_MAX_RSS_MB', 0))  # 0 = sem limite
+
+# Backend de extração dos detalhes: 'browser' (Selenium) ou 'http' (requisições diretas com os cookies do Selenium)
+EXTRACTION_BACKEND = os.environ.get('EXTRACTION_BACKEND', 'browser').lower()
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+HTTP_TIMEOUT = int(os.environ.get('HTTP_TIMEOUT', 30))
+# Páginas de acordo de um mesmo processo buscadas em paralelo
+ACORDO_FETCH_WORKERS = int(os.environ.get('ACORDO_FETCH_WORKERS', 4))
+# Resultados mantidos em memória por job de extração para streaming/polling (os mais antigos são descartados)
+JOB_RESULT_BUFFER = int(os.environ.get('JOB_RESULT_BUFFER', 200))
+
+# Checkpoints das execuções de extração (retomada após queda do navegador ou expiração da sessão)
+EXTRACTION_CHECKPOINTS = os.environ.get('EXTRACTION_CHECKPOINTS', 'true').lower() in ('1', 'true', 'sim')
+CHECKPOINT_MAX_RESUMES = int(os.environ.get('CHECKPOINT_MAX_RESUMES', 2))  # Retomadas automáticas por busca
+CHECKPOINT_MAX_AGE_HOURS = int(os.environ.get('CHECKPOINT_MAX_AGE_HOURS', 24))  # Execuções mais antigas recomeçam do zero
+
+# Gravação em lote (write-behind) dos processos extraídos
+WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', 100))  # Processos por transação
+WRITE_FLUSH_SECONDS = float(os.environ.get('WRITE_FLUSH_SECONDS', 2))  # Espera máxima de um processo na fila
+
+# Nomes normalizados mantidos em cache pelo matcher de fraude
+NAME_CACHE_SIZE = int(os.environ.get('NAME_CACHE_SIZE', 65536))
+NAME_MATCH_BATCH_SIZE = int(os.environ.get('NAME_MATCH_BATCH_SIZE', 2000))  # Acordos por lote na recertificação
+RECERTIFY_WORKERS = int(os.environ.get('RECERTIFY_WORKERS', 1))  # 1 = pontuação no próprio processo
+RECERTIFY_AFTER_EXTRACTION = os.environ.get('RECERTIFY_AFTER_EXTRACTION', 'false').lower() in ('1', 'true', 'sim')  # Recertificação incremental ao fim de cada extração
+FRAUD_QUEUE_PAGE_SIZE = int(os.environ.get('FRAUD_QUEUE_PAGE_SIZE', 100))  # Linhas por página da fila de fraude
+FRAUD_QUEUE_MAX_PAGE_SIZE = int(os.environ.get('FRAUD_QUEUE_MAX_PAGE_SIZE', 500))  # Maior página aceita pela busca
+FRAUD_QUEUE_COUNT_LIMIT = int(os.environ.get('FRAUD_QUEUE_COUNT_LIMIT', 10000))  # Acima disso o total da busca é estimado
+
 # Configuração de logging melhorada
 class CustomFilter(logging.Filter):
     def filter(self, record):
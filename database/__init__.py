@@ -1,11 +1,20 @@
-from .db_manager import DatabaseManager
+from .db_manager import DatabaseManager, get_pool_status
+from .batch_writer import ProcessBatchWriter
 from .models import (
     Process,
-    Agreement, FraudAssessment
+    Agreement, FraudAssessment,
+    ExtractionRun, ExtractionRunProcess,
+    TitularIndexKey, RecurringPayee, SchemaVersion, CurrentAssessment
 )
+from .checkpoints import ExtractionCheckpoint
+from .titular_index import TitularIndex
+from .agreement_reports import AgreementReports
 
 __all__ = [
-    'DatabaseManager', 'Process',
+    'DatabaseManager', 'get_pool_status', 'ProcessBatchWriter', 'Process',
     'Agreement',
-    'FraudAssessment'
+    'FraudAssessment',
+    'ExtractionRun', 'ExtractionRunProcess', 'ExtractionCheckpoint',
+    'TitularIndexKey', 'RecurringPayee', 'TitularIndex', 'SchemaVersion', 'AgreementReports',
+    'CurrentAssessment'
 ]
@@ -0,0 +1,191 @@
+from datetime import timedelta
+from sqlalchemy import case, distinct, func, literal_column, select
+from database.db_manager import get_session_factory
+from database.models import Agreement, Process
+from database.money import format_cents
+from config import get_logger
+
+logger = get_logger(__name__)
+
+# Limites das faixas de valor (centavos): até R$ 1.000, R$ 1.000 a R$ 5.000, ... e acima de R$ 100.000
+DEFAULT_RANGE_EDGES = [100000, 500000, 1000000, 2000000, 5000000, 10000000]
+
+DIMENSIONS = ('escritorio', 'comarca', 'mes')
+
+
+def _month(dialect_name, column):
+    """
+    Mês ('AAAA-MM') de uma coluna de data, calculado no banco
+
+    Formatos e limites vão no SQL, sem parâmetros: o Oracle só aceita no SELECT a mesma
+    expressão do GROUP BY, e cada parâmetro ganharia um nome diferente.
+    """
+    if dialect_name == 'sqlite':
+        return func.strftime(literal_column("'%Y-%m'"), column)
+    return func.to_char(column, literal_column("'YYYY-MM'"))
+
+
+def _range_label(minimo, maximo):
+    if minimo is None:
+        return f"até {format_cents(maximo)}"
+    if maximo is None:
+        return f"acima de {format_cents(minimo)}"
+    return f"{format_cents(minimo)} a {format_cents(maximo)}"
+
+
+class AgreementReports:
+    """
+    Totais e faixas de valor dos acordos, agregados no banco
+
+    Os valores vêm de agreements.valor_centavos; acordos sem valor reconhecível ficam de
+    fora. Todas as consultas aceitam o período de pagamento (inicio/fim, datas inclusivas)
+    e o filtro de suspeita de fraude do processo.
+    """
+
+    def __init__(self):
+        self.Session = get_session_factory()
+
+    @staticmethod
+    def _dimension(session, dimension):
+        if dimension == 'escritorio':
+            return Process.escritorio_celula
+        if dimension == 'comarca':
+            return Process.comarca
+        if dimension == 'mes':
+            return _month(session.get_bind().dialect.name, Agreement.data_pagamento)
+        raise ValueError(f"Dimensão inválida: {dimension} (use {', '.join(DIMENSIONS)})")
+
+    @staticmethod
+    def _filter(query, dimension, inicio=None, fim=None, suspeita_fraude=None):
+        """Período de pagamento, suspeita de fraude e a junção com processes quando necessária"""
+        query = query.where(Agreement.valor_centavos.isnot(None))
+        if dimension in ('escritorio', 'comarca') or suspeita_fraude is not None:
+            query = query.join(Process, Process.external_id == Agreement.external_id)
+        if suspeita_fraude is not None:
+            query = query.where(Process.suspeita_fraude == suspeita_fraude)
+        if inicio is not None:
+            query = query.where(Agreement.data_pagamento >= inicio)
+        if fim is not None:
+            # Data final inclusiva, como na fila de fraude: pagamentos até o fim do dia
+            query = query.where(Agreement.data_pagamento < fim + timedelta(days=1))
+        return query
+
+    def totals_by(self, dimension, inicio=None, fim=None, suspeita_fraude=None, limit=None):
+        """
+        Quantidade, soma, média, menor e maior valor dos acordos por escritório, comarca ou mês
+
+        Args:
+            dimension (str): 'escritorio', 'comarca' ou 'mes' (mês do pagamento)
+            inicio (datetime): Pagamentos a partir desta data
+            fim (datetime): Pagamentos até esta data (inclusive)
+            suspeita_fraude (bool): Apenas processos com (True) ou sem (False) suspeita
+            limit (int): Quantidade máxima de grupos
+
+        Returns:
+            list: Dicionários por grupo, ordenados pelo total (por mês, em ordem cronológica)
+        """
+        session = self.Session()
+        try:
+            chave = self._dimension(session, dimension).label('chave')
+            total = func.sum(Agreement.valor_centavos)
+            query = select(
+                chave,
+                func.count(Agreement.id).label('acordos'),
+                total.label('total_centavos'),
+                func.avg(Agreement.valor_centavos).label('media_centavos'),
+                func.min(Agreement.valor_centavos).label('minimo_centavos'),
+                func.max(Agreement.valor_centavos).label('maximo_centavos'),
+            ).group_by(chave)
+            query = self._filter(query, dimension, inicio, fim, suspeita_fraude)
+            query = query.order_by(chave if dimension == 'mes' else total.desc())
+            if limit:
+                query = query.limit(limit)
+
+            return [{
+                'chave': row.chave,
+                'acordos': row.acordos,
+                'total_centavos': int(row.total_centavos),
+                'total': format_cents(row.total_centavos),
+                'media_centavos': int(round(row.media_centavos)),
+                'minimo_centavos': int(row.minimo_centavos),
+                'maximo_centavos': int(row.maximo_centavos),
+            } for row in session.execute(query)]
+        finally:
+            session.close()
+
+    def value_histogram(self, dimension=None, edges=None, inicio=None, fim=None, suspeita_fraude=None):
+        """
+        Quantidade e soma dos acordos por faixa de valor, opcionalmente por dimensão
+
+        Args:
+            dimension (str): None (todos os acordos), 'escritorio', 'comarca' ou 'mes'
+            edges (list): Limites das faixas em centavos, crescentes (DEFAULT_RANGE_EDGES)
+
+        Returns:
+            list: Dicionários por (grupo, faixa) com 'faixa', os limites da faixa em
+                  centavos (o mínimo incluso), 'acordos' e 'total_centavos'
+        """
+        edges = sorted(edges or DEFAULT_RANGE_EDGES)
+        session = self.Session()
+        try:
+            faixa = case(
+                *[(Agreement.valor_centavos < literal_column(str(int(edge))), literal_column(str(index)))
+                  for index, edge in enumerate(edges)],
+                else_=literal_column(str(len(edges)))
+            ).label('faixa')
+            columns = [faixa, func.count(Agreement.id).label('acordos'),
+                       func.sum(Agreement.valor_centavos).label('total_centavos')]
+            group = [faixa]
+            if dimension is not None:
+                chave = self._dimension(session, dimension).label('chave')
+                columns.insert(0, chave)
+                group.insert(0, chave)
+            query = self._filter(select(*columns).group_by(*group), dimension, inicio, fim, suspeita_fraude)
+            query = query.order_by(*group)
+
+            limites = [None] + edges + [None]
+            resultado = []
+            for row in session.execute(query):
+                minimo, maximo = limites[row.faixa], limites[row.faixa + 1]
+                resultado.append({
+                    'chave': row.chave if dimension is not None else None,
+                    'faixa': _range_label(minimo, maximo),
+                    'minimo_centavos': minimo,
+                    'maximo_centavos': maximo,
+                    'acordos': row.acordos,
+                    'total_centavos': int(row.total_centavos),
+                })
+            return resultado
+        finally:
+            session.close()
+
+    def top_payees(self, limit=20, inicio=None, fim=None, suspeita_fraude=None):
+        """
+        Titulares (por CPF/CNPJ) com a maior soma de acordos
+
+        Returns:
+            list: Dicionários com o documento, um dos nomes registrados, a quantidade de
+                  processos e de acordos e o total
+        """
+        session = self.Session()
+        try:
+            total = func.sum(Agreement.valor_centavos)
+            query = select(
+                Agreement.cpf_cnpj_titular,
+                func.max(Agreement.nome_titular).label('nome_titular'),
+                func.count(distinct(Agreement.external_id)).label('processos'),
+                func.count(Agreement.id).label('acordos'),
+                total.label('total_centavos'),
+            ).where(Agreement.cpf_cnpj_titular.isnot(None)).group_by(Agreement.cpf_cnpj_titular)
+            query = self._filter(query, None, inicio, fim, suspeita_fraude).order_by(total.desc()).limit(limit)
+
+            return [{
+                'cpf_cnpj_titular': row.cpf_cnpj_titular,
+                'nome_titular': row.nome_titular,
+                'processos': row.processos,
+                'acordos': row.acordos,
+                'total_centavos': int(row.total_centavos),
+                'total': format_cents(row.total_centavos),
+            } for row in session.execute(query)]
+        finally:
+            session.close()
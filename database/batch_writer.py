@@ -0,0 +1,293 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import bindparam, insert, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.db_manager import get_session_factory, build_process_rows, AGREEMENT_UPDATE_COLUMNS
+from database.models import Process, Agreement, FraudAssessment
+from database.current_assessment import refresh_current_assessments
+from config import get_logger, WRITE_BATCH_SIZE, WRITE_FLUSH_SECONDS
+
+logger = get_logger(__name__)
+
+# Sentinelas da fila: grava o lote atual já / grava e encerra a thread
+_FLUSH = object()
+_STOP = object()
+
+
+class _Failure:
+    """Processo que não será gravado (ex.: falha na extração), informado pela thread de gravação"""
+    __slots__ = ('process_id', 'error')
+
+    def __init__(self, process_id, error):
+        self.process_id = process_id
+        self.error = error
+
+
+PROCESS_COLUMNS = [column.name for column in Process.__table__.columns if column.name not in ('id', 'created_at')]
+AGREEMENT_KEY = ('external_id', 'cpf_cnpj_titular', 'valor')
+
+
+def _process_merge_statement():
+    """MERGE (Oracle) de uma linha de processes pelo external_id"""
+    updates = ', '.join(f"t.{c} = :{c}" for c in PROCESS_COLUMNS if c != 'external_id')
+    columns = ', '.join(PROCESS_COLUMNS + ['created_at'])
+    values = ', '.join(f":{c}" for c in PROCESS_COLUMNS + ['created_at'])
+    statement = text(
+        f"MERGE INTO processes t USING (SELECT :external_id AS external_id FROM dual) s "
+        f"ON (t.external_id = s.external_id) "
+        f"WHEN MATCHED THEN UPDATE SET {updates} "
+        f"WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({values})"
+    )
+    # Tipos das colunas, para que booleanos e datas sejam convertidos como no ORM
+    return statement.bindparams(*[
+        bindparam(c, type_=Process.__table__.c[c].type) for c in PROCESS_COLUMNS + ['created_at']
+    ])
+
+
+def _upsert_by_lookup(session, model, rows, key_columns, update_columns):
+    """
+    Insere ou atualiza linhas consultando as existentes pelas colunas-chave (sem índice único)
+
+    Returns:
+        list: ids das linhas, na ordem recebida
+    """
+    key_attrs = [getattr(model, c) for c in key_columns]
+    existing = {}
+    external_ids = {row['external_id'] for row in rows}
+    for row in session.execute(select(model.id, *key_attrs).where(model.external_id.in_(external_ids))):
+        existing.setdefault(tuple(row[1:]), row[0])
+
+    ids = [existing.get(tuple(row[c] for c in key_columns)) for row in rows]
+    updates = [dict({c: row[c] for c in update_columns}, id=row_id) for row, row_id in zip(rows, ids) if row_id]
+    if updates:
+        session.execute(update(model), updates)
+    new_rows = [row for row, row_id in zip(rows, ids) if not row_id]
+    if new_rows:
+        new_ids = iter(session.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True), new_rows
+        ).scalars().all())
+        ids = [row_id or next(new_ids) for row_id in ids]
+    return ids
+
+
+class ProcessBatchWriter:
+    """
+    Gravação em segundo plano (write-behind) dos processos extraídos, em lotes
+
+    submit apenas enfileira o processo: a thread de extração nunca espera pelo banco. Uma
+    thread própria junta até batch_size processos (ou o que chegar em flush_seconds) e grava
+    o lote em uma única transação: processos com upsert nativo do dialeto (INSERT ... ON
+    CONFLICT no SQLite, MERGE no Oracle), acordos, índice de titulares e avaliações
+    pendentes em operações de lote. Se o lote falhar, cada processo é gravado de novo na
+    sua própria transação e as falhas são informadas uma a uma.
+
+    Os callbacks (ex.: o checkpoint da extração, que grava no banco) rodam sempre na thread
+    de gravação, inclusive para as falhas informadas pela extração com fail.
+    """
+
+    def __init__(self, on_saved=None, on_failed=None, on_received=None, batch_size=WRITE_BATCH_SIZE,
+                 flush_seconds=WRITE_FLUSH_SECONDS):
+        """
+        Args:
+            on_saved (callable): Recebe a lista de process_ids gravados em cada lote
+            on_failed (callable): Recebe (process_id, erro) de cada processo não gravado
+            on_received (callable): Recebe a lista de process_ids de cada lote antes da gravação
+            batch_size (int): Processos por transação
+            flush_seconds (float): Tempo máximo que um processo espera na fila por um lote cheio
+        """
+        self.Session = get_session_factory()
+        self.on_saved = on_saved
+        self.on_failed = on_failed
+        self.on_received = on_received
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = flush_seconds
+        self.saved = 0
+        self.failed = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def submit(self, process_id, process_details, grid_data):
+        """Enfileira um processo para gravação (não bloqueia: a fila não tem limite)"""
+        self._ensure_thread()
+        self._queue.put((process_id, process_details, grid_data))
+
+    def fail(self, process_id, error):
+        """Enfileira um processo que não será gravado; on_failed é chamado pela thread de gravação"""
+        self._ensure_thread()
+        self._queue.put(_Failure(process_id, error))
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='process-batch-writer', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Aguarda a gravação de todos os processos já enfileirados"""
+        if self._thread is None:
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self):
+        """Grava o que estiver na fila e encerra a thread de gravação"""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join()
+        logger.info(f"Gravação em lote encerrada: {self.saved} processos salvos, {self.failed} falhas, "
+                    f"{self.batches} lotes")
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # Prazo do lote vencido
+
+            if isinstance(item, _Failure):
+                self._notify(self.on_failed, item.process_id, item.error)
+                self._queue.task_done()
+                continue
+
+            is_entry = isinstance(item, tuple)
+            if is_entry:
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+            if pending and (not is_entry or len(pending) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(pending)
+                for _ in pending:
+                    self._queue.task_done()
+                pending, deadline = [], None
+            if item is _FLUSH or item is _STOP:
+                self._queue.task_done()
+            if item is _STOP:
+                return
+
+    def _write(self, entries):
+        """Grava um lote; se falhar, grava cada processo separadamente"""
+        self._notify(self.on_received, [process_id for process_id, _, _ in entries])
+        rows = {}
+        for process_id, process_details, grid_data in entries:
+            try:
+                if not process_details or not grid_data:
+                    raise ValueError("Detalhes do processo ou dados do grid não encontrados")
+                # Um processo repetido no lote fica com a última extração
+                rows[process_id] = build_process_rows(process_details, grid_data, process_id)
+            except Exception as e:
+                self._report_failure(process_id, e)
+        if not rows:
+            return
+
+        try:
+            self._apply(list(rows.values()), native=True)
+            self._report_saved(list(rows))
+            return
+        except Exception as e:
+            logger.warning(f"Falha ao gravar lote de {len(rows)} processos, gravando um a um: {str(e)}")
+
+        for process_id, row in rows.items():
+            try:
+                self._apply([row], native=False)
+                self._report_saved([process_id])
+            except Exception as e:
+                self._report_failure(process_id, e)
+
+    def _apply(self, rows, native):
+        """
+        Grava processos, acordos, chaves do índice e avaliações pendentes em uma transação
+
+        Args:
+            native (bool): Upsert nativo do dialeto nos processos (exige o índice único em
+                processes.external_id no SQLite); False consulta os existentes antes
+        """
+        session = self.Session()
+        try:
+            processes = [row['process'] for row in rows]
+            if native:
+                self._upsert_processes(session, processes)
+            else:
+                _upsert_by_lookup(session, Process, processes, ('external_id',), PROCESS_COLUMNS)
+
+            agreements = [row['agreement'] for row in rows if row['agreement']]
+            if agreements:
+                # Import local: titular_index depende do pacote scraper, que importa este módulo
+                from database.titular_index import index_agreement_rows
+                ids = _upsert_by_lookup(session, Agreement, agreements, AGREEMENT_KEY, AGREEMENT_UPDATE_COLUMNS)
+                index_agreement_rows(session, [dict(agreement, id=agreement_id)
+                                               for agreement, agreement_id in zip(agreements, ids)])
+
+            suspeitos = [row for row in rows if row['process']['suspeita_fraude']]
+            if suspeitos:
+                pendentes = set(session.scalars(
+                    select(FraudAssessment.external_id).where(
+                        FraudAssessment.external_id.in_([row['process']['external_id'] for row in suspeitos]),
+                        FraudAssessment.assessment_result == 'Pendente'
+                    )
+                ))
+                novas = [{
+                    'external_id': row['process']['external_id'],
+                    'process_number': row['process']['numero'],
+                    'assessment_result': 'Pendente',
+                    'suspicion_reason': row['suspicion_reason']
+                } for row in suspeitos if row['process']['external_id'] not in pendentes]
+                if novas:
+                    session.execute(insert(FraudAssessment), novas)
+                    refresh_current_assessments(session, [nova['external_id'] for nova in novas])
+
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def _upsert_processes(session, processes):
+        dialect = session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            statement = sqlite_insert(Process)
+            statement = statement.on_conflict_do_update(
+                index_elements=[Process.external_id],
+                set_={c: statement.excluded[c] for c in PROCESS_COLUMNS if c != 'external_id'}
+            )
+            session.execute(statement, processes)
+        elif dialect == 'oracle':
+            now = datetime.now()
+            session.execute(_process_merge_statement(), [dict(process, created_at=now) for process in processes])
+        else:
+            _upsert_by_lookup(session, Process, processes, ('external_id',), PROCESS_COLUMNS)
+
+    def _report_saved(self, process_ids):
+        self.saved += len(process_ids)
+        self.batches += 1
+        logger.info(f"Lote de {len(process_ids)} processos salvo no banco")
+        if self.on_saved is not None:
+            try:
+                self.on_saved(process_ids)
+            except Exception as e:
+                logger.error(f"Erro ao registrar processos salvos: {str(e)}")
+
+    def _report_failure(self, process_id, error):
+        self.failed += 1
+        logger.error(f"Erro ao salvar processo {process_id}: {str(error)}")
+        self._notify(self.on_failed, process_id, error)
+
+    @staticmethod
+    def _notify(callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Erro ao registrar o estado dos processos: {str(e)}")
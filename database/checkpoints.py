@@ -0,0 +1,223 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from database.db_manager import get_session_factory
+from database.models import ExtractionRun, ExtractionRunProcess
+from config import get_logger, CHECKPOINT_MAX_AGE_HOURS
+
+logger = get_logger(__name__)
+
+# Estados de um processo dentro de uma execução
+STATE_CATALOGUED = 'Catalogado'
+STATE_SCRAPED = 'Extraído'
+STATE_SAVED = 'Salvo'
+STATE_FAILED = 'Falha'
+
+
+def _filters_hash(filters):
+    return hashlib.sha256(json.dumps(filters, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ExtractionCheckpoint:
+    """
+    Checkpoint persistente de uma execução de catalogação/extração
+
+    Guarda os filtros da busca, a última página catalogada e o estado de cada processo
+    (Catalogado, Extraído, Salvo, Falha). Uma nova busca com os mesmos filtros retoma a
+    execução não concluída mais recente, em vez de recomeçar da página 1.
+    """
+
+    def __init__(self, run_id):
+        self.Session = get_session_factory()
+        self.run_id = run_id
+
+    @classmethod
+    def open(cls, filters, max_age_hours=CHECKPOINT_MAX_AGE_HOURS):
+        """
+        Retoma a execução não concluída com os mesmos filtros ou inicia uma nova
+
+        Args:
+            filters (dict): Filtros da busca
+            max_age_hours (int): Execuções mais antigas que isso não são retomadas
+        """
+        filters_hash = _filters_hash(filters)
+        session = get_session_factory()()
+        try:
+            limit = datetime.now() - timedelta(hours=max_age_hours)
+            run = session.query(ExtractionRun)\
+                .filter(ExtractionRun.filters_hash == filters_hash,
+                        ExtractionRun.status != 'Concluída',
+                        ExtractionRun.updated_at >= limit)\
+                .order_by(ExtractionRun.id.desc())\
+                .first()
+            if run is not None:
+                run.status = 'Em Andamento'
+                session.commit()
+                logger.info(f"Retomando execução {run.id} a partir da página {run.last_page + 1}")
+            else:
+                run = ExtractionRun(
+                    filters_hash=filters_hash,
+                    filters=json.dumps(filters, sort_keys=True, default=str),
+                    status='Em Andamento',
+                    last_page=0,
+                    catalog_complete=False
+                )
+                session.add(run)
+                session.commit()
+                logger.info(f"Nova execução de extração {run.id} registrada")
+            return cls(run.id)
+        finally:
+            session.close()
+
+    def _get_run(self, session):
+        return session.get(ExtractionRun, self.run_id)
+
+    @property
+    def last_page(self):
+        session = self.Session()
+        try:
+            return self._get_run(session).last_page or 0
+        finally:
+            session.close()
+
+    @property
+    def catalog_complete(self):
+        session = self.Session()
+        try:
+            return bool(self._get_run(session).catalog_complete)
+        finally:
+            session.close()
+
+    def load_entries(self):
+        """
+        Retorna os processos já catalogados, na ordem do catálogo
+
+        Returns:
+            list: Tuplas (process_id, details_url, cell_data, state)
+        """
+        session = self.Session()
+        try:
+            rows = session.query(ExtractionRunProcess)\
+                .filter(ExtractionRunProcess.run_id == self.run_id)\
+                .order_by(ExtractionRunProcess.position)\
+                .all()
+            return [
+                (str(row.external_id), row.details_url, json.loads(row.cell_data or '[]'), row.state)
+                for row in rows
+            ]
+        finally:
+            session.close()
+
+    def record_page(self, page, total_pages, page_rows):
+        """
+        Registra os processos de uma página catalogada e avança a última página
+
+        Args:
+            page (int): Número da página
+            total_pages (int): Total de páginas do grid
+            page_rows (list): Tuplas (process_id, details_url, cell_data) da página
+        """
+        session = self.Session()
+        try:
+            run = self._get_run(session)
+            known_ids = {external_id for (external_id,) in session.query(ExtractionRunProcess.external_id)
+                         .filter(ExtractionRunProcess.run_id == self.run_id,
+                                 ExtractionRunProcess.external_id.in_([int(pid) for pid, _, _ in page_rows]))}
+            position = session.query(func.count(ExtractionRunProcess.id))\
+                .filter(ExtractionRunProcess.run_id == self.run_id).scalar()
+
+            for process_id, details_url, cell_data in page_rows:
+                if int(process_id) in known_ids:
+                    continue
+                known_ids.add(int(process_id))
+                session.add(ExtractionRunProcess(
+                    run_id=self.run_id,
+                    external_id=int(process_id),
+                    position=position,
+                    page=page,
+                    details_url=details_url,
+                    cell_data=json.dumps(cell_data, ensure_ascii=False),
+                    state=STATE_CATALOGUED
+                ))
+                position += 1
+
+            run.last_page = page
+            run.total_pages = total_pages
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Erro ao gravar checkpoint da página {page}: {str(e)}")
+        finally:
+            session.close()
+
+    def finish_catalog(self):
+        """Marca a catalogação como concluída (todas as páginas percorridas)"""
+        session = self.Session()
+        try:
+            self._get_run(session).catalog_complete = True
+            session.commit()
+        finally:
+            session.close()
+
+    def mark(self, process_id, state, error=None):
+        """Atualiza o estado de um processo da execução"""
+        session = self.Session()
+        try:
+            session.query(ExtractionRunProcess)\
+                .filter(ExtractionRunProcess.run_id == self.run_id,
+                        ExtractionRunProcess.external_id == int(process_id))\
+                .update({'state': state, 'error': str(error)[:500] if error else None,
+                         'updated_at': datetime.now()}, synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Erro ao atualizar checkpoint do processo {process_id}: {str(e)}")
+        finally:
+            session.close()
+
+    def mark_many(self, process_ids, state, batch_size=500):
+        """Atualiza o estado de vários processos da execução, em lotes"""
+        ids = [int(process_id) for process_id in process_ids]
+        if not ids:
+            return
+        session = self.Session()
+        try:
+            for i in range(0, len(ids), batch_size):
+                session.query(ExtractionRunProcess)\
+                    .filter(ExtractionRunProcess.run_id == self.run_id,
+                            ExtractionRunProcess.external_id.in_(ids[i:i + batch_size]))\
+                    .update({'state': state, 'error': None, 'updated_at': datetime.now()},
+                            synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Erro ao atualizar checkpoint de {len(ids)} processos: {str(e)}")
+        finally:
+            session.close()
+
+    def pending_count(self):
+        """Quantidade de processos ainda não salvos (não processados ou com falha)"""
+        session = self.Session()
+        try:
+            return session.query(func.count(ExtractionRunProcess.id))\
+                .filter(ExtractionRunProcess.run_id == self.run_id,
+                        ExtractionRunProcess.state.in_([STATE_CATALOGUED, STATE_SCRAPED, STATE_FAILED]))\
+                .scalar()
+        finally:
+            session.close()
+
+    def is_complete(self):
+        """Execução concluída: catálogo completo e todos os processos salvos"""
+        return self.catalog_complete and self.pending_count() == 0
+
+    def close(self, interrupted=False):
+        """Encerra a execução como Concluída ou Interrompida (esta pode ser retomada depois)"""
+        session = self.Session()
+        try:
+            run = self._get_run(session)
+            run.status = 'Interrompida' if interrupted else 'Concluída'
+            session.commit()
+            logger.info(f"Execução {self.run_id} encerrada como {run.status}")
+        finally:
+            session.close()
@@ -0,0 +1,49 @@
+from datetime import datetime
+from sqlalchemy import delete, insert, select
+from database.models import FraudAssessment, CurrentAssessment
+
+# Processos por consulta ao recalcular a avaliação atual
+REFRESH_CHUNK_SIZE = 500
+
+
+def refresh_current_assessments(bind, external_ids):
+    """
+    Recalcula a avaliação atual (current_assessments) dos processos informados
+
+    Roda na transação do chamador (Session ou Connection), depois das alterações em
+    fraud_assessments: a fila de fraude e o histórico mudam juntos ou não mudam. A avaliação
+    atual é a de assessment_date mais recente (empate: a de maior id); processos sem
+    nenhuma avaliação saem da fila.
+
+    Args:
+        bind: Session ou Connection da transação
+        external_ids (iterable): IDs externos dos processos alterados
+    """
+    ids = sorted({int(external_id) for external_id in external_ids})
+    for i in range(0, len(ids), REFRESH_CHUNK_SIZE):
+        chunk = ids[i:i + REFRESH_CHUNK_SIZE]
+        latest = {}
+        rows = bind.execute(
+            select(FraudAssessment.id, FraudAssessment.external_id, FraudAssessment.process_number,
+                   FraudAssessment.assessment_result, FraudAssessment.reason_conclusion,
+                   FraudAssessment.suspicion_reason, FraudAssessment.username, FraudAssessment.assessment_date)
+            .where(FraudAssessment.external_id.in_(chunk))
+            .order_by(FraudAssessment.external_id, FraudAssessment.assessment_date.desc(), FraudAssessment.id.desc())
+        )
+        for row in rows:
+            latest.setdefault(row.external_id, row)
+
+        bind.execute(delete(CurrentAssessment.__table__).where(CurrentAssessment.external_id.in_(chunk)))
+        if latest:
+            now = datetime.now()
+            bind.execute(insert(CurrentAssessment.__table__), [{
+                'external_id': row.external_id,
+                'assessment_id': row.id,
+                'process_number': row.process_number,
+                'assessment_result': row.assessment_result,
+                'reason_conclusion': row.reason_conclusion,
+                'suspicion_reason': row.suspicion_reason,
+                'username': row.username,
+                'assessment_date': row.assessment_date,
+                'updated_at': now,
+            } for row in latest.values()])
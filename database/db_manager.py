@@ -1,65 +1,277 @@
 import logging
 import os
+import threading
+import time
 from datetime import datetime
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker, selectinload
+from sqlalchemy.pool import QueuePool
 from database.models import Base, Process, Agreement, FraudAssessment
-from config import get_logger
+from database.migrations import upgrade_schema
+from database.money import valor_to_cents
+from database.current_assessment import refresh_current_assessments
+from config import (
+    get_logger, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
 
 logger = get_logger(__name__)
 
-class DatabaseManager:
-    def __init__(self):
-        self.engine = None
-        self.Session = None
-        self.session = None
-        self._initialize_database()
-
-    def _initialize_database(self):
-        """Initialize database connection based on environment configuration"""
-        # Fallback to SQLite by default
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        data_dir = os.path.join(base_dir, 'database')
-        sqlite_path = os.path.join(data_dir, 'processes.db')
-        
+# Colunas de um acordo existente atualizadas quando o processo é extraído de novo (a chave é
+# external_id, cpf_cnpj_titular e valor)
+AGREEMENT_UPDATE_COLUMNS = ('advogados_adversos', 'nome_titular', 'valor', 'valor_centavos', 'data_pagamento')
+
+# Engine e fábrica de sessões compartilhados por todo o processo
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+# Estatísticas de espera no checkout de conexões do pool
+_pool_stats = {
+    'checkouts': 0,
+    'total_wait': 0.0,
+    'max_wait': 0.0
+}
+_pool_stats_lock = threading.Lock()
+
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera de cada checkout de conexão"""
+
+    def _do_get(self):
+        start = time.perf_counter()
         try:
-            # Try Oracle connection first if configured
-            oracle_connection = os.getenv('ORACLE_CONNECTION_STRING')
-            if oracle_connection:
-                self.engine = create_engine(oracle_connection)
-                # Test connection
-                self.engine.connect()
-                logger.info("Successfully connected to Oracle database")
-                return
-                
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - start
+            with _pool_stats_lock:
+                _pool_stats['checkouts'] += 1
+                _pool_stats['total_wait'] += wait
+                _pool_stats['max_wait'] = max(_pool_stats['max_wait'], wait)
+
+
+def _pool_options():
+    """Opções de pool comuns aos caminhos SQLite e Oracle"""
+    return {
+        'poolclass': _TimedQueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING
+    }
+
+
+def _create_engine():
+    """Cria o engine conforme a configuração de ambiente (Oracle ou SQLite)"""
+    # Tenta primeiro a conexão Oracle, se configurada
+    oracle_connection = os.getenv('ORACLE_CONNECTION_STRING')
+    if oracle_connection:
+        try:
+            engine = create_engine(oracle_connection, **_pool_options())
+            # Testa a conexão
+            with engine.connect():
+                pass
+            logger.info("Successfully connected to Oracle database")
+            return engine
         except Exception as e:
             logger.warning(f"Failed to connect to Oracle: {str(e)}")
-        
-        # If we get here, either there was no Oracle connection string or connection failed
-        # Create data directory if it doesn't exist
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-            logger.info(f"Created data directory at {data_dir}")
-        
-        # Criar ou conectar ao banco SQLite existente
-        self.engine = create_engine(f'sqlite:///{sqlite_path}')
-        logger.info(f"Using SQLite database at {sqlite_path}")
-
-        # Criar tabelas apenas se não existirem
-        inspector = inspect(self.engine)
-        if len(inspector.get_table_names()) == 0:
-            Base.metadata.create_all(self.engine)
-            logger.info("Created database tables")
-            
-            # Log das tabelas criadas
-            tables = inspector.get_table_names()
-            for table in tables:
-                columns = [col['name'] for col in inspector.get_columns(table)]
-                logger.info(f"Table {table} created with columns: {columns}")
-        else:
-            logger.info("Using existing database tables")
-        
-        self.Session = sessionmaker(bind=self.engine)
+
+    # Fallback para SQLite
+    base_dir = os.path.dirname(os.path.dirname(__file__))
+    data_dir = os.path.join(base_dir, 'database')
+    sqlite_path = os.getenv('SQLITE_DATABASE_PATH') or os.path.join(data_dir, 'processes.db')
+
+    # Cria o diretório de dados se não existir
+    sqlite_dir = os.path.dirname(sqlite_path)
+    if sqlite_dir and not os.path.exists(sqlite_dir):
+        os.makedirs(sqlite_dir)
+        logger.info(f"Created data directory at {sqlite_dir}")
+
+    # Criar ou conectar ao banco SQLite existente
+    engine = create_engine(f'sqlite:///{sqlite_path}', **_pool_options())
+
+    # Modo WAL: leituras longas em streaming (ex.: recertificação) não bloqueiam os commits de outra sessão
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.close()
+
+    logger.info(f"Using SQLite database at {sqlite_path}")
+    return engine
+
+
+def _ensure_schema(engine):
+    """Verifica o schema uma única vez, criando as tabelas que ainda não existirem"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing_tables = [table for name, table in Base.metadata.tables.items() if name not in existing_tables]
+    if missing_tables:
+        Base.metadata.create_all(engine, tables=missing_tables)
+        logger.info("Created database tables")
+
+        # Log das tabelas criadas
+        inspector = inspect(engine)
+        for table in missing_tables:
+            columns = [col['name'] for col in inspector.get_columns(table.name)]
+            logger.info(f"Table {table.name} created with columns: {columns}")
+    else:
+        logger.info("Using existing database tables")
+
+    # Colunas adicionadas aos modelos depois da criação das tabelas (todas anuláveis)
+    for name, table in Base.metadata.tables.items():
+        if name not in existing_tables:
+            continue
+        existing_columns = {col['name'] for col in inspector.get_columns(name)}
+        for column in table.columns:
+            if column.name in existing_columns or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {name} ADD {column.name} {column_type}'))
+            logger.info(f"Column {name}.{column.name} added")
+
+    # Índices e restrições das bases existentes, por versão
+    upgrade_schema(engine)
+
+
+def get_engine():
+    """Retorna o engine compartilhado, criando-o (e verificando o schema) na primeira chamada"""
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = _create_engine()
+                _ensure_schema(engine)
+                _session_factory = sessionmaker(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def get_session_factory():
+    """Retorna a fábrica de sessões compartilhada"""
+    get_engine()
+    return _session_factory
+
+
+def dispose_engine():
+    """Descarta o engine compartilhado (ex.: após fork de processo ou em testes)"""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+
+
+def get_pool_status():
+    """
+    Retorna estatísticas do pool de conexões compartilhado
+
+    Returns:
+        dict: Tamanho do pool, conexões em uso/livres, overflow e tempos de espera no checkout
+    """
+    pool = get_engine().pool
+    with _pool_stats_lock:
+        checkouts = _pool_stats['checkouts']
+        total_wait = _pool_stats['total_wait']
+        max_wait = _pool_stats['max_wait']
+    return {
+        'dialect': _engine.dialect.name,
+        'pool_size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'max_overflow': DB_MAX_OVERFLOW,
+        'checkouts': checkouts,
+        'avg_checkout_wait_ms': (total_wait / checkouts * 1000) if checkouts else 0.0,
+        'max_checkout_wait_ms': max_wait * 1000
+    }
+
+
+def _parse_data_cadastro(data_cadastro_str):
+    """Data de cadastro no formato "DD/MM/YYYY HH:MM" ou apenas "DD/MM/YYYY" (None se inválida)"""
+    if not data_cadastro_str:
+        return None
+    try:
+        data_cadastro = datetime.strptime(data_cadastro_str, '%d/%m/%Y %H:%M')
+        logger.info(f"Data de cadastro processada: {data_cadastro}")
+        return data_cadastro
+    except ValueError:
+        try:
+            data_cadastro = datetime.strptime(data_cadastro_str.split()[0], '%d/%m/%Y')
+            logger.info(f"Data de cadastro processada (apenas data): {data_cadastro}")
+            return data_cadastro
+        except ValueError:
+            logger.warning(f"Não foi possível processar a data de cadastro: {data_cadastro_str}")
+            return None
+
+
+def build_process_rows(process_details, grid_data, process_id):
+    """
+    Monta as linhas do processo e do acordo a partir dos detalhes extraídos e do grid
+
+    Usado por DatabaseManager.save_process_data e pela gravação em lote (ProcessBatchWriter).
+
+    Returns:
+        dict: 'process' (colunas de processes), 'agreement' (colunas de agreements ou None)
+              e 'suspicion_reason' (motivo da suspeita de fraude, se houver)
+    """
+    processo_info = process_details.get('processo', {})
+    detalhes_acordo = process_details.get('detalhes_acordo', {}).get('acordo', [])
+    advogados_adversos = ', '.join(
+        [adv.get('nome', '') for adv in process_details.get('partes', {}).get('advogados_adversos', [])]
+    )
+
+    # Determina tem_acordo e suspeita_fraude do primeiro acordo se existir
+    tem_acordo = False
+    suspeita_fraude = False
+    if detalhes_acordo:
+        tem_acordo = detalhes_acordo.get('is_acordo') == 'Sim'
+        suspeita_fraude = detalhes_acordo.get('suspeita_fraude') == 'Sim'
+
+    process = {
+        'external_id': int(process_id),
+        'numero': grid_data[2],  # Número do processo
+        'parte_adversa': grid_data[3],  # Nome da parte adversa
+        'cpf_cnpj_parte_adverso': grid_data[4],  # CPF/CNPJ
+        'comarca': grid_data[5],  # Comarca
+        'estado': grid_data[6],  # Estado
+        'escritorio_celula': processo_info.get('escritorio_celula'),  # Escritório
+        'status': grid_data[8],  # Status
+        'fase': processo_info.get('fase', ''),  # Fase do processo
+        'advogados_adversos': advogados_adversos,
+        'tem_acordo': tem_acordo,  # Acordo
+        'suspeita_fraude': suspeita_fraude,  # Suspeita de Fraude
+        'data_cadastro': _parse_data_cadastro(processo_info.get('data_cadastro', '').strip())  # Data de cadastro
+    }
+
+    agreement = None
+    if detalhes_acordo:
+        data_pagamento = detalhes_acordo.get('data_pagamento')
+        agreement = {
+            'external_id': int(process_id),
+            'advogados_adversos': advogados_adversos,
+            'nome_titular': detalhes_acordo.get('nome_titular'),
+            'cpf_cnpj_titular': detalhes_acordo.get('cpf_titular'),
+            'valor': detalhes_acordo.get('valor'),
+            'valor_centavos': valor_to_cents(detalhes_acordo.get('valor')),
+            'data_pagamento': datetime.strptime(data_pagamento, '%d/%m/%Y %H:%M') if data_pagamento else None
+        }
+
+    return {
+        'process': process,
+        'agreement': agreement,
+        'suspicion_reason': (detalhes_acordo or {}).get('motivo_suspeita')
+    }
+
+
+class DatabaseManager:
+    def __init__(self):
+        # Engine e fábrica de sessões são compartilhados; apenas a sessão é por instância
+        self.engine = get_engine()
+        self.Session = get_session_factory()
         self.session = self.Session()
 
     def save_process_data(self, raw_data, grid_data, process_id):
@@ -87,103 +299,51 @@ class DatabaseManager:
                 logger.error("Dados do grid não encontrados")
                 return None
 
-            # Obtém valores do processo
-            processo_info = process_details.get('processo', {})
-            detalhes_acordo = process_details.get('detalhes_acordo', {}).get('acordo', [])
-            
-            # Processa a data de cadastro
-            data_cadastro_str = processo_info.get('data_cadastro', '').strip()
-            data_cadastro = None
-            if data_cadastro_str:
-                try:
-                    # Tenta fazer o parse da data no formato "DD/MM/YYYY HH:MM"
-                    data_cadastro = datetime.strptime(data_cadastro_str, '%d/%m/%Y %H:%M')
-                    logger.info(f"Data de cadastro processada: {data_cadastro}")
-                except ValueError:
-                    try:
-                        # Tenta fazer o parse apenas da data no formato "DD/MM/YYYY"
-                        data_cadastro = datetime.strptime(data_cadastro_str.split()[0], '%d/%m/%Y')
-                        logger.info(f"Data de cadastro processada (apenas data): {data_cadastro}")
-                    except ValueError:
-                        logger.warning(f"Não foi possível processar a data de cadastro: {data_cadastro_str}")
-            
-            # Determina tem_acordo e suspeita_fraude do primeiro acordo se existir
-            tem_acordo = False
-            suspeita_fraude = False
-            if detalhes_acordo:
-                tem_acordo = detalhes_acordo.get('is_acordo') == 'Sim'
-                suspeita_fraude = detalhes_acordo.get('suspeita_fraude') == 'Sim'
+            rows = build_process_rows(process_details, grid_data, process_id)
 
             # Cria ou atualiza o processo com os dados do grid
             process = self.session.query(Process).filter_by(external_id=process_id).first()
             if not process:
-                process = Process(
-                    external_id=process_id,
-                    numero=grid_data[2],  # Número do processo
-                    parte_adversa=grid_data[3],  # Nome da parte adversa
-                    cpf_cnpj_parte_adverso=grid_data[4],  # CPF/CNPJ
-                    comarca=grid_data[5],  # Comarca
-                    estado=grid_data[6],  # Estado
-                    escritorio_celula=processo_info.get('escritorio_celula'),  # Escritório
-                    status=grid_data[8],  # Status
-                    fase=processo_info.get('fase', ''),  # Fase do processo
-                    advogados_adversos=', '.join([adv.get('nome', '') for adv in process_details.get('partes', {}).get('advogados_adversos', [])]), 
-                    tem_acordo=tem_acordo,  # Acordo
-                    suspeita_fraude=suspeita_fraude,  # Suspeita de Fraude
-                    data_cadastro=data_cadastro  # Data de cadastro
-                )
+                process = Process(**rows['process'])
                 self.session.add(process)
                 logger.info(f"Novo processo criado: {process.numero}")
             else:
                 # Atualiza os dados do processo
-                process.numero = grid_data[2]
-                process.parte_adversa = grid_data[3]
-                process.cpf_cnpj_parte_adverso = grid_data[4]
-                process.comarca = grid_data[5]
-                process.estado = grid_data[6]
-                process.escritorio_celula = processo_info.get('escritorio_celula')
-                process.status = grid_data[8]
-                process.fase = processo_info.get('fase', '')
-                process.advogados_adversos = ', '.join([adv.get('nome', '') for adv in process_details.get('partes', {}).get('advogados_adversos', [])])
-                process.tem_acordo = tem_acordo
-                process.suspeita_fraude = suspeita_fraude
-                process.data_cadastro = data_cadastro  # Data de cadastro
+                for column, value in rows['process'].items():
+                    setattr(process, column, value)
                 logger.info(f"Processo atualizado: {process.numero}")
 
             # Salva o acordo
-            if detalhes_acordo:
-                acordo_data = detalhes_acordo
+            acordo_data = rows['agreement']
+            if acordo_data:
                 # Verifica se já existe um acordo com os mesmos dados
                 existing_agreement = self.session.query(Agreement)\
                     .filter_by(
                         external_id=process.external_id,
-                        cpf_cnpj_titular=acordo_data.get('cpf_titular'),
-                        valor=detalhes_acordo.get('valor')
+                        cpf_cnpj_titular=acordo_data['cpf_cnpj_titular'],
+                        valor=acordo_data['valor']
                     ).first()
 
                 if not existing_agreement:
                     # Cria um novo acordo
-                    agreement = Agreement(
-                external_id=process.external_id,
-                        advogados_adversos=', '.join([adv.get('nome', '') for adv in process_details.get('partes', {}).get('advogados_adversos', [])]),
-                        nome_titular=acordo_data.get('nome_titular'),
-                        cpf_cnpj_titular=acordo_data.get('cpf_titular'),
-                        valor=acordo_data.get('valor'),
-                        data_pagamento=datetime.strptime(acordo_data.get('data_pagamento'), '%d/%m/%Y %H:%M') if acordo_data.get('data_pagamento') else None
-                    )
+                    agreement = Agreement(**acordo_data)
                     self.session.add(agreement)
                     logger.info(f"Novo acordo criado para o processo {process.numero}")
                 else:
                     # Atualiza o acordo existente
-                    existing_agreement.advogados_adversos = ', '.join([adv.get('nome', '') for adv in process_details.get('partes', {}).get('advogados_adversos', [])])
-                    existing_agreement.nome_titular = acordo_data.get('nome_titular')
-                    existing_agreement.valor = acordo_data.get('valor')
-                    existing_agreement.data_pagamento = datetime.strptime(acordo_data.get('data_pagamento'), '%d/%m/%Y %H:%M') if acordo_data.get('data_pagamento') else None
+                    agreement = existing_agreement
+                    for column in AGREEMENT_UPDATE_COLUMNS:
+                        setattr(existing_agreement, column, acordo_data[column])
                     logger.info(f"Acordo atualizado para o processo {process.numero}")
 
+                # Atualiza o índice de titulares (import local: titular_index depende do pacote scraper)
+                from database.titular_index import index_agreement
+                self.session.flush()
+                index_agreement(self.session, agreement)
+
             # Se houver suspeita de fraude, cria uma avaliação inicial
             if process.suspeita_fraude:
-                self.create_initial_fraud_assessment(process)
+                self.create_initial_fraud_assessment(process, rows['suspicion_reason'])
 
             self.session.commit()
             logger.info(f"Dados do processo {process.numero} salvos com sucesso")
@@ -194,8 +354,8 @@ class DatabaseManager:
             logger.error(f"Erro ao salvar dados do processo: {str(e)}")
             return None
 
-    def create_initial_fraud_assessment(self, process):
-        """Cria uma avaliação de fraude inicial para um processo"""
+    def create_initial_fraud_assessment(self, process, suspicion_reason=None):
+        """Cria uma avaliação de fraude inicial para um processo, com o motivo da suspeita"""
         try:
             # Verifica se já existe uma avaliação pendente
             existing_assessment = self.session.query(FraudAssessment)\
@@ -206,9 +366,11 @@ class DatabaseManager:
                 assessment = FraudAssessment(
                     external_id=process.external_id,
                     process_number=process.numero,
-                    assessment_result='Pendente'
+                    assessment_result='Pendente',
+                    suspicion_reason=suspicion_reason
                 )
                 self.session.add(assessment)
+                refresh_current_assessments(self.session, [process.external_id])
                 self.session.commit()
                 logger.info(f"Nova avaliação de fraude criada para o processo {process.numero}")
                 return assessment
@@ -238,65 +400,109 @@ class DatabaseManager:
             if not process:
                 return None
                 
-            # Converte para dicionário com todos os dados necessários
-            process_data = {
-                'id': process.id,
-                'external_id': process.external_id,
-                'numero': process.numero,
-                'parte_adversa': process.parte_adversa,
-                'cpf_cnpj_parte_adverso': process.cpf_cnpj_parte_adverso,
-                'comarca': process.comarca,
-                'estado': process.estado,
-                'escritorio_celula': process.escritorio_celula,
-                'status': process.status,
-                'fase': process.fase,
-                'advogados_adversos': [{'nome': adv.strip()} for adv in process.advogados_adversos.split(',')] if process.advogados_adversos else [],
-                'tem_acordo': process.tem_acordo,
-                'suspeita_fraude': process.suspeita_fraude,
-                'data_cadastro': process.data_cadastro.isoformat() if process.data_cadastro else None,
-                'created_at': process.created_at.isoformat() if process.created_at else None,
-                'partes': {
-                    'parte_adversa': process.parte_adversa,
-                    'cpf_cnpj_parte_adverso': process.cpf_cnpj_parte_adverso,
-                    'advogados_adversos': [{'nome': adv.strip()} for adv in process.advogados_adversos.split(',')] if process.advogados_adversos else []
-                },
-                'acordo': {}  # Lista vazia por padrão
-            }
-            
-            # Adiciona dados do acordo se existir
-            if process.agreements != []:
-                agreement = process.agreements[0]
-                process_data['acordo'] = {
-                    'id': agreement.external_id,
-                    'nome_titular': agreement.nome_titular,
-                    'cpf_cnpj_titular': agreement.cpf_cnpj_titular,
-                    'valor': agreement.valor,
-                    'data_pagamento': agreement.data_pagamento.strftime('%d/%m/%Y %H:%M') if agreement.data_pagamento else None,
-                    'advogados_adversos': [{'nome': adv.strip()} for adv in agreement.advogados_adversos.split(',')] if agreement.advogados_adversos else [],
-                    'is_acordo': process.tem_acordo,
-                    'suspeita_fraude': process.suspeita_fraude
-                }
-                
-                # Atualiza a lista de advogados na seção 'partes' com os advogados do primeiro acordo
-                if process.agreements[0].advogados_adversos:
-                    process_data['partes']['advogados_adversos'] = [
-                        {'nome': adv.strip()} 
-                        for adv in process.agreements[0].advogados_adversos.split(',')
-                    ]
-            
-            # Adiciona dados da avaliação de fraude mais recente se existir
-            if process.fraud_assessments:
-                latest_assessment = max(process.fraud_assessments, key=lambda x: x.assessment_date)
-                process_data.update({
-                    'assessment_result': latest_assessment.assessment_result,
-                    'reason_conclusion': latest_assessment.reason_conclusion,
-                    'assessment_date': latest_assessment.assessment_date.isoformat() if latest_assessment.assessment_date else None
-                })
-            
-            return process_data
+            return self._process_to_dict(process)
             
         except Exception as e:
             logger.error(f"Erro ao buscar processo no banco: {str(e)}")
             return None
         finally:
             session.close()
+
+    def get_processes_by_ids(self, external_ids, batch_size=50):
+        """
+        Busca vários processos pelo ID externo, com uma consulta IN (...) por lote
+        
+        Os relacionamentos (acordos e avaliações) são carregados antecipadamente
+        com selectinload, evitando uma consulta extra por processo.
+        
+        Args:
+            external_ids (list): IDs externos dos processos
+            batch_size (int): Quantidade de IDs por consulta (padrão: uma página do grid)
+            
+        Returns:
+            dict: Dados de cada processo encontrado, indexados pelo ID externo (str),
+                  no mesmo formato de get_process_by_id
+        """
+        found = {}
+        ids = [external_id for external_id in dict.fromkeys(external_ids) if external_id not in (None, '')]
+        if not ids:
+            return found
+
+        session = self.Session()
+        try:
+            for i in range(0, len(ids), batch_size):
+                batch = ids[i:i + batch_size]
+                processes = session.query(Process)\
+                    .options(selectinload(Process.agreements), selectinload(Process.fraud_assessments))\
+                    .filter(Process.external_id.in_(batch))\
+                    .all()
+                for process in processes:
+                    found[str(process.external_id)] = self._process_to_dict(process)
+
+            logger.debug(f"{len(found)} de {len(ids)} processos encontrados no banco")
+            return found
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar processos no banco: {str(e)}")
+            return found
+        finally:
+            session.close()
+
+    def _process_to_dict(self, process):
+        """Converte um processo (com acordos e avaliações) no dicionário usado pelo catálogo"""
+        # Converte para dicionário com todos os dados necessários
+        process_data = {
+            'id': process.id,
+            'external_id': process.external_id,
+            'numero': process.numero,
+            'parte_adversa': process.parte_adversa,
+            'cpf_cnpj_parte_adverso': process.cpf_cnpj_parte_adverso,
+            'comarca': process.comarca,
+            'estado': process.estado,
+            'escritorio_celula': process.escritorio_celula,
+            'status': process.status,
+            'fase': process.fase,
+            'advogados_adversos': [{'nome': adv.strip()} for adv in process.advogados_adversos.split(',')] if process.advogados_adversos else [],
+            'tem_acordo': process.tem_acordo,
+            'suspeita_fraude': process.suspeita_fraude,
+            'data_cadastro': process.data_cadastro.isoformat() if process.data_cadastro else None,
+            'created_at': process.created_at.isoformat() if process.created_at else None,
+            'partes': {
+                'parte_adversa': process.parte_adversa,
+                'cpf_cnpj_parte_adverso': process.cpf_cnpj_parte_adverso,
+                'advogados_adversos': [{'nome': adv.strip()} for adv in process.advogados_adversos.split(',')] if process.advogados_adversos else []
+            },
+            'acordo': {}  # Lista vazia por padrão
+        }
+        
+        # Adiciona dados do acordo se existir
+        if process.agreements != []:
+            agreement = process.agreements[0]
+            process_data['acordo'] = {
+                'id': agreement.external_id,
+                'nome_titular': agreement.nome_titular,
+                'cpf_cnpj_titular': agreement.cpf_cnpj_titular,
+                'valor': agreement.valor,
+                'data_pagamento': agreement.data_pagamento.strftime('%d/%m/%Y %H:%M') if agreement.data_pagamento else None,
+                'advogados_adversos': [{'nome': adv.strip()} for adv in agreement.advogados_adversos.split(',')] if agreement.advogados_adversos else [],
+                'is_acordo': process.tem_acordo,
+                'suspeita_fraude': process.suspeita_fraude
+            }
+            
+            # Atualiza a lista de advogados na seção 'partes' com os advogados do primeiro acordo
+            if process.agreements[0].advogados_adversos:
+                process_data['partes']['advogados_adversos'] = [
+                    {'nome': adv.strip()} 
+                    for adv in process.agreements[0].advogados_adversos.split(',')
+                ]
+        
+        # Adiciona dados da avaliação de fraude mais recente se existir
+        if process.fraud_assessments:
+            latest_assessment = max(process.fraud_assessments, key=lambda x: x.assessment_date)
+            process_data.update({
+                'assessment_result': latest_assessment.assessment_result,
+                'reason_conclusion': latest_assessment.reason_conclusion,
+                'assessment_date': latest_assessment.assessment_date.isoformat() if latest_assessment.assessment_date else None
+            })
+        
+        return process_data
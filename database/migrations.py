@@ -0,0 +1,174 @@
+from sqlalchemy import bindparam, delete, distinct, func, inspect, select, update
+from database.models import Base, Process, Agreement, FraudAssessment, SchemaVersion
+from database.money import valor_to_cents
+from database.current_assessment import refresh_current_assessments
+from config import get_logger
+
+logger = get_logger(__name__)
+
+# Linhas por transação nos preenchimentos de colunas novas
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def _create_missing_indexes(conn, table_name, index_names):
+    """Cria os índices declarados nos modelos que ainda não existem na tabela (DDL do dialeto)"""
+    existing = {index['name'] for index in inspect(conn).get_indexes(table_name)}
+    for index in Base.metadata.tables[table_name].indexes:
+        if index.name in index_names and index.name not in existing:
+            index.create(bind=conn)
+            logger.info(f"Índice {index.name} criado em {table_name}")
+
+
+def _lookup_indexes(conn):
+    _create_missing_indexes(conn, 'agreements', {'ix_agreements_ext_tit_valor'})
+    _create_missing_indexes(conn, 'fraud_assessments', {'ix_fraud_assess_ext_date'})
+
+
+def _unique_process_external_id(conn):
+    """Remove as linhas repetidas de processes e cria o índice único em external_id"""
+    table = Process.__table__
+    duplicated = conn.execute(
+        select(table.c.external_id, func.min(table.c.id).label('keep_id'))
+        .where(table.c.external_id.isnot(None))
+        .group_by(table.c.external_id)
+        .having(func.count(table.c.id) > 1)
+    ).all()
+    # Fica a linha mais antiga de cada external_id, a que a aplicação já lia e atualizava
+    # (filter_by(external_id=...).first()); acordos e avaliações se ligam pelo external_id
+    remove = delete(table).where(table.c.external_id == bindparam('b_external_id'),
+                                 table.c.id != bindparam('b_keep_id'))
+    for start in range(0, len(duplicated), BACKFILL_CHUNK_SIZE):
+        conn.execute(remove, [{'b_external_id': row.external_id, 'b_keep_id': row.keep_id}
+                              for row in duplicated[start:start + BACKFILL_CHUNK_SIZE]])
+        conn.commit()
+    if duplicated:
+        logger.warning(f"Linhas repetidas de {len(duplicated)} external_id removidas de processes")
+    _create_missing_indexes(conn, 'processes', {'ux_processes_external_id'})
+
+
+def _agreement_valor_centavos(conn):
+    """Preenche agreements.valor_centavos a partir de valor, em lotes confirmados um a um"""
+    table = Agreement.__table__
+    fill = update(table).where(table.c.id == bindparam('b_id')).values(valor_centavos=bindparam('b_centavos'))
+    last_id = 0
+    filled = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.valor)
+            .where(table.c.id > last_id, table.c.valor_centavos.is_(None), table.c.valor.isnot(None))
+            .order_by(table.c.id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        values = [{'b_id': row.id, 'b_centavos': valor_to_cents(row.valor)} for row in rows]
+        values = [value for value in values if value['b_centavos'] is not None]
+        if values:
+            conn.execute(fill, values)
+        # Cada lote é confirmado: a escrita não bloqueia o banco por toda a migração, e uma
+        # migração interrompida recomeça apenas das linhas ainda sem valor
+        conn.commit()
+        filled += len(values)
+    logger.info(f"{filled} acordos com valor_centavos preenchido")
+    _create_missing_indexes(conn, 'agreements', {'ix_agreements_valor_centavos'})
+
+
+def _current_assessments(conn):
+    """Preenche current_assessments com a avaliação mais recente de cada processo, em lotes"""
+    last_id = -1
+    filled = 0
+    while True:
+        ids = conn.execute(
+            select(distinct(FraudAssessment.external_id))
+            .where(FraudAssessment.external_id > last_id)
+            .order_by(FraudAssessment.external_id)
+            .limit(BACKFILL_CHUNK_SIZE)
+        ).scalars().all()
+        if not ids:
+            break
+        last_id = ids[-1]
+        refresh_current_assessments(conn, ids)
+        conn.commit()
+        filled += len(ids)
+    logger.info(f"Avaliação atual de {filled} processos registrada")
+
+
+def _current_assessment_process_index(conn):
+    _create_missing_indexes(conn, 'current_assessments', {'ix_current_assess_process'})
+
+
+def _titular_index_keys(conn):
+    """Recria o índice de titulares de todos os acordos, com as regras atuais das chaves"""
+    # Import local: titular_index depende do pacote scraper, que importa o db_manager
+    from database.titular_index import rebuild_index
+    rebuild_index(conn, BACKFILL_CHUNK_SIZE)
+
+
+# Migrações em ordem: (versão, descrição, função que recebe a conexão da transação).
+# Cada função precisa poder ser executada de novo (no Oracle, DDL faz commit implícito e uma
+# migração interrompida fica parcialmente aplicada, sem registro da versão) e não pode depender
+# de outra migração: a falha de uma não impede as seguintes. Migrações longas podem confirmar
+# em partes com conn.commit(); a versão é registrada no commit final. Uma mudança nas regras
+# das chaves do índice de titulares pede uma nova migração com _titular_index_keys.
+MIGRATIONS = [
+    (1, 'Índices de acordos (external_id, cpf_cnpj_titular, valor) e avaliações (external_id, assessment_date DESC)',
+     _lookup_indexes),
+    (2, 'Índice único em processes.external_id', _unique_process_external_id),
+    (3, 'Valor dos acordos em centavos (agreements.valor_centavos) e índice', _agreement_valor_centavos),
+    (4, 'Avaliação atual de cada processo (current_assessments)', _current_assessments),
+    (5, 'Índice da fila de fraude por número do processo (current_assessments)', _current_assessment_process_index),
+    (6, 'Índice de titulares preenchido para os acordos existentes (titular_index)', _titular_index_keys),
+]
+
+
+def applied_versions(engine):
+    """Versões de migração já registradas em schema_versions"""
+    with engine.connect() as conn:
+        return set(conn.execute(select(SchemaVersion.version)).scalars().all())
+
+
+def current_version(engine, migrations=MIGRATIONS):
+    """Maior versão até a qual todas as migrações foram aplicadas (0 se nenhuma)"""
+    return _contiguous_version(applied_versions(engine), migrations)
+
+
+def _contiguous_version(applied, migrations):
+    version = 0
+    for target, _, _ in migrations:
+        if target not in applied:
+            break
+        version = target
+    return version
+
+
+def upgrade_schema(engine, migrations=MIGRATIONS):
+    """
+    Aplica, em ordem, as migrações ainda não registradas em schema_versions
+
+    Cada migração roda em uma conexão própria e registra a versão no commit final. Se uma falhar, o
+    erro é registrado no log e as seguintes são aplicadas mesmo assim (ex.: o preenchimento de
+    current_assessments, lido pela fila de fraude, não espera o índice único de processes); a
+    migração que falhou é tentada de novo na próxima inicialização.
+
+    Args:
+        migrations (list): Migrações a aplicar (por padrão, MIGRATIONS)
+
+    Returns:
+        int: Maior versão até a qual todas as migrações foram aplicadas
+    """
+    applied = applied_versions(engine)
+    for target, description, migrate in migrations:
+        if target in applied:
+            continue
+        try:
+            with engine.connect() as conn:
+                migrate(conn)
+                conn.execute(SchemaVersion.__table__.insert().values(version=target, description=description))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Falha na migração {target} ({description}): {str(e)}; seguindo com as próximas")
+            continue
+        applied.add(target)
+        logger.info(f"Schema atualizado para a versão {target}: {description}")
+    return _contiguous_version(applied, migrations)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -7,6 +7,7 @@ Base = declarative_base()
 
 class Process(Base):
     __tablename__ = 'processes'
+    __table_args__ = (Index('ux_processes_external_id', 'external_id', unique=True),)
     
     id = Column(Integer, primary_key=True)
     external_id = Column(Integer)  # ID original do sistema (218158)
@@ -30,6 +31,12 @@ class Process(Base):
 
 class Agreement(Base):
     __tablename__ = 'agreements'
+    # Verificação de acordo existente em save_process_data; o prefixo external_id atende a chave estrangeira
+    # valor_centavos: somas, faixas e maiores valores nos relatórios (database/agreement_reports.py)
+    __table_args__ = (
+        Index('ix_agreements_ext_tit_valor', 'external_id', 'cpf_cnpj_titular', 'valor'),
+        Index('ix_agreements_valor_centavos', 'valor_centavos'),
+    )
     
     id = Column(Integer, primary_key=True)
     external_id = Column(Integer, ForeignKey('processes.external_id', ondelete='CASCADE'))
@@ -37,11 +44,14 @@ class Agreement(Base):
     nome_titular = Column(String(200))  # Nome do titular do acordo
     cpf_cnpj_titular = Column(String(20))  # CPF/CNPJ do titular
     valor = Column(String(100))  # Valor do acordo (mantido como string: "R$ 5.500,00")
+    valor_centavos = Column(BigInteger)  # Mesmo valor em centavos (550000), preenchido na gravação
     data_pagamento = Column(DateTime)  # Data de pagamento
+    assessment_hash = Column(String(64))  # Hash das entradas na última recertificação de fraude
     created_at = Column(DateTime, default=datetime.now)
     
-    # Relacionamento
+    # Relacionamentos
     process = relationship("Process", back_populates="agreements")
+    index_keys = relationship("TitularIndexKey", back_populates="agreement", cascade="all, delete-orphan")
 
 class FraudAssessment(Base):
     """Modelo para armazenar avaliações de fraude"""
@@ -53,6 +63,8 @@ class FraudAssessment(Base):
     assessment_date = Column(DateTime, nullable=False, default=datetime.utcnow)
     assessment_result = Column(Enum('Pendente', 'Positiva', 'Negativa', 'Falso Positivo', name='assessment_result_enum'), nullable=False, default='Pendente')
     reason_conclusion = Column(Enum('Individuo não Consta nos Autos', 'Falha na Extração', 'Dados Divergentes', 'Individuo Consta nos Autos', name='reason_conclusion_enum'), nullable=True)
+    suspicion_reason = Column(String(50), nullable=True)  # Motivo da suspeita (documento_divergente, nome_divergente)
+    username = Column(String(100), nullable=True)  # Usuário que concluiu a avaliação
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relacionamento
@@ -60,3 +72,112 @@ class FraudAssessment(Base):
 
     def __repr__(self):
         return f"<FraudAssessment(process_number='{self.process_number}', result='{self.assessment_result}')>"
+
+# Avaliação mais recente de cada processo (ORDER BY assessment_date DESC por external_id)
+Index('ix_fraud_assess_ext_date', FraudAssessment.external_id, FraudAssessment.assessment_date.desc())
+
+class ExtractionRun(Base):
+    """Checkpoint de uma execução de catalogação/extração, usado para retomá-la após falhas"""
+    __tablename__ = 'extraction_runs'
+
+    id = Column(Integer, primary_key=True)
+    filters_hash = Column(String(64), nullable=False, index=True)  # SHA-256 dos filtros da busca
+    filters = Column(Text)  # Filtros da busca (JSON)
+    status = Column(Enum('Em Andamento', 'Concluída', 'Interrompida', name='extraction_run_status_enum'), nullable=False, default='Em Andamento')
+    total_pages = Column(Integer)
+    last_page = Column(Integer, default=0)  # Última página do grid totalmente catalogada
+    catalog_complete = Column(Boolean, default=False)  # Todas as páginas do grid foram catalogadas
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Relacionamento
+    processes = relationship("ExtractionRunProcess", back_populates="run", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<ExtractionRun(id={self.id}, status='{self.status}', last_page={self.last_page})>"
+
+class ExtractionRunProcess(Base):
+    """Estado de cada processo catalogado em uma execução"""
+    __tablename__ = 'extraction_run_processes'
+    __table_args__ = (UniqueConstraint('run_id', 'external_id', name='uq_extraction_run_process'),)
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey('extraction_runs.id', ondelete='CASCADE'), nullable=False, index=True)
+    external_id = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)  # Ordem no catálogo
+    page = Column(Integer)  # Página do grid onde o processo foi catalogado
+    details_url = Column(String(500))
+    cell_data = Column(Text)  # Células da linha do grid (JSON)
+    state = Column(Enum('Catalogado', 'Extraído', 'Salvo', 'Falha', name='extraction_process_state_enum'), nullable=False, default='Catalogado')
+    error = Column(String(500))
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Relacionamento
+    run = relationship("ExtractionRun", back_populates="processes")
+
+class TitularIndexKey(Base):
+    """Índice invertido dos titulares dos acordos: trigramas e chaves fonéticas do nome e o documento"""
+    __tablename__ = 'titular_index'
+    __table_args__ = (Index('ix_titular_index_key', 'key_type', 'key', 'agreement_id'),)
+
+    id = Column(Integer, primary_key=True)
+    agreement_id = Column(Integer, ForeignKey('agreements.id', ondelete='CASCADE'), nullable=False, index=True)
+    key_type = Column(Enum('trigrama', 'fonetica', 'documento', name='titular_key_type_enum'), nullable=False)
+    key = Column(String(64), nullable=False)
+
+    # Relacionamento
+    agreement = relationship("Agreement", back_populates="index_keys")
+
+class RecurringPayee(Base):
+    """Titular que recebe acordos em vários processos, gerado pelo agrupamento em lote do índice"""
+    __tablename__ = 'recurring_payees'
+
+    id = Column(Integer, primary_key=True)
+    nome_titular = Column(String(200))  # Grafia mais frequente do nome no grupo
+    cpf_cnpj_titular = Column(String(20))  # Documento válido mais frequente no grupo
+    total_acordos = Column(Integer, nullable=False)
+    total_processos = Column(Integer, nullable=False)
+    agreement_ids = Column(Text, nullable=False)  # IDs dos acordos do grupo (JSON)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<RecurringPayee(nome_titular='{self.nome_titular}', total_processos={self.total_processos})>"
+
+class SchemaVersion(Base):
+    """Migrações de schema já aplicadas à base (ver database/migrations.py)"""
+    __tablename__ = 'schema_versions'
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<SchemaVersion(version={self.version}, description='{self.description}')>"
+
+class CurrentAssessment(Base):
+    """
+    Avaliação mais recente de cada processo: modelo de leitura da fila de fraude
+
+    Mantido na mesma transação que grava as avaliações (database/current_assessment.py);
+    as buscas da fila leem só esta tabela, pelos índices de cada ordenação (data, número do
+    processo e resultado), sempre com external_id como desempate.
+    """
+    __tablename__ = 'current_assessments'
+    __table_args__ = (
+        Index('ix_current_assess_date', 'assessment_date', 'external_id'),
+        Index('ix_current_assess_result_date', 'assessment_result', 'assessment_date', 'external_id'),
+        Index('ix_current_assess_process', 'process_number', 'external_id'),
+    )
+
+    external_id = Column(Integer, primary_key=True, autoincrement=False)
+    assessment_id = Column(Integer, nullable=False)  # fraud_assessments.id da avaliação mais recente
+    process_number = Column(String(255))  # Sempre preenchido: vem de fraud_assessments.process_number
+    assessment_result = Column(String(20), nullable=False)
+    reason_conclusion = Column(String(50))
+    suspicion_reason = Column(String(50))
+    username = Column(String(100))
+    assessment_date = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<CurrentAssessment(external_id={self.external_id}, result='{self.assessment_result}')>"
@@ -0,0 +1,44 @@
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+_NON_NUMERIC = re.compile(r'[^\d,.\-]')
+# Ponto como separador decimal ("5500.00"): um único ponto seguido de 1 ou 2 dígitos
+_DOT_DECIMAL = re.compile(r'^-?\d+\.\d{1,2}$')
+
+
+def valor_to_cents(valor):
+    """
+    Converte um valor em reais no formato exibido pelo sistema ("R$ 5.500,00") em centavos
+
+    Aceita também valores sem símbolo ("5.500,00", "5500") e com ponto decimal ("5500.00").
+
+    Returns:
+        int: Valor em centavos, ou None se o texto não tiver um valor reconhecível
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, (int, float, Decimal)):
+        numero = Decimal(str(valor))
+    else:
+        texto = _NON_NUMERIC.sub('', str(valor))
+        if ',' in texto:
+            inteiro, _, decimal = texto.rpartition(',')
+            texto = f"{inteiro.replace('.', '').replace(',', '')}.{decimal}"
+        elif not _DOT_DECIMAL.match(texto):
+            texto = texto.replace('.', '')
+        if not texto.strip('-.'):
+            return None
+        try:
+            numero = Decimal(texto)
+        except InvalidOperation:
+            return None
+    return int((numero * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def format_cents(centavos):
+    """Centavos no formato de exibição do sistema ("R$ 5.500,00")"""
+    if centavos is None:
+        return None
+    sinal = '-' if centavos < 0 else ''
+    reais, resto = divmod(abs(int(centavos)), 100)
+    return f"{sinal}R$ {reais:,}".replace(',', '.') + f",{resto:02d}"
@@ -0,0 +1,345 @@
+import json
+import math
+import threading
+from collections import Counter, defaultdict
+from sqlalchemy import delete, func, insert, select
+from database.db_manager import get_session_factory
+from database.models import Agreement, TitularIndexKey, RecurringPayee
+from scraper.name_matching import (
+    normalize_name, name_trigrams, match_name_pairs, score_name_matrix, SIMILARITY_THRESHOLD
+)
+from scraper.phonetics import phonetic_keys, blocked_pairs
+from scraper.documents import valid_document
+from config import get_logger
+
+logger = get_logger(__name__)
+
+# Fração mínima dos trigramas do nome procurado que um candidato precisa compartilhar
+MIN_TRIGRAM_OVERLAP = 0.3
+# Candidatos pré-selecionados pelo índice antes da pontuação completa
+MAX_CANDIDATES = 2000
+# Ids por consulta ao carregar os candidatos (o Oracle aceita até 1000 itens em um IN)
+LOAD_CHUNK_SIZE = 500
+# Blocos do agrupamento com mais nomes distintos que isso só agrupam nomes idênticos
+MAX_BLOCK_NAMES = 300
+# Acordos por transação ao recriar o índice
+REBUILD_BATCH_SIZE = 5000
+
+# Uma reconstrução por vez neste processo: duas em paralelo duplicariam as chaves
+_rebuild_lock = threading.Lock()
+
+
+def titular_keys(nome_titular, cpf_cnpj_titular=None):
+    """
+    Chaves do índice para um titular
+
+    Returns:
+        list: Tuplas (tipo, chave) — trigramas distintos do nome normalizado, chaves
+              fonéticas de cada palavra e os dígitos do documento, se válido
+    """
+    keys = []
+    nome_norm = normalize_name(nome_titular)
+    if nome_norm:
+        keys.extend(('trigrama', trigrama) for trigrama in name_trigrams(nome_norm))
+        keys.extend(('fonetica', chave) for chave in phonetic_keys(nome_norm))
+    documento = valid_document(cpf_cnpj_titular)
+    if documento:
+        keys.append(('documento', documento))
+    return keys
+
+
+def index_agreement(session, agreement):
+    """
+    Atualiza as chaves de um acordo no índice, dentro da transação do chamador
+
+    O acordo precisa ter id (session.flush() antes, para acordos novos).
+    """
+    index_agreement_rows(session, [{
+        'id': agreement.id, 'nome_titular': agreement.nome_titular, 'cpf_cnpj_titular': agreement.cpf_cnpj_titular
+    }])
+
+
+def index_agreement_rows(bind, rows):
+    """
+    Atualiza as chaves de vários acordos no índice, dentro da transação do chamador
+
+    Args:
+        bind: Session ou Connection da transação
+        rows (list): Dicionários com 'id', 'nome_titular' e 'cpf_cnpj_titular'
+    """
+    if not rows:
+        return
+    table = TitularIndexKey.__table__
+    bind.execute(delete(table).where(table.c.agreement_id.in_([row['id'] for row in rows])))
+    mappings = [
+        {'agreement_id': row['id'], 'key_type': key_type, 'key': key}
+        for row in rows
+        for key_type, key in titular_keys(row['nome_titular'], row['cpf_cnpj_titular'])
+    ]
+    if mappings:
+        bind.execute(insert(table), mappings)
+
+
+def rebuild_index(bind, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recria as chaves de todos os acordos, em lotes (paginação por id) confirmados um a um
+
+    Usada pela migração que preenche o índice em bases anteriores a ele (ou a uma mudança
+    nas regras das chaves) e por TitularIndex.rebuild.
+
+    Args:
+        bind: Session ou Connection; cada lote é confirmado com bind.commit()
+
+    Returns:
+        int: Quantidade de acordos indexados
+    """
+    bind.execute(delete(TitularIndexKey.__table__))
+    bind.commit()
+    total = 0
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            select(Agreement.id, Agreement.nome_titular, Agreement.cpf_cnpj_titular)
+            .where(Agreement.id > last_id)
+            .order_by(Agreement.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        mappings = [
+            {'agreement_id': row.id, 'key_type': key_type, 'key': key}
+            for row in rows
+            for key_type, key in titular_keys(row.nome_titular, row.cpf_cnpj_titular)
+        ]
+        if mappings:
+            bind.execute(insert(TitularIndexKey.__table__), mappings)
+        bind.commit()
+        total += len(rows)
+        last_id = rows[-1].id
+    logger.info(f"Índice de titulares reconstruído com {total} acordos")
+    return total
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, item1, item2):
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 != root2:
+            self.parent[max(root1, root2)] = min(root1, root2)
+
+
+class TitularIndex:
+    """
+    Consultas sobre o índice invertido de titulares (tabela titular_index)
+
+    O índice é mantido incrementalmente na gravação dos acordos (save_process_data e
+    ProcessBatchWriter); bases anteriores ao índice são preenchidas por uma migração
+    (database/migrations.py). As consultas apenas leem o índice.
+    """
+
+    def __init__(self):
+        self.Session = get_session_factory()
+
+    def rebuild(self, batch_size=REBUILD_BATCH_SIZE):
+        """
+        Recria as chaves de todos os acordos (manutenção: fora do caminho das consultas)
+
+        Chamadas simultâneas neste processo são executadas uma depois da outra.
+        """
+        with _rebuild_lock:
+            session = self.Session()
+            try:
+                return rebuild_index(session, batch_size)
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+    def find_similar(self, nome_titular, threshold=SIMILARITY_THRESHOLD, limit=100):
+        """
+        Retorna os acordos cujo titular se parece com nome_titular
+
+        Os candidatos saem do índice (trigramas e chaves fonéticas em comum, sem varrer a
+        tabela de acordos) e são pontuados com a mesma métrica de check_name_matches.
+
+        Returns:
+            list: Dicionários com os dados do acordo e o score, do mais parecido ao menos
+        """
+        nome_norm = normalize_name(nome_titular)
+        if not nome_norm:
+            return []
+        trigramas = name_trigrams(nome_norm)
+        foneticas = phonetic_keys(nome_norm)
+        min_overlap = max(1, math.ceil(len(trigramas) * MIN_TRIGRAM_OVERLAP))
+
+        session = self.Session()
+        try:
+            hits = func.count(TitularIndexKey.id).label('hits')
+            candidates = session.query(TitularIndexKey.agreement_id, hits)\
+                .filter(
+                    ((TitularIndexKey.key_type == 'trigrama') & TitularIndexKey.key.in_(trigramas)) |
+                    ((TitularIndexKey.key_type == 'fonetica') & TitularIndexKey.key.in_(foneticas))
+                )\
+                .group_by(TitularIndexKey.agreement_id)\
+                .having(hits >= min_overlap)\
+                .order_by(hits.desc())\
+                .limit(MAX_CANDIDATES)\
+                .all()
+            if not candidates:
+                return []
+
+            ids = [agreement_id for agreement_id, _ in candidates]
+            agreements = []
+            for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+                agreements.extend(session.query(Agreement)
+                                  .filter(Agreement.id.in_(ids[start:start + LOAD_CHUNK_SIZE]))
+                                  .all())
+            scores = score_name_matrix(nome_norm, [normalize_name(a.nome_titular) for a in agreements], normalized=True)
+            results = [
+                self._agreement_to_dict(agreement, float(score))
+                for agreement, score in zip(agreements, scores) if score > threshold
+            ]
+            results.sort(key=lambda item: (-item['score'], item['agreement_id']))
+            return results[:limit]
+        finally:
+            session.close()
+
+    def find_by_document(self, cpf_cnpj_titular):
+        """Retorna os acordos cujo titular tem o CPF/CNPJ informado"""
+        documento = valid_document(cpf_cnpj_titular)
+        if not documento:
+            return []
+        session = self.Session()
+        try:
+            agreements = session.query(Agreement)\
+                .join(TitularIndexKey, TitularIndexKey.agreement_id == Agreement.id)\
+                .filter(TitularIndexKey.key_type == 'documento', TitularIndexKey.key == documento)\
+                .order_by(Agreement.id)\
+                .all()
+            return [self._agreement_to_dict(agreement) for agreement in agreements]
+        finally:
+            session.close()
+
+    def cluster_recurring_payees(self, min_processes=2):
+        """
+        Agrupa os acordos por titular e grava em recurring_payees os que recebem em vários processos
+
+        Sem comparar todos os pares: acordos são unidos pelo mesmo documento válido e pelo
+        mesmo nome normalizado; nomes diferentes só são comparados (match_name_pairs) quando
+        compartilham um bloco fonético (blocked_pairs: primeiro e último nome).
+
+        Args:
+            min_processes (int): Processos distintos a partir dos quais o titular é recorrente
+
+        Returns:
+            int: Quantidade de titulares recorrentes encontrados
+        """
+        session = self.Session()
+        try:
+            union_find = _UnionFind()
+            first_by_name = {}
+            first_by_document = {}
+            info = {}
+
+            rows = session.execute(
+                select(Agreement.id, Agreement.external_id, Agreement.nome_titular, Agreement.cpf_cnpj_titular)
+                .order_by(Agreement.id)
+                .execution_options(yield_per=5000)
+            )
+            for row in rows:
+                nome_norm = normalize_name(row.nome_titular)
+                documento = valid_document(row.cpf_cnpj_titular)
+                info[row.id] = (row.external_id, row.nome_titular, documento)
+                union_find.find(row.id)
+
+                if documento:
+                    union_find.union(first_by_document.setdefault(documento, row.id), row.id)
+                if nome_norm:
+                    union_find.union(first_by_name.setdefault(nome_norm, row.id), row.id)
+
+            # Nomes diferentes e parecidos, comparados apenas quando compartilham um bloco fonético
+            nomes = sorted(first_by_name)
+            pares, skipped = blocked_pairs(nomes, MAX_BLOCK_NAMES)
+            pares = sorted(pares)
+            pares1 = [nomes[i] for i, _ in pares]
+            pares2 = [nomes[j] for _, j in pares]
+            for nome1, nome2, match in zip(pares1, pares2, match_name_pairs(pares1, pares2, normalized=True)):
+                if match:
+                    union_find.union(first_by_name[nome1], first_by_name[nome2])
+            if skipped:
+                logger.warning(f"{skipped} blocos fonéticos com mais de {MAX_BLOCK_NAMES} nomes agrupados apenas por nome idêntico")
+
+            groups = defaultdict(list)
+            for agreement_id in info:
+                groups[union_find.find(agreement_id)].append(agreement_id)
+
+            payees = []
+            for agreement_ids in groups.values():
+                processes = {info[agreement_id][0] for agreement_id in agreement_ids}
+                if len(processes) < min_processes:
+                    continue
+                nomes = Counter(info[a][1] for a in agreement_ids if info[a][1])
+                documentos = Counter(info[a][2] for a in agreement_ids if info[a][2])
+                payees.append({
+                    'nome_titular': nomes.most_common(1)[0][0] if nomes else None,
+                    'cpf_cnpj_titular': documentos.most_common(1)[0][0] if documentos else None,
+                    'total_acordos': len(agreement_ids),
+                    'total_processos': len(processes),
+                    'agreement_ids': json.dumps(sorted(agreement_ids))
+                })
+
+            session.query(RecurringPayee).delete(synchronize_session=False)
+            session.bulk_insert_mappings(RecurringPayee, payees)
+            session.commit()
+            logger.info(f"Agrupamento concluído: {len(payees)} titulares recorrentes em {len(info)} acordos")
+            return len(payees)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def get_recurring_payees(self, limit=100):
+        """Retorna os titulares recorrentes do último agrupamento, dos que aparecem em mais processos"""
+        session = self.Session()
+        try:
+            payees = session.query(RecurringPayee)\
+                .order_by(RecurringPayee.total_processos.desc(), RecurringPayee.id)\
+                .limit(limit)\
+                .all()
+            return [{
+                'nome_titular': payee.nome_titular,
+                'cpf_cnpj_titular': payee.cpf_cnpj_titular,
+                'total_acordos': payee.total_acordos,
+                'total_processos': payee.total_processos,
+                'agreement_ids': json.loads(payee.agreement_ids),
+                'created_at': payee.created_at.isoformat() if payee.created_at else None
+            } for payee in payees]
+        finally:
+            session.close()
+
+    @staticmethod
+    def _agreement_to_dict(agreement, score=None):
+        data = {
+            'agreement_id': agreement.id,
+            'external_id': agreement.external_id,
+            'nome_titular': agreement.nome_titular,
+            'cpf_cnpj_titular': agreement.cpf_cnpj_titular,
+            'valor': agreement.valor,
+            'data_pagamento': agreement.data_pagamento.isoformat() if agreement.data_pagamento else None
+        }
+        if score is not None:
+            data['score'] = round(score, 4)
+        return data
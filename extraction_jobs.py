@@ -0,0 +1,220 @@
+import time
+from collections import deque
+from background_jobs import BackgroundJob, JobConflictError, JobRegistry
+from config import get_logger, JOB_RESULT_BUFFER
+
+logger = get_logger(__name__)
+
+# Jobs de extração (finalizados ficam disponíveis por JOB_RETENTION)
+registry = JobRegistry('extraction', 'extração')
+
+
+class ExtractionJob(BackgroundJob):
+    """
+    Estado e progresso de uma extração executada em segundo plano
+
+    O job é repassado a LegalScraper.search_processes como objeto de progresso: o
+    GridScraper chama page_catalogued, catalog_complete e process_done à medida que
+    avança e consulta cancelled entre uma página/processo e outro.
+
+    Os resultados formatados ficam em um buffer limitado (JOB_RESULT_BUFFER), indexado
+    por offsets absolutos: quem consome por streaming ou polling recebe cada resultado
+    assim que ele fica pronto, e a memória do servidor não cresce com o tamanho da extração.
+    """
+
+    def __init__(self, user_id, params, result_handler=None, buffer_size=JOB_RESULT_BUFFER):
+        """
+        Args:
+            user_id (str): Sessão que submeteu o job
+            params (dict): Parâmetros da extração (corpo de POST /api/extract)
+            result_handler (callable): Recebe (process_id, process_data) e retorna o resultado
+                formatado a incluir nos resultados parciais, ou None para descartá-lo
+            buffer_size (int): Quantidade de resultados recentes mantidos em memória
+        """
+        super().__init__(user_id, params)
+        self.result_handler = result_handler
+        self.phase = 'catalog'
+        self.message = ''
+
+        # Progresso (acumulado entre as buscas de vários números de processo)
+        self.searches_total = 0
+        self.searches_done = 0
+        self.pages_catalogued = 0
+        # Página atual da busca: numa busca retomada do checkpoint, as anteriores já estão feitas
+        self.current_page = 0
+        self.current_total_pages = 0
+        self.processes_catalogued = 0
+        self.processes_total = 0
+        self.processes_to_scrape = 0
+        self.processes_done = 0
+
+        # Buffer de (resultado, linha do grid); results_base é o offset do primeiro item mantido
+        self.results = deque(maxlen=max(1, int(buffer_size)))
+        self.results_base = 0
+        self.results_total = 0
+        self.errors = []
+
+        # Início da fase atual e quanto já havia sido feito nela, base do cálculo do ETA
+        self._phase_started = None
+        self._phase_baseline = 0
+        # Totais antes da busca atual e processos já contados/entregues nela; uma busca retomada
+        # a partir do checkpoint percorre o catálogo de novo sem duplicar contagens ou resultados
+        self._total_before_search = 0
+        self._to_scrape_before_search = 0
+        self._search_counted = set()
+        self._search_delivered = set()
+
+    def begin_search(self):
+        """Marca o início da busca de um novo número de processo"""
+        with self._lock:
+            self._total_before_search = self.processes_total
+            self._to_scrape_before_search = self.processes_to_scrape
+            self._search_counted = set()
+            self._search_delivered = set()
+
+    # Ganchos de progresso chamados pelo GridScraper
+
+    def page_catalogued(self, page, total_pages, processes_catalogued):
+        with self._lock:
+            if self._phase_started is None or self.phase != 'catalog':
+                self.phase = 'catalog'
+                self._phase_started = time.time()
+                self._phase_baseline = self.pages_catalogued
+            self.pages_catalogued += 1
+            self.current_page = page
+            self.current_total_pages = total_pages
+            self.processes_catalogued = processes_catalogued
+            self.message = f"Catalogando página {page}/{total_pages}"
+            self._changed.notify_all()
+
+    def catalog_complete(self, total, to_scrape):
+        with self._lock:
+            self.phase = 'extract'
+            self._phase_started = time.time()
+            self._phase_baseline = self.processes_done
+            self.processes_total = self._total_before_search + total
+            self.processes_to_scrape = self._to_scrape_before_search + to_scrape
+            self.message = f"{total} processos catalogados, {to_scrape} para extrair"
+            self._changed.notify_all()
+
+    def process_done(self, process_id, process_data, grid_row=None):
+        formatted = None
+        if process_data and self.result_handler is not None:
+            try:
+                formatted = self.result_handler(process_id, process_data)
+            except Exception as e:
+                logger.error(f"Erro ao formatar resultado do processo {process_id}: {str(e)}")
+                self.errors.append(f"Processo {process_id}: {str(e)}")
+        with self._lock:
+            if process_id not in self._search_counted:
+                self._search_counted.add(process_id)
+                self.processes_done += 1
+            if formatted is not None and process_id not in self._search_delivered:
+                self._search_delivered.add(process_id)
+                if len(self.results) == self.results.maxlen:
+                    self.results_base += 1
+                self.results.append((formatted, grid_row))
+                self.results_total += 1
+            self.message = f"Processo {self.processes_done}/{self.processes_total}"
+            self._changed.notify_all()
+
+    def results_since(self, offset):
+        """
+        Retorna os resultados ainda em buffer a partir de um offset absoluto
+
+        Returns:
+            tuple: (lista de (resultado, linha do grid), offset do primeiro item retornado)
+        """
+        with self._lock:
+            return self._results_since(offset)
+
+    def _results_since(self, offset):
+        start = max(int(offset or 0), self.results_base)
+        items = list(self.results)[start - self.results_base:]
+        return items, start
+
+    def wait_for_update(self, offset, timeout):
+        """Bloqueia até haver resultado além de offset, o job terminar ou o timeout expirar"""
+        with self._changed:
+            if self.results_total <= offset and not self.finished:
+                self._changed.wait(timeout)
+
+    def eta_seconds(self):
+        """Estimativa do tempo restante da fase atual, em segundos (None se ainda não houver base)"""
+        if self._phase_started is None:
+            return None
+        elapsed = time.time() - self._phase_started
+        if self.phase == 'extract':
+            done_in_phase = self.processes_done - self._phase_baseline
+            remaining = self.processes_total - self.processes_done
+        else:
+            # Ritmo das páginas lidas nesta execução; as restantes contam a partir da página atual,
+            # não do início do catálogo (numa retomada, as primeiras vieram do checkpoint)
+            done_in_phase = self.pages_catalogued - self._phase_baseline
+            remaining = self.current_total_pages - self.current_page
+        if done_in_phase <= 0 or remaining < 0:
+            return None
+        return round(elapsed / done_in_phase * remaining, 1)
+
+    def to_dict(self, offset=0, include_results=True):
+        """
+        Serializa o estado do job
+
+        Args:
+            offset (int): Quantidade de resultados que o cliente já recebeu; apenas os
+                seguintes (ainda em buffer) são incluídos em 'results' e 'grid_data'
+            include_results (bool): Se False, retorna apenas o estado e o progresso
+        """
+        with self._lock:
+            data = self._state_dict()
+            data.update({
+                'phase': self.phase,
+                'message': self.message,
+                'progress': {
+                    'searches_total': self.searches_total,
+                    'searches_done': self.searches_done,
+                    'pages_catalogued': self.pages_catalogued,
+                    'current_page': self.current_page,
+                    'current_total_pages': self.current_total_pages,
+                    'processes_catalogued': self.processes_catalogued,
+                    'processes_total': self.processes_total,
+                    'processes_to_scrape': self.processes_to_scrape,
+                    'processes_done': self.processes_done
+                },
+                'eta_seconds': None if self.finished else self.eta_seconds(),
+                'next_offset': self.results_total,
+                'errors': list(self.errors)
+            })
+            if include_results:
+                items, start = self._results_since(offset)
+                data['results'] = [result for result, _ in items]
+                data['grid_data'] = [grid_row for _, grid_row in items]
+                # Resultados que saíram do buffer antes de o cliente buscá-los
+                data['results_dropped'] = max(0, start - max(0, int(offset or 0)))
+            return data
+
+
+def get_job(job_id):
+    return registry.get(job_id)
+
+
+def get_active_job(user_id):
+    """Retorna o job em andamento da sessão, se houver"""
+    return registry.find_active(lambda job: job.user_id == user_id)
+
+
+def submit_job(job, target):
+    """
+    Registra o job e o executa em uma thread própria
+
+    O navegador da sessão só pode executar uma extração por vez: a submissão é recusada se
+    a sessão já tiver um job em andamento.
+
+    Args:
+        job (ExtractionJob): Job a executar
+        target (callable): Função que recebe o job e realiza a extração
+
+    Raises:
+        JobConflictError: Se a sessão já tiver uma extração em andamento (em error.job)
+    """
+    return registry.submit(job, target, exclusive=True, key=lambda other: other.user_id)
@@ -1,11 +1,80 @@
+import hashlib
+import json
 import logging
-from sqlalchemy.sql import text
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from sqlalchemy import func
 from database.db_manager import DatabaseManager
-from database.models import FraudAssessment
+from database.models import Process, Agreement, FraudAssessment
+from database.current_assessment import refresh_current_assessments
 from scraper.process_details_scraper import ProcessDetailsScraper
+from scraper.name_matching import get_cascade_stats, reset_cascade_stats, merge_cascade_stats
+from scraper.documents import MOTIVO_DOCUMENTO_CONFERE, MOTIVO_DOCUMENTO_DIVERGENTE
+from config import NAME_MATCH_BATCH_SIZE, RECERTIFY_WORKERS
 
 logger = logging.getLogger(__name__)
 
+# Versão da regra de decisão, incluída no hash das entradas: ao mudar o matcher ou os
+# critérios, incremente para que a próxima recertificação incremental reavalie tudo
+MATCHER_VERSION = 1
+
+# Apenas uma recertificação por vez neste processo (job da API ou recertificação pós-extração)
+_run_lock = threading.Lock()
+
+
+class RecertificationInProgressError(Exception):
+    """Já existe uma recertificação em andamento"""
+
+# Matcher de cada processo do pool, criado uma única vez pelo initializer
+_worker_scraper = None
+
+
+def _init_score_worker(disabled_log_level=logging.NOTSET):
+    """
+    Inicializa o worker do pool: cria o matcher e aquece o normalizador e as métricas
+
+    Args:
+        disabled_log_level (int): logging.disable do processo principal (um processo criado
+            sem fork não o herda)
+    """
+    global _worker_scraper
+    logging.disable(disabled_log_level)
+    _worker_scraper = ProcessDetailsScraper(None, backend='browser')
+    _worker_scraper.check_fraud_batch([
+        ('Maria da Silva', None, {'partes': {'parte_adversa': 'Maria Silva'}}, [{'grid_data': [None] * 5}])
+    ])
+    reset_cascade_stats()
+
+
+def _pool_context():
+    """
+    Contexto de criação dos processos do pool: nunca fork
+
+    A recertificação roda em uma thread do servidor Flask, que tem conexões do pool do
+    SQLAlchemy, locks e threads do Selenium; um fork copiaria esse estado para os filhos
+    (sockets do banco compartilhados, locks presos). O forkserver parte de um processo limpo
+    que só importa este módulo; onde ele não existe (Windows), os processos são criados com spawn.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _score_cases(casos):
+    """Pontua um lote no worker; retorna os resultados e as decisões por estágio da cascata"""
+    reset_cascade_stats()
+    resultados = _worker_scraper.check_fraud_batch(casos)
+    return resultados, get_cascade_stats()
+
+
+def _score_cases_local(process_scraper, casos):
+    """Pontua um lote no próprio processo (modo serial)"""
+    return process_scraper.check_fraud_batch(casos), None
+
 class FraudRecertificationService:
     """Serviço para recertificar as avaliações de fraude nos processos existentes"""
     
@@ -13,98 +82,299 @@ class FraudRecertificationService:
         self.db = DatabaseManager()
         # Inicializa o ProcessDetailsScraper com None como driver, pois não precisamos do driver para a função check_name_matches
         self.process_scraper = ProcessDetailsScraper(None)
+        self.progress = None
     
-    def recertify_fraud_assessments(self):
+    def recertify_fraud_assessments(self, incremental=True, workers=RECERTIFY_WORKERS, progress=None):
         """
-        Recertifica todas as avaliações de fraude baseado nos dados existentes.
-        Limpa a tabela de fraudes e adiciona apenas os casos suspeitos.
+        Recertifica as avaliações de fraude baseado nos dados existentes.
+        
+        Os acordos são lidos em streaming (yield_per), ordenados por processo, e cada lote de
+        NAME_MATCH_BATCH_SIZE acordos é pontuado e gravado em uma transação própria. Para cada
+        processo recertificado, a avaliação 'Pendente' é criada, atualizada ou removida; as
+        conclusões dos analistas ('Positiva', 'Negativa', 'Falso Positivo') nunca são apagadas.
+        
+        Args:
+            incremental (bool): Se True, recertifica apenas os processos com algum acordo cujas
+                entradas (titular, parte adversa, advogados, documentos) mudaram desde a última
+                recertificação; se False, recertifica todos e remove as avaliações pendentes
+                de processos que não têm mais acordos
+            workers (int): Processos que pontuam os lotes em paralelo (ProcessPoolExecutor);
+                com 1, a pontuação roda no próprio processo. A gravação é sempre feita por
+                este processo, na ordem dos lotes, e o resultado é o mesmo em ambos os modos
+            progress: Objeto de progresso (ex.: RecertificationJob), avisado do total de acordos,
+                de cada lote gravado e de cada erro; a leitura para quando progress.cancelled
         
         Returns:
             dict: Estatísticas da recertificação
+        
+        Raises:
+            RecertificationInProgressError: Se outra recertificação estiver em andamento
         """
+        if not _run_lock.acquire(blocking=False):
+            raise RecertificationInProgressError("Já existe uma recertificação em andamento")
+        self.progress = progress
         try:
-            logger.info("Iniciando recertificação de fraudes")
+            logger.info(f"Iniciando recertificação de fraudes ({'incremental' if incremental else 'completa'}, {workers} worker(s))")
             
             # Estatísticas para retornar
             stats = {
                 "total_processos": 0,
+                "recertificados": 0,
+                "inalterados": 0,
                 "total_fraudes": 0,
+                "decididos_por_documento": 0,
                 "erros": 0
             }
             
-            # Obtém todos os acordos com seus processos
+            if not incremental:
+                self._clear_orphan_pending()
+            
+            # Leitura em streaming em uma sessão; cada lote é gravado em outra, com commit próprio
             session = self.db.Session()
+            if progress is not None:
+                progress.recertification_started(self._count_agreements(session))
+            pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=_pool_context(), initializer=_init_score_worker,
+                initargs=(logging.root.manager.disable,)
+            ) if workers > 1 else None
             try:
-                # Primeiro, limpa a tabela de fraudes
-                logger.info("Limpando tabela de avaliações de fraude")
-                session.query(FraudAssessment).delete()
-                
-                # Busca todos os acordos com seus respectivos processos
-                query = """
-                    SELECT a.*, p.external_id, p.parte_adversa, p.advogados_adversos as proc_advogados_adversos,
-                           p.numero
-                    FROM agreements a
-                    JOIN processes p ON a.external_id = p.external_id
-                """
+                # Lotes enviados ao pool e ainda não gravados, na ordem de leitura
+                em_andamento = deque()
+                lote = []
+                for grupo in self._stream_process_groups(session):
+                    if progress is not None and progress.cancelled:
+                        logger.info("Recertificação cancelada; gravando os lotes já pontuados")
+                        lote = []
+                        break
+                    stats["total_processos"] += 1
+                    if incremental and all(row.assessment_hash == self._input_hash(row) for row in grupo):
+                        stats["inalterados"] += len(grupo)
+                        # Sem lotes a gravar, o progresso é avisado a cada NAME_MATCH_BATCH_SIZE inalterados
+                        if stats["inalterados"] % NAME_MATCH_BATCH_SIZE < len(grupo):
+                            self._report_chunk(stats)
+                        continue
+                    lote.extend(grupo)
+                    if len(lote) >= NAME_MATCH_BATCH_SIZE:
+                        self._dispatch_chunk(lote, stats, pool, em_andamento)
+                        lote = []
+                        # Limita os lotes em memória: grava o mais antigo antes de ler mais
+                        while len(em_andamento) > (2 * workers if pool is not None else 0):
+                            self._write_scored_chunk(em_andamento.popleft(), stats)
+                if lote:
+                    self._dispatch_chunk(lote, stats, pool, em_andamento)
+                while em_andamento:
+                    self._write_scored_chunk(em_andamento.popleft(), stats)
+                self._report_chunk(stats)
                 
-                agreements = session.execute(text(query)).fetchall()
-                stats["total_processos"] = len(agreements)
-                
-                for agreement in agreements:
-                    try:
-                        # Verifica se o acordo deve ser marcado como suspeita de fraude
-                        nome_titular = agreement.nome_titular
-                        
-                        # Prepara os dados para verificação de fraude
-                        process_details = {
-                            'partes': {
-                                'parte_adversa': agreement.parte_adversa,
-                                'advogados_adversos': self._parse_advogados_adversos(agreement.proc_advogados_adversos)
-                            }
-                        }
-                        
-                        # Grid data no formato esperado pelo check_name_matches
-                        grid_data = [{
-                            'grid_data': [None, None, None, agreement.parte_adversa, None]
-                        }]
-                        
-                        # Verifica se é suspeita de fraude usando o método do ProcessDetailsScraper
-                        # Nota: O método retorna True se NÃO houver match, então invertemos o resultado
-                        is_fraud = self.process_scraper.check_name_matches(nome_titular, process_details, grid_data)
-                        
-                        # Obtém o número do processo da tabela processes
-                        process_number = agreement.numero
-                        
-                        # Se for suspeita de fraude, adiciona à tabela
-                        if is_fraud:
-                            new_assessment = FraudAssessment(
-                                external_id=agreement.external_id,
-                                process_number=process_number,
-                                assessment_result="Pendente"
-                            )
-                            session.add(new_assessment)
-                            stats["total_fraudes"] += 1
-                            logger.info(f"Adicionada avaliação de fraude para o processo {agreement.external_id} ({process_number})")
-                    
-                    except Exception as e:
-                        logger.error(f"Erro ao recertificar processo {agreement.external_id}: {str(e)}")
-                        stats["erros"] += 1
-                
-                # Commit das alterações
-                session.commit()
                 logger.info(f"Recertificação concluída. Estatísticas: {stats}")
+                logger.info(f"Decisões por estágio da cascata de similaridade: {get_cascade_stats()}")
                 return stats
                 
             except Exception as e:
-                session.rollback()
                 logger.error(f"Erro durante a recertificação: {str(e)}")
                 raise
             finally:
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
                 session.close()
                 
         except Exception as e:
             logger.error(f"Erro geral na recertificação: {str(e)}")
             raise
+        finally:
+            self.progress = None
+            _run_lock.release()
+
+    def _count_agreements(self, session):
+        """Total de acordos que a leitura em streaming vai percorrer"""
+        return session.query(func.count(Agreement.id))\
+            .join(Process, Agreement.external_id == Process.external_id)\
+            .scalar()
+
+    def _record_error(self, stats, quantidade, mensagem):
+        logger.error(mensagem)
+        stats["erros"] += quantidade
+        if self.progress is not None:
+            self.progress.record_error(mensagem)
+
+    def _dispatch_chunk(self, rows, stats, pool, em_andamento):
+        """Monta os casos de um lote e o pontua aqui (sem pool) ou o envia a um worker"""
+        casos = []
+        validos = []
+        for row in rows:
+            try:
+                casos.append(self._build_match_case(row))
+                validos.append(row)
+            except Exception as e:
+                self._record_error(stats, 1, f"Erro ao recertificar processo {row.external_id}: {str(e)}")
+        
+        if pool is None:
+            em_andamento.append((validos, _score_cases_local(self.process_scraper, casos)))
+        else:
+            em_andamento.append((validos, pool.submit(_score_cases, casos)))
+
+    def _stream_process_groups(self, session):
+        """Percorre os acordos com seus processos em streaming, agrupados por processo"""
+        rows = session.query(
+            Agreement.id,
+            Agreement.external_id,
+            Agreement.nome_titular,
+            Agreement.cpf_cnpj_titular,
+            Agreement.assessment_hash,
+            Process.parte_adversa,
+            Process.cpf_cnpj_parte_adverso,
+            Process.advogados_adversos.label('proc_advogados_adversos'),
+            Process.numero
+        ).join(Process, Agreement.external_id == Process.external_id)\
+            .order_by(Agreement.external_id, Agreement.id)\
+            .yield_per(NAME_MATCH_BATCH_SIZE)
+        
+        grupo = []
+        for row in rows:
+            if grupo and row.external_id != grupo[0].external_id:
+                yield grupo
+                grupo = []
+            grupo.append(row)
+        if grupo:
+            yield grupo
+
+    @staticmethod
+    def _input_hash(row):
+        """Hash das entradas usadas para decidir a suspeita de um acordo (inclui a versão do matcher)"""
+        entradas = [
+            MATCHER_VERSION, row.nome_titular, row.cpf_cnpj_titular, row.parte_adversa,
+            row.cpf_cnpj_parte_adverso, row.proc_advogados_adversos
+        ]
+        return hashlib.sha256(json.dumps(entradas, default=str).encode('utf-8')).hexdigest()
+
+    def _write_scored_chunk(self, chunk, stats):
+        """Aplica o resultado de um lote pontuado e o grava em uma transação"""
+        validos, pontuacao = chunk
+        # Verifica se cada acordo é suspeita de fraude: pelos documentos e, na falta deles, pelos nomes
+        try:
+            if isinstance(pontuacao, Future):
+                resultados, estagios = pontuacao.result()
+                merge_cascade_stats(estagios)
+            else:
+                resultados, _ = pontuacao
+        except Exception as e:
+            self._record_error(stats, len(validos), f"Erro ao recertificar lote de {len(validos)} acordos: {str(e)}")
+            self._report_chunk(stats)
+            return
+        
+        # Decisão por processo: suspeito se algum acordo for suspeito
+        processos = {}
+        for row, (is_fraud, motivo) in zip(validos, resultados):
+            if motivo in (MOTIVO_DOCUMENTO_CONFERE, MOTIVO_DOCUMENTO_DIVERGENTE):
+                stats["decididos_por_documento"] += 1
+            processo = processos.setdefault(row.external_id, {
+                'numero': row.numero, 'suspeito': False, 'motivo': None, 'alterado': False
+            })
+            if is_fraud and not processo['suspeito']:
+                processo['suspeito'] = True
+                processo['motivo'] = motivo
+            # Entradas mudaram desde a última recertificação (acordos nunca recertificados não contam)
+            if row.assessment_hash is not None and row.assessment_hash != self._input_hash(row):
+                processo['alterado'] = True
+        
+        session = self.db.Session()
+        try:
+            self._apply_assessments(session, processos, stats)
+            session.bulk_update_mappings(Agreement, [
+                {'id': row.id, 'assessment_hash': self._input_hash(row)} for row in validos
+            ])
+            session.commit()
+            stats["recertificados"] += len(validos)
+        except Exception as e:
+            session.rollback()
+            self._record_error(stats, len(validos), f"Erro ao gravar lote de {len(validos)} acordos: {str(e)}")
+        finally:
+            session.close()
+        self._report_chunk(stats)
+
+    def _report_chunk(self, stats):
+        if self.progress is not None:
+            self.progress.chunk_done(stats)
+
+    def _apply_assessments(self, session, processos, stats):
+        """Cria, atualiza ou remove a avaliação pendente de cada processo recertificado"""
+        avaliacoes = session.query(FraudAssessment)\
+            .filter(FraudAssessment.external_id.in_(list(processos)))\
+            .all()
+        pendentes = {}
+        concluidos = set()
+        for avaliacao in avaliacoes:
+            if avaliacao.assessment_result == 'Pendente':
+                pendentes.setdefault(avaliacao.external_id, []).append(avaliacao)
+            else:
+                concluidos.add(avaliacao.external_id)
+        
+        for external_id, processo in processos.items():
+            existentes = pendentes.get(external_id, [])
+            if not processo['suspeito']:
+                for avaliacao in existentes:
+                    session.delete(avaliacao)
+                continue
+            
+            stats["total_fraudes"] += 1
+            if existentes:
+                existentes[0].suspicion_reason = processo['motivo']
+                for avaliacao in existentes[1:]:
+                    session.delete(avaliacao)
+            elif external_id not in concluidos or processo['alterado']:
+                # Processo já concluído pelo analista só volta à fila se os dados mudaram
+                session.add(FraudAssessment(
+                    external_id=external_id,
+                    process_number=processo['numero'],
+                    assessment_result="Pendente",
+                    suspicion_reason=processo['motivo']
+                ))
+                logger.info(f"Adicionada avaliação de fraude para o processo {external_id} ({processo['numero']}): {processo['motivo']}")
+
+        # Fila de fraude na mesma transação das avaliações
+        refresh_current_assessments(session, processos)
+
+    def _clear_orphan_pending(self):
+        """Remove as avaliações pendentes de processos que não têm acordos (recertificação completa)"""
+        session = self.db.Session()
+        try:
+            com_acordo = session.query(Agreement.external_id)
+            orfas = session.query(FraudAssessment)\
+                .filter(FraudAssessment.assessment_result == 'Pendente',
+                        ~FraudAssessment.external_id.in_(com_acordo))
+            afetados = [external_id for (external_id,) in orfas.with_entities(FraudAssessment.external_id)]
+            removidas = orfas.delete(synchronize_session=False)
+            refresh_current_assessments(session, afetados)
+            session.commit()
+            if removidas:
+                logger.info(f"{removidas} avaliações pendentes de processos sem acordo removidas")
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+            
+    def _build_match_case(self, agreement):
+        """
+        Monta a tupla (nome_titular, cpf_titular, process_details, grid_data, documentos_parte)
+        esperada pelo check_fraud_batch
+        """
+        # Prepara os dados para verificação de fraude
+        process_details = {
+            'partes': {
+                'parte_adversa': agreement.parte_adversa,
+                'cpf_cnpj_parte_adverso': agreement.cpf_cnpj_parte_adverso,
+                'advogados_adversos': self._parse_advogados_adversos(agreement.proc_advogados_adversos)
+            }
+        }
+        
+        # Grid data no formato esperado pelo check_name_matches
+        grid_data = [{
+            'grid_data': [None, None, None, agreement.parte_adversa, agreement.cpf_cnpj_parte_adverso]
+        }]
+        
+        return (agreement.nome_titular, agreement.cpf_cnpj_titular, process_details, grid_data,
+                [agreement.cpf_cnpj_parte_adverso])
             
     def _parse_advogados_adversos(self, advogados_str):
         """Converte a string de advogados adversos para o formato esperado pelo check_name_matches"""
@@ -0,0 +1,118 @@
+import time
+from collections import deque
+from background_jobs import BackgroundJob, JobConflictError, JobRegistry
+from .fraud_recertification import FraudRecertificationService
+
+# Mensagens de erro mantidas por job (as mais recentes)
+MAX_JOB_ERRORS = 100
+
+# Jobs de recertificação (finalizados ficam disponíveis por JOB_RETENTION)
+registry = JobRegistry('recertification', 'recertificação')
+
+
+class RecertificationJob(BackgroundJob):
+    """
+    Estado e progresso de uma recertificação executada em segundo plano
+
+    O job é repassado a FraudRecertificationService.recertify_fraud_assessments como objeto
+    de progresso: o serviço chama recertification_started, chunk_done e record_error à
+    medida que avança e consulta cancelled entre um processo e outro.
+    """
+
+    def __init__(self, user_id, params):
+        """
+        Args:
+            user_id (str): Sessão que submeteu o job
+            params (dict): Parâmetros da recertificação (corpo de POST /fraudeCheck/api/recertify)
+        """
+        super().__init__(user_id, params)
+        self.incremental = not params.get('completa', False)
+
+        self.agreements_total = 0
+        self.stats = {}
+        self.errors = deque(maxlen=MAX_JOB_ERRORS)
+
+        self._started = None
+
+    @property
+    def agreements_processed(self):
+        return self.stats.get('recertificados', 0) + self.stats.get('inalterados', 0) + self.stats.get('erros', 0)
+
+    # Ganchos de progresso chamados pelo FraudRecertificationService
+
+    def recertification_started(self, total):
+        with self._lock:
+            self.agreements_total = total
+            self._started = time.time()
+
+    def chunk_done(self, stats):
+        with self._lock:
+            self.stats = dict(stats)
+
+    def record_error(self, message):
+        with self._lock:
+            self.errors.append(message)
+
+    def throughput(self):
+        """Acordos processados por segundo desde o início da leitura"""
+        if self._started is None:
+            return None
+        elapsed = (self.finished_at.timestamp() if self.finished_at else time.time()) - self._started
+        if elapsed <= 0:
+            return None
+        return round(self.agreements_processed / elapsed, 1)
+
+    def eta_seconds(self):
+        """Estimativa do tempo restante, em segundos (None se ainda não houver base)"""
+        throughput = self.throughput()
+        if not throughput:
+            return None
+        return round(max(0, self.agreements_total - self.agreements_processed) / throughput, 1)
+
+    def to_dict(self):
+        with self._lock:
+            data = self._state_dict()
+            data.update({
+                'incremental': self.incremental,
+                'progress': {
+                    'agreements_total': self.agreements_total,
+                    'agreements_processed': self.agreements_processed
+                },
+                'throughput': self.throughput(),
+                'eta_seconds': None if self.finished else self.eta_seconds(),
+                'stats': dict(self.stats),
+                'errors': list(self.errors)
+            })
+            return data
+
+
+def get_job(job_id):
+    return registry.get(job_id)
+
+
+def get_running_job():
+    """Retorna a recertificação em andamento, se houver"""
+    return registry.find_active()
+
+
+def _recertify(job):
+    stats = FraudRecertificationService().recertify_fraud_assessments(
+        incremental=job.incremental, progress=job
+    )
+    job.chunk_done(stats)
+
+
+def submit_job(job):
+    """
+    Registra o job e executa a recertificação em uma thread própria
+
+    Uma recertificação iniciada fora da API (ex.: após uma extração) faz o job terminar
+    como 'failed', com a mensagem de RecertificationInProgressError em error.
+
+    Returns:
+        RecertificationJob: O job submetido, ou None se já houver uma recertificação em andamento
+    """
+    try:
+        return registry.submit(job, _recertify, exclusive=True)
+    except JobConflictError:
+        return None
@@ -1,8 +1,11 @@
-from flask import Blueprint, jsonify, request, render_template, Response
+from flask import Blueprint, jsonify, request, render_template, Response, session
 from datetime import datetime
 import logging
 from .service import FraudeService
-from .fraud_recertification import FraudRecertificationService
+from . import recertification_jobs
+from .recertification_jobs import RecertificationJob
+from database.titular_index import TitularIndex
+from database.agreement_reports import AgreementReports
 import os
 import getpass
 
@@ -21,11 +24,12 @@ def index():
 
 @fraude_bp.route('/api/search', methods=['POST'])
 def search():
+    """Uma página da fila de fraude: filtros, page_size, sort, order e cursor no corpo JSON"""
     try:
-        filters = request.json
         service = FraudeService()
-        results = service.get_processos_suspeitos(filters)
-        return jsonify(results)
+        return jsonify(service.search_processos_suspeitos(request.json))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erro na busca: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -124,17 +128,118 @@ def get_current_user():
 
 @fraude_bp.route('/api/recertify', methods=['POST'])
 def recertify_fraud():
-    """Recertifica as avaliações de fraude para todos os processos na base de dados"""
+    """Submete a recertificação das avaliações de fraude como job em segundo plano e retorna o seu ID"""
     try:
-        # Executa a recertificação
-        service = FraudRecertificationService()
-        result = service.recertify_fraud_assessments()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Recertificação concluída com sucesso',
-            'stats': result
-        })
+        # Incremental por padrão; {"completa": true} reavalia todos os acordos
+        params = request.get_json(silent=True) or {}
+        job = recertification_jobs.submit_job(RecertificationJob(session.get('user_id'), params))
+        if job is None:
+            running = recertification_jobs.get_running_job()
+            return jsonify({
+                'error': 'Uma recertificação já está em andamento',
+                'job_id': running.id if running else None
+            }), 409
+        logger.info(f"Job de recertificação {job.id} submetido")
+        return jsonify({'success': True, 'job_id': job.id}), 202
     except Exception as e:
         logger.error(f"Erro na recertificação de fraudes: {str(e)}")
         return jsonify({'error': str(e)}), 500
+
+@fraude_bp.route('/api/recertify/<job_id>', methods=['GET'])
+def recertify_status(job_id):
+    """Progresso, vazão (acordos/s), erros e ETA de uma recertificação"""
+    job = recertification_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@fraude_bp.route('/api/recertify/<job_id>/cancel', methods=['POST'])
+def cancel_recertify(job_id):
+    """Solicita o cancelamento de uma recertificação em andamento"""
+    job = recertification_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    job.cancel()
+    return jsonify({'success': True, 'message': 'Cancelamento solicitado', 'job': job.to_dict()})
+
+@fraude_bp.route('/api/titulares/similares')
+def get_similar_titulares():
+    """Lista os acordos cujo titular se parece com o nome (ou tem o CPF/CNPJ) informado"""
+    try:
+        nome = request.args.get('nome', '').strip()
+        documento = request.args.get('documento', '').strip()
+        if not nome and not documento:
+            return jsonify({'error': 'Informe o nome ou o documento do titular'}), 400
+        
+        index = TitularIndex()
+        acordos = index.find_by_document(documento) if documento else index.find_similar(nome)
+        return jsonify({'acordos': acordos, 'total_processos': len({a['external_id'] for a in acordos})})
+    except Exception as e:
+        logger.error(f"Erro na busca de titulares similares: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@fraude_bp.route('/api/titulares/recorrentes', methods=['GET', 'POST'])
+def recurring_payees():
+    """GET lista os titulares recorrentes do último agrupamento; POST refaz o agrupamento"""
+    try:
+        index = TitularIndex()
+        if request.method == 'POST':
+            min_processes = int((request.get_json(silent=True) or {}).get('min_processos', 2))
+            total = index.cluster_recurring_payees(min_processes=min_processes)
+            return jsonify({'success': True, 'total': total})
+        return jsonify(index.get_recurring_payees(limit=int(request.args.get('limit', 100))))
+    except Exception as e:
+        logger.error(f"Erro no agrupamento de titulares recorrentes: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def _report_filters():
+    """Filtros comuns dos relatórios de acordos: período de pagamento e suspeita de fraude"""
+    inicio = request.args.get('inicio')
+    fim = request.args.get('fim')
+    suspeita = request.args.get('suspeita_fraude')
+    return {
+        'inicio': datetime.strptime(inicio, '%Y-%m-%d') if inicio else None,
+        'fim': datetime.strptime(fim, '%Y-%m-%d') if fim else None,
+        'suspeita_fraude': suspeita.lower() in ('1', 'true', 'sim') if suspeita else None,
+    }
+
+@fraude_bp.route('/api/acordos/totais')
+def agreement_totals():
+    """Totais dos acordos por escritório, comarca ou mês (?dimensao=escritorio|comarca|mes)"""
+    try:
+        limit = request.args.get('limit')
+        return jsonify(AgreementReports().totals_by(
+            request.args.get('dimensao', 'escritorio'), limit=int(limit) if limit else None, **_report_filters()
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro nos totais de acordos: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@fraude_bp.route('/api/acordos/faixas')
+def agreement_value_histogram():
+    """Acordos por faixa de valor, opcionalmente por dimensão (?dimensao=...&limites=100000,500000)"""
+    try:
+        limites = request.args.get('limites')
+        return jsonify(AgreementReports().value_histogram(
+            request.args.get('dimensao') or None,
+            edges=[int(limite) for limite in limites.split(',')] if limites else None,
+            **_report_filters()
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro nas faixas de valor dos acordos: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@fraude_bp.route('/api/acordos/maiores_titulares')
+def agreement_top_payees():
+    """Titulares com a maior soma de acordos"""
+    try:
+        return jsonify(AgreementReports().top_payees(limit=int(request.args.get('limit', 20)), **_report_filters()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro nos maiores titulares: {str(e)}")
+        return jsonify({'error': str(e)}), 500
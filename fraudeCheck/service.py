@@ -1,90 +1,272 @@
-from datetime import datetime
-from sqlalchemy.sql import text
+import base64
+import hashlib
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select
 from database.db_manager import DatabaseManager
-from database.models import FraudAssessment
+from database.models import Process, FraudAssessment, CurrentAssessment
+from database.current_assessment import refresh_current_assessments
+from config import FRAUD_QUEUE_PAGE_SIZE, FRAUD_QUEUE_MAX_PAGE_SIZE, FRAUD_QUEUE_COUNT_LIMIT
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Ordenações da fila: colunas da chave de paginação, da mais significativa ao desempate
+# (external_id). Cada uma percorre um índice de current_assessments na ordem.
+FILA_ORDENACOES = {
+    'assessment_date': (CurrentAssessment.assessment_date, CurrentAssessment.external_id),
+    'processo': (CurrentAssessment.process_number, CurrentAssessment.external_id),
+    'assessment_result': (CurrentAssessment.assessment_result, CurrentAssessment.assessment_date,
+                          CurrentAssessment.external_id),
+}
+FILA_FILTROS = ('external_id', 'processo', 'assessment_result', 'reason_conclusion', 'start_date', 'end_date')
+
+
+def _filtros_assinatura(filters):
+    """Resumo dos filtros gravado no cursor: um cursor só vale para a busca que o gerou"""
+    normalizados = {chave: str(filters.get(chave) or '').strip() for chave in FILA_FILTROS}
+    return hashlib.sha1(json.dumps(normalizados, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def encode_cursor(filters, sort, order, after):
+    """
+    Cursor opaco da próxima página: ordenação, filtros e a chave da última linha devolvida
+
+    O cursor não depende da posição da linha na fila: avaliações gravadas entre uma página
+    e outra não repetem nem pulam linhas já vistas.
+    """
+    chave = [valor.isoformat() if isinstance(valor, datetime) else valor for valor in after]
+    conteudo = json.dumps({'s': sort, 'o': order, 'f': _filtros_assinatura(filters), 'k': chave},
+                          separators=(',', ':'))
+    return base64.urlsafe_b64encode(conteudo.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, filters, sort, order):
+    """
+    Chave da última linha da página anterior, a partir do cursor
+
+    Raises:
+        ValueError: Cursor inválido ou gerado com outros filtros ou outra ordenação
+    """
+    try:
+        conteudo = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        chave = conteudo['k']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Cursor inválido")
+    if (conteudo.get('s'), conteudo.get('o')) != (sort, order) or conteudo.get('f') != _filtros_assinatura(filters):
+        raise ValueError("Cursor de outra busca: refaça a busca a partir da primeira página")
+
+    colunas = FILA_ORDENACOES[sort]
+    if not isinstance(chave, list) or len(chave) != len(colunas):
+        raise ValueError("Cursor inválido")
+    try:
+        return tuple(
+            datetime.fromisoformat(valor) if coluna is CurrentAssessment.assessment_date
+            else int(valor) if coluna is CurrentAssessment.external_id
+            else str(valor)
+            for coluna, valor in zip(colunas, chave)
+        )
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+
+
+def _depois_de(colunas, chave, descending):
+    """
+    Linhas depois da chave na ordenação (keyset), sem OFFSET
+
+    (c1, c2, c3) > (v1, v2, v3) vira c1 > v1 OR (c1 = v1 AND c2 > v2) OR ..., com a faixa
+    c1 >= v1 na frente para o banco posicionar o índice direto na chave.
+    """
+    maior = (lambda coluna, valor: coluna < valor) if descending else (lambda coluna, valor: coluna > valor)
+    alternativas = [
+        and_(*[coluna == valor for coluna, valor in zip(colunas[:i], chave[:i])], maior(colunas[i], chave[i]))
+        for i in range(len(colunas))
+    ]
+    faixa = colunas[0] <= chave[0] if descending else colunas[0] >= chave[0]
+    return and_(faixa, or_(*alternativas))
+
+
 class FraudeService:
     """Serviço para gerenciar a avaliação de fraudes"""
     
     def __init__(self):
         self.db = DatabaseManager()
-    
+
+    @staticmethod
+    def _fila_filtros(query, filters):
+        """
+        Filtros da tela como predicados indexáveis sobre current_assessments
+
+        Resultado por igualdade e período como faixa de assessment_date (o fim é inclusivo:
+        até o início do dia seguinte).
+        """
+        if filters.get('external_id'):
+            query = query.where(CurrentAssessment.external_id == int(filters['external_id']))
+
+        if filters.get('processo'):
+            query = query.where(CurrentAssessment.process_number.like(f"%{filters['processo']}%"))
+
+        if filters.get('assessment_result'):
+            query = query.where(CurrentAssessment.assessment_result == filters['assessment_result'])
+
+        if filters.get('reason_conclusion'):
+            query = query.where(CurrentAssessment.reason_conclusion == filters['reason_conclusion'])
+
+        if filters.get('start_date'):
+            query = query.where(CurrentAssessment.assessment_date >= datetime.strptime(filters['start_date'], '%d/%m/%Y'))
+
+        if filters.get('end_date'):
+            fim = datetime.strptime(filters['end_date'], '%d/%m/%Y') + timedelta(days=1)
+            query = query.where(CurrentAssessment.assessment_date < fim)
+        return query
+
+    @staticmethod
+    def _fila_query(filters, limit, after=None, sort='assessment_date', order='desc'):
+        """
+        Consulta de uma página da fila de fraude sobre current_assessments (avaliação atual
+        de cada processo)
+
+        A página começa depois da chave after, percorrendo o índice da ordenação escolhida
+        (FILA_ORDENACOES) a partir dela, sem OFFSET: o custo não cresce com a página.
+
+        Args:
+            sort (str): 'assessment_date', 'processo' ou 'assessment_result'
+            order (str): 'desc' ou 'asc'
+            after (tuple): Valores das colunas da ordenação na última linha da página anterior
+        """
+        colunas = FILA_ORDENACOES[sort]
+        descending = order == 'desc'
+        query = FraudeService._fila_filtros(select(
+            CurrentAssessment.external_id,
+            CurrentAssessment.process_number,
+            CurrentAssessment.assessment_date,
+            CurrentAssessment.assessment_result,
+            CurrentAssessment.reason_conclusion
+        ), filters)
+
+        if after is not None:
+            query = query.where(_depois_de(colunas, after, descending))
+        return query.order_by(*[coluna.desc() if descending else coluna.asc() for coluna in colunas]).limit(limit)
+
+    @staticmethod
+    def _fila_total_query(filters, limite=FRAUD_QUEUE_COUNT_LIMIT):
+        """Contagem das linhas da busca, interrompida em limite + 1"""
+        linhas = FraudeService._fila_filtros(select(CurrentAssessment.external_id), filters).limit(limite + 1)
+        return select(func.count()).select_from(linhas.subquery())
+
+    @staticmethod
+    def _format_fila_row(row):
+        return {
+            'external_id': row.external_id,
+            'processo': row.process_number,
+            'assessment_date': row.assessment_date.strftime('%d/%m/%Y') if row.assessment_date else None,
+            'assessment_result': row.assessment_result or 'Pendente',
+            'reason_conclusion': row.reason_conclusion
+        }
+
+    def get_processos_suspeitos_pagina(self, filters=None, limit=FRAUD_QUEUE_PAGE_SIZE, after=None,
+                                       sort='assessment_date', order='desc'):
+        """
+        Uma página da fila de fraude na ordenação escolhida
+
+        Paginação por chave (keyset): a próxima página começa depois da última linha
+        devolvida. A consulta busca uma linha além de limit, e next_after só é devolvido
+        quando ela existe (sem cursor para uma página vazia).
+
+        Args:
+            filters (dict): Filtros da tela (external_id, processo, assessment_result,
+                reason_conclusion, start_date e end_date em DD/MM/AAAA)
+            limit (int): Linhas por página
+            after (tuple): Chave da última linha da página anterior (next_after)
+            sort (str): 'assessment_date', 'processo' ou 'assessment_result'
+            order (str): 'desc' ou 'asc'
+
+        Returns:
+            dict: 'items' (linhas formatadas) e 'next_after' (chave da próxima página ou None)
+        """
+        query = self._fila_query(filters or {}, limit + 1, after, sort, order)
+        session = self.db.Session()
+        try:
+            rows = session.execute(query).all()
+        finally:
+            session.close()
+
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = tuple(getattr(rows[-1], coluna.key) for coluna in FILA_ORDENACOES[sort])
+        return {'items': [self._format_fila_row(row) for row in rows], 'next_after': next_after}
+
+    def count_processos_suspeitos(self, filters=None, limite=FRAUD_QUEUE_COUNT_LIMIT):
+        """
+        Total de linhas da busca, contado até limite
+
+        Returns:
+            tuple: (total, exato); acima do limite devolve (limite, False)
+        """
+        session = self.db.Session()
+        try:
+            total = session.execute(self._fila_total_query(filters or {}, limite)).scalar()
+        finally:
+            session.close()
+        return (total, True) if total <= limite else (limite, False)
+
+    def search_processos_suspeitos(self, params):
+        """
+        Busca paginada da tela de avaliação
+
+        Args:
+            params (dict): Filtros da tela e, opcionalmente, page_size, sort
+                ('assessment_date', 'processo' ou 'assessment_result'), order ('desc' ou
+                'asc') e cursor (next_cursor da página anterior)
+
+        Returns:
+            dict: 'items', 'next_cursor' (None na última página), 'page_size', 'sort', 'order'
+                e, só na primeira página, 'total' e 'total_exato'
+
+        Raises:
+            ValueError: Ordenação, tamanho de página, filtro ou cursor inválido
+        """
+        params = params or {}
+        sort = params.get('sort') or 'assessment_date'
+        order = (params.get('order') or 'desc').lower()
+        if sort not in FILA_ORDENACOES:
+            raise ValueError(f"Ordenação inválida: {sort} (use {', '.join(FILA_ORDENACOES)})")
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Direção inválida: {order} (use asc ou desc)")
+        try:
+            page_size = int(params.get('page_size') or FRAUD_QUEUE_PAGE_SIZE)
+        except (TypeError, ValueError):
+            raise ValueError(f"page_size inválido: {params.get('page_size')}")
+        page_size = min(max(page_size, 1), FRAUD_QUEUE_MAX_PAGE_SIZE)
+
+        filters = {chave: params.get(chave) for chave in FILA_FILTROS}
+        cursor = params.get('cursor')
+        after = decode_cursor(cursor, filters, sort, order) if cursor else None
+
+        pagina = self.get_processos_suspeitos_pagina(filters, page_size, after, sort, order)
+        resultado = {
+            'items': pagina['items'],
+            'next_cursor': encode_cursor(filters, sort, order, pagina['next_after']) if pagina['next_after'] else None,
+            'page_size': page_size,
+            'sort': sort,
+            'order': order,
+        }
+        if after is None:
+            resultado['total'], resultado['total_exato'] = self.count_processos_suspeitos(filters)
+        return resultado
+
     def get_processos_suspeitos(self, filters=None):
         """Retorna a lista de processos suspeitos de fraude com suas avaliações"""
         try:
-            if filters is None:
-                filters = {}
-            
-            query = """
-                SELECT 
-                    p.external_id,
-                    p.process_number as processo,
-                    fa.assessment_date,
-                    fa.assessment_result,
-                    fa.reason_conclusion
-                FROM processes p
-                LEFT JOIN agreements a ON a.process_id = p.id
-                LEFT JOIN (
-                    SELECT external_id, assessment_date, assessment_result, reason_conclusion,
-                           ROW_NUMBER() OVER (PARTITION BY external_id ORDER BY assessment_date DESC) as rn
-                    FROM fraud_assessments
-                ) fa ON fa.external_id = p.external_id AND fa.rn = 1
-                WHERE a.fraud_suspect = 1
-            """
-            
-            params = {}
-            
-            if filters.get('external_id'):
-                query += " AND p.external_id = :external_id"
-                params['external_id'] = filters['external_id']
-            
-            if filters.get('processo'):
-                query += " AND p.process_number LIKE :processo"
-                params['processo'] = f"%{filters['processo']}%"
-            
-            if filters.get('assessment_result'):
-                query += " AND fa.assessment_result = :assessment_result"
-                params['assessment_result'] = filters['assessment_result']
-            
-            if filters.get('reason_conclusion'):
-                query += " AND fa.reason_conclusion = :reason_conclusion"
-                params['reason_conclusion'] = filters['reason_conclusion']
-            
-            if filters.get('start_date'):
-                query += " AND DATE(fa.assessment_date) >= :start_date"
-                params['start_date'] = datetime.strptime(filters['start_date'], '%d/%m/%Y').date()
-            
-            if filters.get('end_date'):
-                query += " AND DATE(fa.assessment_date) <= :end_date"
-                params['end_date'] = datetime.strptime(filters['end_date'], '%d/%m/%Y').date()
-            
-            query += " ORDER BY fa.assessment_date DESC"
-            
-            session = self.db.Session()
-            try:
-                result = session.execute(text(query), params)
-                rows = result.fetchall()
-                
-                formatted_results = []
-                for row in rows:
-                    assessment_date = None
-                    if row.assessment_date:
-                        assessment_date = datetime.strptime(row.assessment_date.split('.')[0], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%Y')
-                    
-                    formatted_results.append({
-                        'external_id': row.external_id,
-                        'processo': row.processo,
-                        'assessment_date': assessment_date,
-                        'assessment_result': row.assessment_result or 'Pendente',
-                        'reason_conclusion': row.reason_conclusion
-                    })
-                
-                return formatted_results
-            finally:
-                session.close()
+            formatted_results = []
+            after = None
+            while True:
+                pagina = self.get_processos_suspeitos_pagina(filters, after=after)
+                formatted_results.extend(pagina['items'])
+                after = pagina['next_after']
+                if after is None:
+                    return formatted_results
                 
         except Exception as e:
             logger.error(f"Erro ao buscar processos suspeitos: {str(e)}")
@@ -100,50 +282,24 @@ class FraudeService:
         Returns:
             dict: Dados do processo ou None se não encontrado
         """
+        session = self.db.Session()
         try:
-            session = self.db.Session()
-            
-            query = """
-                SELECT p.*, a.status as acordo_status, a.fraud_suspect as avaliacao,
-                       fa.assessment_result, fa.reason_conclusion, fa.assessment_date
-                FROM processes p
-                LEFT JOIN agreements a ON a.process_id = p.id
-                LEFT JOIN (
-                    SELECT external_id, assessment_result, reason_conclusion, assessment_date,
-                           ROW_NUMBER() OVER (PARTITION BY external_id ORDER BY assessment_date DESC) as rn
-                    FROM fraud_assessments
-                ) fa ON fa.external_id = p.external_id AND fa.rn = 1
-                WHERE p.external_id = :id
-            """
-            
-            result = session.execute(text(query), {'id': processo_id})
-            row = result.fetchone()
-            
-            if not row:
+            process = session.query(Process).filter(Process.external_id == int(processo_id)).first()
+            if not process:
                 return None
-            
-            # Tratar a data com segurança
-            data_cadastro = None
-            if row.created_at:
-                try:
-                    if isinstance(row.created_at, str):
-                        data_cadastro = datetime.strptime(row.created_at.split('.')[0], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%Y')
-                    else:
-                        data_cadastro = row.created_at.strftime('%d/%m/%Y')
-                except Exception as e:
-                    logger.warning(f"Erro ao formatar data: {str(e)}")
-                    data_cadastro = row.created_at if isinstance(row.created_at, str) else None
-                
+            atual = session.get(CurrentAssessment, process.external_id)
+
+            data_cadastro = process.data_cadastro or process.created_at
             return {
-                'external_id': row.external_id,
-                'processo': row.process_number,
-                'data_cadastro': data_cadastro,
-                'status': row.status,
-                'acordo': row.acordo_status,
-                'avaliacao': row.avaliacao,
-                'assessment_result': row.assessment_result or 'Pendente',
-                'reason_conclusion': row.reason_conclusion,
-                'assessment_date': row.assessment_date.strftime('%d/%m/%Y %H:%M') if row.assessment_date else None
+                'external_id': process.external_id,
+                'processo': process.numero,
+                'data_cadastro': data_cadastro.strftime('%d/%m/%Y') if data_cadastro else None,
+                'status': process.status,
+                'acordo': 'Sim' if process.tem_acordo else 'Não',
+                'avaliacao': 'Sim' if process.suspeita_fraude else 'Não',
+                'assessment_result': atual.assessment_result if atual else 'Pendente',
+                'reason_conclusion': atual.reason_conclusion if atual else None,
+                'assessment_date': atual.assessment_date.strftime('%d/%m/%Y %H:%M') if atual else None
             }
             
         except Exception as e:
@@ -155,16 +311,22 @@ class FraudeService:
     def save_assessment(self, external_id, data):
         """
         Salva uma avaliação de fraude
+
+        A avaliação mais recente do processo é atualizada (ou criada) e a avaliação atual da
+        fila, recalculada na mesma transação.
         """
         try:
             with self.db.Session() as session:
-                # Verifica se já existe uma avaliação para este processo
-                assessment = session.query(FraudAssessment).filter_by(external_id=external_id).first()
+                # Avaliação mais recente do processo
+                assessment = session.query(FraudAssessment)\
+                    .filter_by(external_id=int(external_id))\
+                    .order_by(FraudAssessment.assessment_date.desc(), FraudAssessment.id.desc())\
+                    .first()
                 
                 if not assessment:
                     # Se não existe, cria uma nova
                     assessment = FraudAssessment(
-                        external_id=external_id,
+                        external_id=int(external_id),
                         process_number=data['process_number'],
                         assessment_result=data['assessment_result'],
                         reason_conclusion=data['reason_conclusion'],
@@ -178,6 +340,7 @@ class FraudeService:
                     assessment.assessment_date = datetime.utcnow()
                     assessment.username = data.get('username')  # Atualiza o usuário que fez a avaliação
                 
+                refresh_current_assessments(session, [int(external_id)])
                 session.commit()
                 
                 return {
@@ -185,7 +348,7 @@ class FraudeService:
                     'process_number': assessment.process_number,
                     'assessment_result': assessment.assessment_result,
                     'reason_conclusion': assessment.reason_conclusion,
-                    'assessment_date': datetime.strptime(assessment.assessment_date.split('.')[0], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%Y'),
+                    'assessment_date': assessment.assessment_date.strftime('%d/%m/%Y'),
                     'username': assessment.username
                 }
                 
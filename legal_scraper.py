@@ -4,6 +4,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 import time
+import threading
 import pyotp
 import os
 from dotenv import load_dotenv
@@ -13,22 +14,32 @@ from selenium.webdriver.support.ui import Select
 from selenium.webdriver.common.action_chains import ActionChains
 import traceback
 from bs4 import BeautifulSoup, Comment
-from scraper import GridScraper, ProcessDetailsScraper
+from scraper import GridScraper, ProcessDetailsScraper, ExtractionWorkerPool
 from database.db_manager import DatabaseManager  # Corrigindo o import
-from config import get_logger  # Importar get_logger do config.py
+from database.checkpoints import ExtractionCheckpoint
+from config import get_logger, EXTRACTION_WORKERS, EXTRACTION_CHECKPOINTS, CHECKPOINT_MAX_RESUMES  # Importar get_logger do config.py
 
 # Configurar logging
 logger = get_logger(__name__)
 
+# Último passo TOTP (janela de 30 s) usado em um login, por segredo MFA: o navegador
+# principal e os workers do pool logam com o mesmo segredo, e cada código só pode ser
+# enviado uma vez (servidores com proteção contra replay recusam o segundo envio)
+_mfa_lock = threading.Lock()
+_mfa_last_step = {}
+
 class LegalScraper:
-    def __init__(self, headless=True, enable_screenshots=False):
+    def __init__(self, headless=True, enable_screenshots=False, workers=None):
         """
         Inicializa o scraper
         Args:
             headless (bool): Se True, executa em modo headless. Se False, mostra o navegador
             enable_screenshots (bool): Se True, captura screenshots durante a extração
+            workers (int): Navegadores em paralelo na extração dos detalhes (padrão: EXTRACTION_WORKERS)
         """
         self.driver = None
+        self.workers = workers or EXTRACTION_WORKERS
+        self.worker_pool = None
         self.base_url = "https://cetelem.djur.adv.br/"
         self.headless = headless
         self.enable_screenshots = enable_screenshots
@@ -129,10 +140,23 @@ class LegalScraper:
             return False
 
     def get_mfa_code(self):
-        """Gera o código MFA atual"""
+        """
+        Gera o código MFA atual, de um passo TOTP ainda não usado neste processo
+
+        Se outro login já enviou o código da janela atual, aguarda a próxima janela.
+        """
         if not self.totp:
             raise ValueError("MFA secret não configurado")
-        return self.totp.now()
+        with _mfa_lock:
+            step = int(time.time() // self.totp.interval)
+            last_step = _mfa_last_step.get(self.mfa_secret)
+            if last_step is not None and step <= last_step:
+                wait = (last_step + 1) * self.totp.interval - time.time()
+                self.logger.info(f"Código MFA da janela atual já usado; aguardando {wait:.1f}s pelo próximo")
+                time.sleep(max(0.0, wait))
+                step = max(last_step + 1, int(time.time() // self.totp.interval))
+            _mfa_last_step[self.mfa_secret] = step
+            return self.totp.generate_otp(step)
         
     def wait_and_find_element(self, by, value, timeout=10, description="elemento"):
         """Função auxiliar para esperar e encontrar elementos"""
@@ -347,22 +371,70 @@ class LegalScraper:
             self.logger.error(f"Erro inesperado: {str(e)}\nDetalhes: {type(e).__name__}, {str(e)}\nStack: {traceback.format_exc()}")
             return False, f"Erro durante o login automático: {str(e)}"
             
-    def search_processes(self, start_date=None, end_date=None, status=None, process_number=None, acordo=None, suspeita_fraude=None):
-        """Realiza a busca de processos com os filtros fornecidos"""
+    def search_processes(self, start_date=None, end_date=None, status=None, process_number=None, acordo=None, suspeita_fraude=None, progress=None, keep_results=True):
+        """
+        Realiza a busca de processos com os filtros fornecidos
+        
+        Args:
+            progress: Objeto de acompanhamento (ExtractionJob) repassado ao GridScraper
+            keep_results (bool): Se False, os processos são entregues apenas a progress e não
+                acumulados no retorno (ver GridScraper.extract_grid_data)
+        """
         try:
-            # Aplica os filtros e realiza a busca
-            self._apply_filters(
-                start_date=start_date,
-                end_date=end_date,
-                status=status,
-                process_number=process_number
-            )
-            
-            # Instancia os scrapers específicos
-            grid_scraper = GridScraper(self.driver)
-            
-            # Extrai dados do grid
-            result = grid_scraper.extract_grid_data()
+            # Checkpoint da execução: uma busca interrompida com os mesmos filtros é retomada
+            checkpoint = None
+            if EXTRACTION_CHECKPOINTS:
+                checkpoint = ExtractionCheckpoint.open({
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'status': status,
+                    'process_number': process_number
+                })
+
+            attempt = 0
+            while True:
+                try:
+                    # Aplica os filtros e realiza a busca
+                    self._apply_filters(
+                        start_date=start_date,
+                        end_date=end_date,
+                        status=status,
+                        process_number=process_number
+                    )
+                    
+                    # Instancia os scrapers específicos
+                    grid_scraper = GridScraper(self.driver)
+                    
+                    # Extrai dados do grid
+                    result = grid_scraper.extract_grid_data(
+                        worker_pool=self._get_worker_pool(),
+                        progress=progress,
+                        keep_results=keep_results,
+                        checkpoint=checkpoint
+                    )
+                except Exception as e:
+                    if checkpoint is None or attempt >= CHECKPOINT_MAX_RESUMES:
+                        if checkpoint is not None:
+                            checkpoint.close(interrupted=True)
+                        raise
+                    self.logger.error(f"Erro durante a execução {checkpoint.run_id}: {str(e)}")
+                    result = None
+
+                # Execução completa, cancelada ou sem retomadas restantes
+                if (checkpoint is None or checkpoint.is_complete()
+                        or (progress is not None and progress.cancelled)
+                        or attempt >= CHECKPOINT_MAX_RESUMES):
+                    break
+
+                attempt += 1
+                self.logger.warning(
+                    f"Execução {checkpoint.run_id} incompleta ({checkpoint.pending_count()} processos pendentes, "
+                    f"última página {checkpoint.last_page}), retomando ({attempt}/{CHECKPOINT_MAX_RESUMES})"
+                )
+                self._recover_session()
+
+            if checkpoint is not None:
+                checkpoint.close(interrupted=not checkpoint.is_complete())
             
             # Para cada processo que tem acordo, busca os detalhes adicionais
             if result and 'raw_data' in result:
@@ -373,31 +445,8 @@ class LegalScraper:
                     process_id = row[0]
                     process_data = result['raw_data'].get(process_id, {})
                     
-                    # Verifica se tem acordo
-                    has_acordo = False
-                    has_suspeita_fraude = False
-                    
-                    # Verifica nos detalhes do acordo
-                    if 'detalhes_acordo' in process_data and process_data['detalhes_acordo'] != []:
-                        acordo_detail = process_data.get('detalhes_acordo', {})
-                        if acordo_detail.get('is_acordo') == 'Sim' or True:
-                            has_acordo = True
-                        if acordo_detail.get('suspeita_fraude') == 'Sim' or True:
-                            has_suspeita_fraude = True
-                    
-                    # Aplica os filtros
-                    should_include = True
-                    
-                    # Filtro de acordo
-                    if acordo and acordo != "Todos":
-                        should_include = should_include and ((acordo == "Sim") == has_acordo)
-                    
-                    # Filtro de suspeita de fraude
-                    if suspeita_fraude and suspeita_fraude != "Todos":
-                        should_include = should_include and ((suspeita_fraude == "Sim") == has_suspeita_fraude)
-                    
                     # Se passou nos filtros, inclui nos resultados
-                    if should_include:
+                    if self.matches_result_filters(process_data, acordo, suspeita_fraude):
                         filtered_grid_data.append(row)
                         filtered_raw_data[process_id] = process_data
                 
@@ -411,6 +460,56 @@ class LegalScraper:
             self.logger.error(f"Erro ao buscar processos: {str(e)}")
             raise
 
+    def _recover_session(self):
+        """Reinicia o Chrome se ele caiu e refaz o login se a sessão expirou, para retomar uma execução"""
+        try:
+            _ = self.driver.current_url
+        except Exception:
+            self.logger.warning("Navegador principal inativo, reiniciando")
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+        self.ensure_logged_in()
+
+    @staticmethod
+    def matches_result_filters(process_data, acordo=None, suspeita_fraude=None):
+        """Verifica se os dados de um processo atendem aos filtros de acordo e suspeita de fraude"""
+        # Verifica se tem acordo
+        has_acordo = False
+        has_suspeita_fraude = False
+
+        # Verifica nos detalhes do acordo
+        if 'detalhes_acordo' in process_data and process_data['detalhes_acordo'] != []:
+            acordo_detail = process_data.get('detalhes_acordo', {})
+            if acordo_detail.get('is_acordo') == 'Sim' or True:
+                has_acordo = True
+            if acordo_detail.get('suspeita_fraude') == 'Sim' or True:
+                has_suspeita_fraude = True
+
+        # Aplica os filtros
+        should_include = True
+
+        # Filtro de acordo
+        if acordo and acordo != "Todos":
+            should_include = should_include and ((acordo == "Sim") == has_acordo)
+
+        # Filtro de suspeita de fraude
+        if suspeita_fraude and suspeita_fraude != "Todos":
+            should_include = should_include and ((suspeita_fraude == "Sim") == has_suspeita_fraude)
+
+        return should_include
+
+    def _get_worker_pool(self):
+        """Retorna o pool de navegadores para extração paralela (None se a extração for sequencial)"""
+        if self.workers > 1 and self.worker_pool is None:
+            self.worker_pool = ExtractionWorkerPool(
+                lambda: LegalScraper(headless=self.headless, enable_screenshots=self.enable_screenshots, workers=1),
+                num_workers=self.workers
+            )
+        return self.worker_pool
+
     def _apply_filters(self, start_date=None, end_date=None, status=None, process_number=None):
         """Aplica os filtros de busca no formulário"""
         try:
@@ -660,7 +759,10 @@ class LegalScraper:
             raise
 
     def close(self):
-        """Fecha o driver do Chrome"""
+        """Fecha o driver do Chrome e os navegadores do pool de extração"""
+        if self.worker_pool:
+            self.worker_pool.close()
+            self.worker_pool = None
         if self.driver:
             try:
                 self.driver.quit()
@@ -1,4 +1,6 @@
 from .grid_scraper import GridScraper
 from .process_details_scraper import ProcessDetailsScraper
+from .worker_pool import ExtractionWorkerPool
+from .http_fetcher import HttpPageFetcher
 
-__all__ = ['GridScraper', 'ProcessDetailsScraper']
+__all__ = ['GridScraper', 'ProcessDetailsScraper', 'ExtractionWorkerPool', 'HttpPageFetcher']
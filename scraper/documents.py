@@ -0,0 +1,108 @@
+import re
+from config import get_logger
+
+logger = get_logger(__name__)
+
+# Motivos registrados na decisão de suspeita de fraude de um acordo
+MOTIVO_DOCUMENTO_CONFERE = 'documento_confere'        # CPF/CNPJ do titular igual ao da parte adversa
+MOTIVO_DOCUMENTO_DIVERGENTE = 'documento_divergente'  # CPF/CNPJ válidos e diferentes
+MOTIVO_NOME_CONFERE = 'nome_confere'                  # Sem documentos válidos; nome do titular confere
+MOTIVO_NOME_DIVERGENTE = 'nome_divergente'            # Sem documentos válidos; nome do titular não confere
+MOTIVO_SEM_TITULAR = 'sem_titular'                    # Acordo sem nome do titular
+
+_NON_DIGIT_PATTERN = re.compile(r'\D')
+# Posição do CPF/CNPJ da parte adversa no grid_data de uma entrada do catálogo (a mesma
+# lida em extract_grid_data; o nome da parte adversa fica na posição 3)
+_CATALOG_DOCUMENT_INDEX = 4
+
+
+def normalize_document(value):
+    """
+    Mantém apenas os dígitos de um CPF/CNPJ
+
+    Documentos lidos de planilhas ou da base às vezes perdem os zeros à esquerda: até
+    11 dígitos são completados como CPF e entre 12 e 14 como CNPJ.
+
+    Returns:
+        str: 11 ou 14 dígitos, ou '' se o valor não tiver formato de CPF/CNPJ
+    """
+    if not value:
+        return ''
+    digits = _NON_DIGIT_PATTERN.sub('', str(value))
+    if len(digits) < 9 or len(digits) > 14:
+        return ''
+    return digits.zfill(11) if len(digits) <= 11 else digits.zfill(14)
+
+
+def _check_digit(digits, weights):
+    resto = sum(int(d) * w for d, w in zip(digits, weights)) % 11
+    return '0' if resto < 2 else str(11 - resto)
+
+
+def is_valid_cpf(digits):
+    """Valida os dígitos verificadores de um CPF já normalizado (11 dígitos)"""
+    if len(digits) != 11 or digits == digits[0] * 11:
+        return False
+    primeiro = _check_digit(digits[:9], range(10, 1, -1))
+    segundo = _check_digit(digits[:10], range(11, 1, -1))
+    return digits[9:] == primeiro + segundo
+
+
+def is_valid_cnpj(digits):
+    """Valida os dígitos verificadores de um CNPJ já normalizado (14 dígitos)"""
+    if len(digits) != 14 or digits == digits[0] * 14:
+        return False
+    primeiro = _check_digit(digits[:12], [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+    segundo = _check_digit(digits[:13], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+    return digits[12:] == primeiro + segundo
+
+
+def valid_document(value):
+    """
+    Normaliza um CPF/CNPJ e confere os dígitos verificadores
+
+    Returns:
+        str: Os dígitos do documento, ou None se estiver ausente, mascarado ou inválido
+    """
+    digits = normalize_document(value)
+    if not digits:
+        return None
+    if is_valid_cpf(digits) or is_valid_cnpj(digits):
+        return digits
+    logger.debug(f"Documento com dígitos verificadores inválidos: '{value}'")
+    return None
+
+
+def compare_documents(documento_titular, documentos_parte):
+    """
+    Compara o CPF/CNPJ do titular do acordo com os documentos conhecidos da parte adversa
+
+    Args:
+        documento_titular (str): CPF/CNPJ do titular, em qualquer formatação
+        documentos_parte (list): CPF/CNPJ da parte adversa vindos de fontes diferentes
+            (partes do processo, página do acordo, grid)
+
+    Returns:
+        str: MOTIVO_DOCUMENTO_CONFERE ou MOTIVO_DOCUMENTO_DIVERGENTE, ou None quando faltar
+             documento válido de um dos lados e a decisão depender dos nomes
+    """
+    titular = valid_document(documento_titular)
+    if titular is None:
+        return None
+    partes = {doc for doc in (valid_document(value) for value in documentos_parte) if doc}
+    if not partes:
+        return None
+    return MOTIVO_DOCUMENTO_CONFERE if titular in partes else MOTIVO_DOCUMENTO_DIVERGENTE
+
+
+def entry_documents(entry):
+    """
+    CPF/CNPJ da parte adversa na linha do grid de uma entrada do catálogo
+
+    Returns:
+        list: Documentos a repassar como documentos_parte na verificação dos acordos do processo
+    """
+    grid_data = entry.get('grid_data') or []
+    if len(grid_data) <= _CATALOG_DOCUMENT_INDEX:
+        return []
+    return [grid_data[_CATALOG_DOCUMENT_INDEX]]
@@ -6,8 +6,12 @@ import time
 import logging
 import re
 from .process_details_scraper import ProcessDetailsScraper
+from .page_parsers import parse_grid_rows
+from .documents import entry_documents
 import traceback
 from database.db_manager import DatabaseManager  # Corrigindo o import
+from database.batch_writer import ProcessBatchWriter
+from database.checkpoints import STATE_SCRAPED, STATE_SAVED, STATE_FAILED
 from config import get_logger
 
 logger = get_logger(__name__)
@@ -16,6 +20,8 @@ class GridScraper:
     def __init__(self, driver):
         self.driver = driver
         self.process_details_scraper = ProcessDetailsScraper(driver)
+        # Uma única instância por scraper; engine e pool de conexões são compartilhados
+        self.db = DatabaseManager()
         
     def wait_for_grid_load(self, timeout=30):
         """Aguarda o carregamento completo do grid com retentativas"""
@@ -445,11 +451,93 @@ class GridScraper:
             logger.error(f"Erro ao procurar botão de próxima página: {str(e)}")
             return None
 
-    def catalog_processes(self):
-        """Cataloga todos os processos do grid e seus links"""
+    def _read_page_rows(self, table):
+        """
+        Lê as linhas da página atual do grid
+        
+        Captura o outerHTML da tabela uma única vez e interpreta todas as linhas
+        offline; se o snapshot falhar, recorre à leitura célula a célula pelo WebDriver.
+        """
+        try:
+            table_html = table.get_attribute('outerHTML')
+            return parse_grid_rows(table_html, self.driver.current_url)
+        except Exception as e:
+            logger.warning(f"Falha ao interpretar o HTML do grid, usando leitura pelo WebDriver: {str(e)}")
+
+        page_rows = []
+        for row_index, row in enumerate(table.find_elements(By.CSS_SELECTOR, "tbody tr"), 1):
+            try:
+                cells = row.find_elements(By.TAG_NAME, "td")
+                if len(cells) < 10:
+                    continue
+                    
+                # Extrai dados básicos da linha
+                cell_data = [cell.text.strip() for cell in cells]
+                
+                # Extrai o ID e link do processo
+                process_link = cells[0].find_element(By.TAG_NAME, "a")
+                process_id = process_link.get_attribute("data-id") or cell_data[1]
+                details_url = process_link.get_attribute("href")
+
+                page_rows.append((process_id, details_url, cell_data))
+                
+            except Exception as e:
+                logger.error(f"Erro ao catalogar linha {row_index}: {str(e)}")
+                continue
+
+        return page_rows
+
+    def go_to_page(self, target_page):
+        """
+        Avança o grid até a página informada sem ler as linhas das páginas intermediárias
+        
+        Usa o link visível de maior número que não ultrapasse a página alvo, recorrendo
+        ao botão de próxima página quando o link direto não está na paginação.
+        
+        Returns:
+            int: Página em que o grid ficou
+        """
+        current_page = self.get_pagination_info()["current_page"]
+        while current_page < target_page:
+            best_link = None
+            best_page = current_page
+            for element in self.driver.find_elements(By.CSS_SELECTOR, "ul.pagination li:not(.active):not(.disabled) a"):
+                page = self.get_page_number(element)
+                if page and best_page < page <= target_page:
+                    best_link, best_page = element, page
+            if best_link is None:
+                best_link = self.find_next_page_button()
+                best_page = current_page + 1
+            if best_link is None or not self.click_next_page_button(best_link):
+                logger.warning(f"Não foi possível avançar da página {current_page} para a página {target_page}")
+                break
+            time.sleep(2)
+            self.wait_for_grid_load_after_navigation()
+            current_page = best_page
+        logger.info(f"Grid posicionado na página {current_page}")
+        return current_page
+
+    def catalog_processes(self, progress=None, checkpoint=None):
+        """
+        Cataloga todos os processos do grid e seus links
+        
+        Args:
+            progress: Objeto de acompanhamento (ExtractionJob), notificado a cada página
+            checkpoint (ExtractionCheckpoint): Se informado, cada página catalogada é gravada e
+                uma execução interrompida continua a partir da página seguinte à última gravada
+        """
         try:
             logger.info("Iniciando catalogação dos processos...")
             catalog = []
+            current_page = 1
+
+            # Retoma o catálogo da execução anterior, se houver
+            if checkpoint is not None:
+                catalog = self._restore_catalog(checkpoint)
+                if checkpoint.catalog_complete:
+                    logger.info(f"Catálogo restaurado do checkpoint: {len(catalog)} processos")
+                    return catalog
+                current_page = checkpoint.last_page + 1
             
             # Obtém informações de paginação
             pagination_info = self.get_pagination_info()
@@ -461,8 +549,12 @@ class GridScraper:
             else:
                 total_records = total_pages * 50
                 logger.info(f"Total estimado de registros: {total_records} (em {total_pages} páginas)")
+
+            if current_page > 1:
+                logger.info(f"Retomando catalogação na página {current_page}/{total_pages} ({len(catalog)} processos já catalogados)")
+                if current_page <= total_pages and self.go_to_page(current_page) != current_page:
+                    return catalog
             
-            current_page = 1
             processed_total = 0
             
             while current_page <= total_pages:
@@ -473,78 +565,27 @@ class GridScraper:
                     EC.presence_of_element_located((By.CSS_SELECTOR, "table.table"))
                 )
                 
-                # Encontra todas as linhas da tabela
-                rows = table.find_elements(By.CSS_SELECTOR, "tbody tr")
-                rows_in_page = len(rows)
-                logger.info(f"Encontradas {rows_in_page} linhas na página atual")
-                
-                # Processa cada linha para extrair informações básicas
-                for row_index, row in enumerate(rows, 1):
-                    try:
-                        processed_total += 1
-                        cells = row.find_elements(By.TAG_NAME, "td")
-                        if len(cells) < 10:
-                            continue
-                            
-                        # Extrai dados básicos da linha
-                        cell_data = [cell.text.strip() for cell in cells]
-                        
-                        # Extrai o ID e link do processo
-                        process_link = cells[0].find_element(By.TAG_NAME, "a")
-                        process_id = process_link.get_attribute("data-id") or cell_data[1]
-                        details_url = process_link.get_attribute("href")
+                # Lê todas as linhas da página a partir de um único snapshot do HTML
+                page_rows = self._read_page_rows(table)
+                processed_total += len(page_rows)
+                logger.info(f"Encontradas {len(page_rows)} linhas na página atual")
 
-                        # Primeiro verifica se o processo existe no banco de dados
-                        db = DatabaseManager()
-                        existing_process = db.get_process_by_id(process_id)
-
-                        if not existing_process:                      
-                            # Monta o registro do catálogo
-                            catalog_entry = {
-                                'id': process_id,
-                                'details_url': details_url,
-                                'origem': 'scrape',
-                                'grid_data': [
-                                    process_id,              # ID do processo
-                                    cell_data[1],            # Numero do Processo
-                                    cell_data[2],            # Adverso
-                                    cell_data[3],            # CPF/CNPJ
-                                    cell_data[4],            # Comarca
-                                    cell_data[5],            # Estado
-                                    cell_data[6],            # Tipo
-                                    cell_data[7],            # Status
-                                    cell_data[8],            # Escritório
-                                    False,                   # Tem acordo?
-                                    False,                   # Suspeita de fraude
-                                ]
-                            }
-                        else:
-                            # Monta o registro do catálogo vindo da base de dados
-                            catalog_entry = {
-                                'id': process_id,
-                                'details_url': details_url,
-                                'origem': 'base',
-                                'base_data': existing_process,
-                                'grid_data': [
-                                    process_id,                                       # ID do processo
-                                    existing_process.get('numero'),                   # Numero do Processo
-                                    existing_process.get('parte_adversa'),            # Adverso
-                                    existing_process.get('cpf_cnpj_parte_adverso'),   # CPF/CNPJ
-                                    existing_process.get('comarca'),                  # Comarca
-                                    existing_process.get('estado'),                   # Estado
-                                    existing_process.get('fase'),                     # Tipo
-                                    existing_process.get('status'),                   # Status
-                                    existing_process.get('escritorio_celula'),        # Escritório
-                                    existing_process.get('tem_acordo'),               # Tem acordo?
-                                    existing_process.get('suspeita_fraude'),          # Suspeita de fraude
-                                ]
-                            }
-
-                        catalog.append(catalog_entry)
-                        
-                    except Exception as e:
-                        logger.error(f"Erro ao catalogar linha {row_index} da página {current_page}: {str(e)}")
-                        continue
+                # Verifica de uma só vez quais processos da página já existem no banco de dados
+                existing_processes = self.db.get_processes_by_ids([process_id for process_id, _, _ in page_rows])
+
+                for process_id, details_url, cell_data in page_rows:
+                    catalog.append(self._build_catalog_entry(
+                        process_id, details_url, cell_data, existing_processes.get(str(process_id))
+                    ))
+
+                if checkpoint is not None:
+                    checkpoint.record_page(current_page, total_pages, page_rows)
+
+                if progress is not None:
+                    progress.page_catalogued(current_page, total_pages, len(catalog))
+                    if progress.cancelled:
+                        logger.info(f"Catalogação cancelada na página {current_page}/{total_pages}")
+                        break
                 
                 # Navega para a próxima página se não for a última
                 if current_page < total_pages:
@@ -556,6 +597,8 @@ class GridScraper:
                     else:
                         break
                 else:
+                    if checkpoint is not None:
+                        checkpoint.finish_catalog()
                     break
             
             logger.info(f"Catalogação concluída. Total de {len(catalog)} processos catalogados")
@@ -565,13 +608,103 @@ class GridScraper:
             logger.error(f"Erro ao catalogar processos: {str(e)}")
             return []
 
-    def extract_grid_data(self):
-        """Extrai dados do grid de processos usando o catálogo"""
+    def _restore_catalog(self, checkpoint):
+        """Reconstrói o catálogo gravado no checkpoint, consultando o banco para saber o que já foi salvo"""
+        entries = checkpoint.load_entries()
+        if not entries:
+            return []
+        existing_processes = self.db.get_processes_by_ids([process_id for process_id, _, _, _ in entries])
+        return [
+            self._build_catalog_entry(process_id, details_url, cell_data, existing_processes.get(str(process_id)))
+            for process_id, details_url, cell_data, _ in entries
+        ]
+
+    def _build_catalog_entry(self, process_id, details_url, cell_data, existing_process):
+        """Monta o registro do catálogo a partir da linha do grid ou dos dados da base"""
+        if not existing_process:
+            # Monta o registro do catálogo
+            return {
+                'id': process_id,
+                'details_url': details_url,
+                'origem': 'scrape',
+                'grid_data': [
+                    process_id,              # ID do processo
+                    cell_data[1],            # Numero do Processo
+                    cell_data[2],            # Adverso
+                    cell_data[3],            # CPF/CNPJ
+                    cell_data[4],            # Comarca
+                    cell_data[5],            # Estado
+                    cell_data[6],            # Tipo
+                    cell_data[7],            # Status
+                    cell_data[8],            # Escritório
+                    False,                   # Tem acordo?
+                    False,                   # Suspeita de fraude
+                ]
+            }
+
+        # Monta o registro do catálogo vindo da base de dados
+        return {
+            'id': process_id,
+            'details_url': details_url,
+            'origem': 'base',
+            'base_data': existing_process,
+            'grid_data': [
+                process_id,                                       # ID do processo
+                existing_process.get('numero'),                   # Numero do Processo
+                existing_process.get('parte_adversa'),            # Adverso
+                existing_process.get('cpf_cnpj_parte_adverso'),   # CPF/CNPJ
+                existing_process.get('comarca'),                  # Comarca
+                existing_process.get('estado'),                   # Estado
+                existing_process.get('fase'),                     # Tipo
+                existing_process.get('status'),                   # Status
+                existing_process.get('escritorio_celula'),        # Escritório
+                existing_process.get('tem_acordo'),               # Tem acordo?
+                existing_process.get('suspeita_fraude'),          # Suspeita de fraude
+            ]
+        }
+
+    def _scrape_sequential(self, entries):
+        """Extrai os detalhes das entradas do catálogo, uma a uma, com o driver principal"""
+        for entry in entries:
+            process_details = None
+            try:
+                # Navega para a página de detalhes
+                self.driver.get(entry['details_url'])
+                process_details = self.process_details_scraper.extract_process_details(
+                    entry['id'], [entry], documentos_parte=entry_documents(entry)
+                )
+            except Exception as e:
+                logger.error(f"Erro ao extrair detalhes do processo {entry['id']}: {str(e)}")
+            yield process_details
+
+    def extract_grid_data(self, worker_pool=None, progress=None, keep_results=True, checkpoint=None):
+        """
+        Extrai dados do grid de processos usando o catálogo
+        
+        Args:
+            worker_pool (ExtractionWorkerPool): Se informado, os detalhes dos processos são
+                extraídos em paralelo pelos navegadores do pool; a gravação no banco continua
+                sendo enfileirada aqui, na ordem do catálogo
+            progress: Objeto de acompanhamento (ExtractionJob); recebe o progresso da
+                catalogação e de cada processo e pode cancelar a extração entre processos
+            keep_results (bool): Se False, cada processo é descartado logo após ser entregue a
+                progress, e grid_data/raw_data voltam vazios (memória constante na extração)
+            checkpoint (ExtractionCheckpoint): Registra o catálogo e o estado de cada processo
+                (Extraído, Salvo, Falha) para que a execução possa ser retomada
+
+        Os processos extraídos são gravados em lotes por um ProcessBatchWriter, em segundo
+        plano; o retorno só acontece depois que todos foram gravados (ou falharam).
+        """
+        writer = ProcessBatchWriter(
+            on_saved=(lambda ids: checkpoint.mark_many(ids, STATE_SAVED)) if checkpoint is not None else None,
+            on_failed=(lambda pid, erro: checkpoint.mark(pid, STATE_FAILED, erro)) if checkpoint is not None else None,
+            on_received=(lambda ids: checkpoint.mark_many(ids, STATE_SCRAPED)) if checkpoint is not None else None
+        )
         try:
             logger.info("Iniciando extração de dados do grid...")
             
             # Cataloga todos os processos primeiro
-            catalog = self.catalog_processes()
+            catalog = self.catalog_processes(progress=progress, checkpoint=checkpoint)
             if not catalog:
                 logger.error("Não foi possível catalogar os processos")
                 return {
@@ -583,21 +716,39 @@ class GridScraper:
             
             # Inicializa estruturas de dados
             extracted_data = []
+            processed_count = 0
             raw_data = {}
             total_records = len(catalog)
+
+            # Detalhes dos processos que precisam de scrape, devolvidos na ordem do catálogo
+            scrape_entries = [entry for entry in catalog if entry['origem'] == 'scrape']
+            if worker_pool is not None and scrape_entries:
+                logger.info(f"Extraindo {len(scrape_entries)} processos com {worker_pool.num_workers} workers")
+                scraped_details = worker_pool.imap(scrape_entries)
+            else:
+                scraped_details = self._scrape_sequential(scrape_entries)
+
+            if progress is not None:
+                progress.catalog_complete(total_records, len(scrape_entries))
+
+            # Processos que já estão no banco não precisam de extração
+            if checkpoint is not None:
+                checkpoint.mark_many([entry['id'] for entry in catalog if entry['origem'] == 'base'], STATE_SAVED)
             
             # Processa cada processo do catálogo
             for index, entry in enumerate(catalog, 1):
+                if progress is not None and progress.cancelled:
+                    logger.info(f"Extração cancelada após {index - 1}/{total_records} registros")
+                    scraped_details.close()
+                    break
+
                 try:
                     logger.info(f"Processando registro {index}/{total_records}")
                     
                     if entry['origem'] == 'scrape':
-                        # Navega para a página de detalhes
-                        self.driver.get(entry['details_url'])
-
                         # Se não existe, faz o scrape
                         logger.info(f"Processo {entry['id']} não encontrado no banco, realizando scrape")
-                        process_details = self.process_details_scraper.extract_process_details(entry['id'], catalog)
+                        process_details = next(scraped_details)
 
                         # Se o scrape foi bem sucedido, salva no banco
                         if process_details:
@@ -623,15 +774,18 @@ class GridScraper:
                                     'detalhes_acordo': process_details.get('detalhes_acordo', {}).get('acordo', [])
                                 }
 
-                                db = DatabaseManager()
-                                db.save_process_data(raw_data, entry['grid_data'], entry['id'])
-                                logger.info(f"Processo {entry['id']} salvo no banco de dados após scrape")
+                                # Gravação em lote, em segundo plano (o checkpoint é marcado pela thread do writer)
+                                writer.submit(entry['id'], raw_data[entry['id']], entry['grid_data'])
+                                logger.info(f"Processo {entry['id']} enfileirado para gravação após scrape")
 
                                 # Leva o process_details com a estrutura completa com os detalhes do processo
                                 raw_data[entry['id']] = process_details
 
                             except Exception as e:
-                                logger.error(f"Erro ao salvar processo {entry['id']} no banco após scrape: {str(e)}")                                
+                                logger.error(f"Erro ao enfileirar processo {entry['id']} para gravação: {str(e)}")
+                                writer.fail(entry['id'], e)
+                        else:
+                            writer.fail(entry['id'], "Falha na extração dos detalhes")
                     else:                    
                         # Primeiro verifica se o processo existe no banco de dados
                         existing_process = entry['base_data']
@@ -656,13 +810,22 @@ class GridScraper:
                         raw_data[entry['id']] = process_details
                     
                     # Adiciona os dados à lista do grid
-                    extracted_data.append(entry['grid_data'])
+                    if keep_results:
+                        extracted_data.append(entry['grid_data'])
+                    processed_count += 1
                     
                 except Exception as e:
                     logger.error(f"Erro ao processar processo {entry['id']}: {str(e)}")
                     continue
-            
-            logger.info(f"Processamento concluído. Total de {len(extracted_data)} registros extraídos")
+                finally:
+                    if progress is not None:
+                        progress.process_done(entry['id'], raw_data.get(entry['id']), entry['grid_data'])
+                    if not keep_results:
+                        raw_data.pop(entry['id'], None)
+            
+            # Aguarda a gravação dos últimos lotes antes de devolver (e de conferir o checkpoint)
+            writer.close()
+            logger.info(f"Processamento concluído. Total de {processed_count} registros extraídos")
             return {
                 'grid_data': extracted_data,
                 'raw_data': raw_data,
@@ -671,6 +834,7 @@ class GridScraper:
             }
             
         except Exception as e:
+            writer.close()
             logger.error(f"Erro ao extrair dados do grid: {str(e)}")
             return {
                 "grid_data": [],
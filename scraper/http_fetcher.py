@@ -0,0 +1,107 @@
+import re
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import get_logger, HTTP_POOL_SIZE, HTTP_TIMEOUT
+
+logger = get_logger(__name__)
+
+# Indícios de que a resposta é a página de login (sessão expirada ou cookies inválidos)
+_LOGIN_URL_MARKERS = ('/Autorizador', '/Account/Login', '/login')
+_LOGIN_FORM_PATTERN = re.compile(r'id\s*=\s*["\']?Email["\'\s>]', re.IGNORECASE)
+
+
+class HttpPageFetcher:
+    """
+    Busca páginas renderizadas no servidor diretamente por HTTP, reaproveitando a sessão do Selenium
+
+    Os cookies do driver (já autenticado via auto_login) são copiados para uma
+    requests.Session com pool de conexões keep-alive. Quando a resposta é a página de
+    login ou não contém o conteúdo esperado (conteúdo gerado só por JavaScript),
+    fetch retorna None e o chamador deve recorrer ao navegador.
+    """
+
+    def __init__(self, driver=None, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT):
+        """
+        Args:
+            driver: WebDriver autenticado de onde os cookies são copiados (opcional)
+            pool_size (int): Conexões mantidas abertas por host
+            timeout (int): Timeout de cada requisição, em segundos
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._user_agent_synced = False
+
+    def sync_cookies(self):
+        """Copia os cookies (e o user-agent) do navegador para a sessão HTTP"""
+        if self.driver is None:
+            return
+        try:
+            for cookie in self.driver.get_cookies():
+                self.session.cookies.set(
+                    cookie['name'],
+                    cookie['value'],
+                    domain=cookie.get('domain'),
+                    path=cookie.get('path', '/')
+                )
+            if not self._user_agent_synced:
+                user_agent = self.driver.execute_script("return navigator.userAgent")
+                if user_agent:
+                    self.session.headers['User-Agent'] = user_agent
+                self._user_agent_synced = True
+        except Exception as e:
+            logger.warning(f"Não foi possível copiar os cookies do navegador: {str(e)}")
+
+    @staticmethod
+    def is_login_page(url, html):
+        """Verifica se a resposta corresponde à página de login"""
+        if any(marker.lower() in (url or '').lower() for marker in _LOGIN_URL_MARKERS):
+            return True
+        return bool(_LOGIN_FORM_PATTERN.search(html or ''))
+
+    def fetch(self, url, required_id=None):
+        """
+        Busca uma página por HTTP
+
+        Args:
+            url (str): URL da página
+            required_id (str): id de um elemento que precisa estar no HTML do servidor;
+                se ausente, o conteúdo depende de JavaScript e o navegador deve ser usado
+
+        Returns:
+            str: HTML da página, ou None quando for necessário usar o navegador
+        """
+        fetch_start = time.time()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Falha na requisição HTTP para {url}: {str(e)}")
+            return None
+
+        if response.status_code != 200:
+            logger.warning(f"Resposta HTTP {response.status_code} para {url}, usando o navegador")
+            return None
+
+        html = response.text
+        if self.is_login_page(response.url, html):
+            logger.warning(f"Página de login recebida para {url}, usando o navegador")
+            return None
+
+        if required_id and not re.search(rf'id\s*=\s*["\']?{re.escape(required_id)}["\'\s>]', html):
+            logger.info(f"Elemento #{required_id} ausente no HTML de {url} (conteúdo via JavaScript), usando o navegador")
+            return None
+
+        logger.info(f"[TEMPO] Busca HTTP de {url}: {time.time() - fetch_start:.2f} segundos")
+        return html
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,573 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+import numpy as np
+from unidecode import unidecode
+from Levenshtein import ratio as levenshtein_ratio
+from rapidfuzz.distance import Indel, JaroWinkler
+from rapidfuzz.process import cdist, cpdist
+from textdistance import jaccard, jaro_winkler
+from config import get_logger, NAME_CACHE_SIZE
+
+logger = get_logger(__name__)
+
+# Score acima do qual dois nomes são considerados a mesma pessoa
+SIMILARITY_THRESHOLD = 0.5
+
+# Palavras removidas na normalização (comparadas após remoção de acentos e pontuação)
+STOPWORDS = frozenset([
+    # Stopwords em português
+    'a', 'ao', 'aos', 'aquela', 'aquelas', 'aquele', 'aqueles', 'aquilo',
+    'as', 'ate', 'com', 'como', 'da', 'das', 'de', 'dela', 'delas',
+    'dele', 'deles', 'depois', 'do', 'dos', 'e', 'ela', 'elas', 'ele',
+    'eles', 'em', 'entre', 'era', 'eram', 'essa', 'essas', 'esse',
+    'esses', 'esta', 'estas', 'este', 'estes', 'eu', 'isso', 'isto',
+    'ja', 'la', 'lhe', 'lhes', 'lo', 'mas', 'me', 'mesmo', 'meu',
+    'meus', 'minha', 'minhas', 'muito', 'na', 'nas', 'nem', 'no', 'nos',
+    'nossa', 'nossas', 'nosso', 'nossos', 'num', 'numa', 'o', 'os',
+    'ou', 'para', 'pela', 'pelas', 'pelo', 'pelos', 'por', 'qual',
+    'quando', 'que', 'quem', 'sao', 'se', 'seja', 'sejam', 'sem',
+    'seu', 'seus', 'so', 'sua', 'suas', 'tambem', 'te', 'tem', 'tinha',
+    'um', 'uma', 'voce', 'voces', 'vos', 'vosso', 'vossa', 'vossos',
+    'vossas',
+
+    # Títulos honoríficos e profissionais
+    'dr', 'dra', 'doutor', 'doutora', 'adv', 'advogado', 'advogada',
+    'professor', 'professora', 'prof', 'profa', 'mestre', 'mestra',
+    'especialista', 'bacharel', 'excelentissimo', 'excelentissima',
+    'ilustrissimo', 'ilustrissima', 'senhor', 'senhora', 'sr', 'sra',
+    'excelencia', 'meritissimo', 'meritissima',
+
+    # Sufixos empresariais e termos jurídicos
+    'mei', 'ltda', 'sa', 's/a', 'ss', 'epp', 'eireli',
+    'sociedade', 'individual', 'empresaria', 'limitada', 'simples',
+    'microempresa', 'microempreendedor', 'empresa', 'comercio',
+    'industria', 'servicos', 'representacoes', 'distribuicao',
+    'importacao', 'exportacao', 'assessoria', 'consultoria',
+    'consultor', 'consultora', 'engenheiro', 'engenharia',
+    'arquiteto', 'arquitetura', 'advogados',
+
+    # Conectores e preposições compostas
+    'junto', 'perante', 'mediante', 'durante', 'apos', 'sobre',
+    'sob', 'desde', 'contra',
+
+    # Sufixos e designações familiares
+    'junior', 'jr', 'senior', 'filho', 'filha', 'neto',
+    'neta', 'sobrinho', 'sobrinha', 'primo', 'prima', 'tio', 'tia',
+    'avo', 'avoa',
+
+    # Outros termos comuns em nomes empresariais
+    'grupo', 'holding', 'participacoes', 'empreendimentos',
+    'administracao', 'gestao', 'negocios', 'comercial',
+    'industrial', 'brasil', 'brasileiro', 'brasileira', 'nacional',
+    'internacional', 'global', 'local', 'regional',
+    'fundacao',
+])
+
+# Tudo que não for letra minúscula, dígito ou espaço vira espaço
+_NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9\s]')
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def normalize_name(name):
+    """
+    Normaliza um nome para comparação, aplicando as seguintes transformações:
+    1. Remove acentos e caracteres especiais
+    2. Converte para minúsculo
+    3. Remove títulos honoríficos e sufixos empresariais
+    4. Remove caracteres não alfanuméricos
+    5. Padroniza espaços e pontuação
+    6. Remove palavras comuns e stopwords
+
+    O resultado é memorizado por nome bruto (LRU de NAME_CACHE_SIZE entradas): os mesmos
+    advogados e partes se repetem em milhares de processos.
+    """
+    if not name:
+        return ""
+
+    # Converte para minúsculo, remove acentos e troca pontuação por espaço
+    normalized = _NON_ALNUM_PATTERN.sub(' ', unidecode(name.lower().strip()))
+
+    # Remove palavras comuns e palavras com apenas 1 caractere (split já padroniza os espaços)
+    resultado = ' '.join(
+        palavra for palavra in normalized.split()
+        if len(palavra) > 1 and palavra not in STOPWORDS
+    )
+
+    # Log para debug
+    if resultado != name.lower() and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Nome normalizado: '{name}' -> '{resultado}'")
+
+    return resultado
+
+
+def _ngrams(text, n=3):
+    return [text[i:i+n] for i in range(len(text)-n+1)]
+
+
+def name_trigrams(nome_norm):
+    """Trigramas distintos de um nome normalizado, em ordem"""
+    return sorted(set(_ngrams(nome_norm)))
+
+
+def _cosine_similarity(vec1, vec2):
+    intersection = set(vec1.keys()) & set(vec2.keys())
+    numerator = sum([vec1[x] * vec2[x] for x in intersection])
+
+    sum1 = sum([vec1[x]**2 for x in vec1.keys()])
+    sum2 = sum([vec2[x]**2 for x in vec2.keys()])
+    denominator = math.sqrt(sum1) * math.sqrt(sum2)
+
+    if not denominator:
+        return 0.0
+    return float(numerator) / denominator
+
+
+def score_normalized_names(nome1_norm, nome2_norm):
+    """
+    Calcula a similaridade entre dois nomes já normalizados com normalize_name
+
+    Returns:
+        float: Score de similaridade entre 0 e 1
+    """
+    if not nome1_norm or not nome2_norm:
+        return 0.0
+
+    # 1. Levenshtein Ratio (peso: 0.3)
+    levenshtein_score = levenshtein_ratio(nome1_norm, nome2_norm)
+
+    # 2. Coeficiente de Jaccard (peso: 0.2)
+    jaccard_score = jaccard.normalized_similarity(nome1_norm.split(), nome2_norm.split())
+
+    # 3. Similaridade de Cosseno usando n-gramas (peso: 0.2)
+    cosine_score = _cosine_similarity(Counter(_ngrams(nome1_norm)), Counter(_ngrams(nome2_norm)))
+
+    # 4. Jaro-Winkler (peso: 0.3)
+    jaro_score = jaro_winkler.normalized_similarity(nome1_norm, nome2_norm)
+
+    # Cálculo do score final ponderado
+    final_score = (
+        0.3 * levenshtein_score +  # Levenshtein tem peso maior por ser mais preciso para nomes
+        0.2 * jaccard_score +      # Jaccard é bom para comparar conjuntos de palavras
+        0.2 * cosine_score +       # Cosseno captura similaridades em nível de caractere
+        0.3 * jaro_score          # Jaro-Winkler é especialmente bom para strings curtas como nomes
+    )
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"""
+    Scores de similaridade para '{nome1_norm}' e '{nome2_norm}':
+    - Levenshtein: {levenshtein_score:.3f}
+    - Jaccard: {jaccard_score:.3f}
+    - Cosseno: {cosine_score:.3f}
+    - Jaro-Winkler: {jaro_score:.3f}
+    - Score Final: {final_score:.3f}
+    """)
+
+    return final_score
+
+
+def calculate_name_similarity(nome1, nome2):
+    """
+    Calcula a similaridade entre dois nomes usando múltiplas métricas.
+
+    Métricas utilizadas:
+    1. Distância de Levenshtein
+    2. Coeficiente de Jaccard
+    3. Similaridade de Cosseno (usando n-gramas)
+    4. Jaro-Winkler
+
+    Returns:
+        float: Score de similaridade entre 0 e 1
+    """
+    if not nome1 or not nome2:
+        return 0.0
+    return score_normalized_names(normalize_name(nome1), normalize_name(nome2))
+
+
+# Cascata com saída antecipada: para decidir se o score passa do limiar não é preciso
+# calcular as quatro métricas. As mais baratas vêm primeiro e, a cada estágio, o score
+# parcial e o maior valor que as métricas restantes ainda podem somar decidem o resultado.
+# A margem evita decidir por limites que fiquem a um erro de arredondamento do limiar;
+# nesses casos o score é calculado por inteiro, com a mesma fórmula de score_normalized_names.
+_BOUND_MARGIN = 1e-9
+
+# Quantas comparações cada estágio da cascata decidiu
+CASCADE_STAGES = ('nome_vazio', 'tamanho', 'levenshtein_jaro', 'jaccard', 'cosseno')
+_cascade_stats = Counter()
+_cascade_stats_lock = threading.Lock()
+
+
+def _count_stages(counts):
+    with _cascade_stats_lock:
+        _cascade_stats.update(counts)
+
+
+def get_cascade_stats():
+    """Retorna quantas comparações cada estágio da cascata decidiu desde o último reset"""
+    with _cascade_stats_lock:
+        return {stage: _cascade_stats.get(stage, 0) for stage in CASCADE_STAGES}
+
+
+def reset_cascade_stats():
+    with _cascade_stats_lock:
+        _cascade_stats.clear()
+
+
+def merge_cascade_stats(counts):
+    """Soma às estatísticas locais as decisões contadas em outro processo (ex.: workers do pool)"""
+    _count_stages(counts)
+
+
+def _length_bounds(len1, len2, tokens1, tokens2):
+    """
+    Limites superiores de Levenshtein, Jaro-Winkler e Jaccard a partir apenas dos tamanhos
+
+    A distância de edição (inserção/remoção) é no mínimo a diferença de tamanho, o Jaro
+    não conta mais caracteres em comum que o menor nome (e o prefixo do Winkler soma no
+    máximo 4 × 0.1 do que falta), e a interseção de palavras não passa do menor nome nem
+    a união fica abaixo do maior.
+    """
+    menor = min(len1, len2)
+    levenshtein_bound = 2 * menor / (len1 + len2)
+    jaro_bound = (menor / len1 + menor / len2 + 1) / 3
+    jaro_bound += 0.4 * (1 - jaro_bound)
+    jaccard_bound = min(tokens1, tokens2) / max(tokens1, tokens2)
+    return levenshtein_bound, jaro_bound, jaccard_bound
+
+
+def _token_jaccard(tokens1, tokens2):
+    """Jaccard com multiplicidade, igual a jaccard.normalized_similarity do textdistance"""
+    counter1 = Counter(tokens1)
+    counter2 = Counter(tokens2)
+    return sum((counter1 & counter2).values()) / sum((counter1 | counter2).values())
+
+
+def names_match(nome1_norm, nome2_norm, threshold=SIMILARITY_THRESHOLD):
+    """
+    Verifica se o score de score_normalized_names passa de threshold, parando no primeiro
+    estágio que já decide o resultado
+
+    Estágios: tamanhos dos nomes, Levenshtein + Jaro-Winkler (em C), Jaccard e, por fim,
+    o cosseno dos trigramas. O estágio que decidiu é contabilizado em get_cascade_stats.
+
+    Returns:
+        bool: O mesmo que score_normalized_names(nome1_norm, nome2_norm) > threshold
+    """
+    if not nome1_norm or not nome2_norm:
+        _count_stages(('nome_vazio',))
+        return False
+
+    tokens1 = nome1_norm.split()
+    tokens2 = nome2_norm.split()
+    levenshtein_bound, jaro_bound, jaccard_bound = _length_bounds(
+        len(nome1_norm), len(nome2_norm), len(tokens1), len(tokens2)
+    )
+
+    # 1. Nem com todas as métricas no limite (e cosseno máximo) o score passaria do limiar
+    if 0.3 * levenshtein_bound + 0.2 * jaccard_bound + 0.2 + 0.3 * jaro_bound <= threshold - _BOUND_MARGIN:
+        _count_stages(('tamanho',))
+        return False
+
+    # 2. Levenshtein e Jaro-Winkler (60% do peso)
+    levenshtein_score = levenshtein_ratio(nome1_norm, nome2_norm)
+    jaro_score = JaroWinkler.normalized_similarity(nome1_norm, nome2_norm)
+    parcial = 0.3 * levenshtein_score + 0.3 * jaro_score
+    if parcial > threshold + _BOUND_MARGIN:
+        _count_stages(('levenshtein_jaro',))
+        return True
+    if parcial + 0.2 * jaccard_bound + 0.2 <= threshold - _BOUND_MARGIN:
+        _count_stages(('levenshtein_jaro',))
+        return False
+
+    # 3. Jaccard das palavras
+    jaccard_score = _token_jaccard(tokens1, tokens2)
+    parcial += 0.2 * jaccard_score
+    if parcial > threshold + _BOUND_MARGIN:
+        _count_stages(('jaccard',))
+        return True
+    if parcial + 0.2 <= threshold - _BOUND_MARGIN:
+        _count_stages(('jaccard',))
+        return False
+
+    # 4. Cosseno dos trigramas, com o score final calculado como em score_normalized_names
+    cosine_score = _cosine_similarity(Counter(_ngrams(nome1_norm)), Counter(_ngrams(nome2_norm)))
+    _count_stages(('cosseno',))
+    final_score = (
+        0.3 * levenshtein_score +
+        0.2 * jaccard_score +
+        0.2 * cosine_score +
+        0.3 * jaro_score
+    )
+    return final_score > threshold
+
+
+# Versão vetorizada: mesmas métricas e pesos de score_normalized_names, calculadas em lote.
+# Levenshtein.ratio equivale a Indel.normalized_similarity e o Jaro-Winkler do rapidfuzz usa
+# os mesmos parâmetros do textdistance (prefixo de até 4 caracteres, peso 0.1).
+
+# Vocabulários compartilhados entre todas as chamadas: cada trigrama/palavra recebe um
+# índice fixo, o que permite memorizar o vetor esparso de cada nome
+_trigram_vocab = {}
+_token_vocab = {}
+_vocab_lock = threading.Lock()
+
+
+def _sparse_counts(items, vocab):
+    counts = Counter(items)
+    with _vocab_lock:
+        indices = [vocab.setdefault(item, len(vocab)) for item in counts]
+    return np.array(indices, dtype=np.int64), np.array(list(counts.values()), dtype=np.float64)
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _name_profile(nome_norm):
+    """Vetores esparsos (índices, contagens) dos trigramas e das palavras de um nome normalizado"""
+    return _sparse_counts(_ngrams(nome_norm), _trigram_vocab), _sparse_counts(nome_norm.split(), _token_vocab)
+
+
+class _SparseBags:
+    """Vetores esparsos de uma lista de nomes em formato CSR"""
+
+    def __init__(self, vectors):
+        lengths = np.fromiter((len(indices) for indices, _ in vectors), dtype=np.int64, count=len(vectors))
+        self.indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        if vectors:
+            self.indices = np.concatenate([indices for indices, _ in vectors])
+            self.counts = np.concatenate([counts for _, counts in vectors])
+        else:
+            self.indices = np.zeros(0, dtype=np.int64)
+            self.counts = np.zeros(0)
+        owners = np.repeat(np.arange(len(vectors), dtype=np.int64), lengths)
+        self.sizes = np.bincount(owners, weights=self.counts, minlength=len(vectors))
+        self.norms = np.sqrt(np.bincount(owners, weights=self.counts ** 2, minlength=len(vectors)))
+
+    def expand(self, rows):
+        """Retorna (par, item, contagem) de cada item dos nomes indicados por rows, um nome por par"""
+        lengths = self.indptr[rows + 1] - self.indptr[rows]
+        pairs = np.repeat(np.arange(len(rows), dtype=np.int64), lengths)
+        starts = np.repeat(self.indptr[rows] - np.cumsum(lengths) + lengths, lengths)
+        positions = starts + np.arange(int(lengths.sum()), dtype=np.int64)
+        return pairs, self.indices[positions], self.counts[positions]
+
+
+def _bag_overlap(bags1, rows1, bags2, rows2, vocab_size):
+    """
+    Produto escalar e interseção de multiconjuntos entre os nomes rows1[p] e rows2[p]
+
+    Os vetores esparsos dos dois lados são casados pela chave (par, item) sobre o
+    vocabulário compartilhado, sem materializar matrizes densas.
+    """
+    n_pairs = len(rows1)
+    pairs1, items1, counts1 = bags1.expand(rows1)
+    pairs2, items2, counts2 = bags2.expand(rows2)
+    _, idx1, idx2 = np.intersect1d(
+        pairs1 * vocab_size + items1, pairs2 * vocab_size + items2,
+        assume_unique=True, return_indices=True
+    )
+    dot = np.bincount(pairs1[idx1], weights=counts1[idx1] * counts2[idx2], minlength=n_pairs)
+    shared = np.bincount(pairs1[idx1], weights=np.minimum(counts1[idx1], counts2[idx2]), minlength=n_pairs)
+    return dot, shared
+
+
+def _profile_bags(nomes):
+    """Vetores esparsos (trigramas, palavras) de uma lista de nomes normalizados"""
+    profiles = [_name_profile(nome) for nome in nomes]
+    return (_SparseBags([trigramas for trigramas, _ in profiles]),
+            _SparseBags([tokens for _, tokens in profiles]))
+
+
+def _cosine_scores(trigrams1, rows1, trigrams2, rows2):
+    """Cosseno dos trigramas: produto escalar esparso dividido pelas normas"""
+    dot, _ = _bag_overlap(trigrams1, rows1, trigrams2, rows2, len(_trigram_vocab) + 1)
+    denominator = trigrams1.norms[rows1] * trigrams2.norms[rows2]
+    return np.divide(dot, denominator, out=np.zeros(len(rows1)), where=denominator > 0)
+
+
+def _jaccard_scores(tokens1, rows1, tokens2, rows2):
+    """Jaccard das palavras: |A ∩ B| / |A ∪ B| com multiplicidade, como no textdistance"""
+    _, shared = _bag_overlap(tokens1, rows1, tokens2, rows2, len(_token_vocab) + 1)
+    union = tokens1.sizes[rows1] + tokens2.sizes[rows2] - shared
+    return np.divide(shared, union, out=np.zeros(len(rows1)), where=union > 0)
+
+
+def _score_indexed_pairs(nomes1, rows1, nomes2, rows2, levenshtein_scores, jaro_scores):
+    """Combina as quatro métricas para os pares (nomes1[rows1[p]], nomes2[rows2[p]])"""
+    trigrams1, tokens1 = _profile_bags(nomes1)
+    trigrams2, tokens2 = _profile_bags(nomes2)
+    cosine_scores = _cosine_scores(trigrams1, rows1, trigrams2, rows2)
+    jaccard_scores = _jaccard_scores(tokens1, rows1, tokens2, rows2)
+
+    scores = (
+        0.3 * levenshtein_scores +
+        0.2 * jaccard_scores +
+        0.2 * cosine_scores +
+        0.3 * jaro_scores
+    )
+
+    # Nome vazio não tem similaridade com nada
+    empty1 = np.fromiter((not nome for nome in nomes1), dtype=bool, count=len(nomes1))
+    empty2 = np.fromiter((not nome for nome in nomes2), dtype=bool, count=len(nomes2))
+    scores[empty1[rows1] | empty2[rows2]] = 0.0
+    return scores
+
+
+def score_name_matrix(titulares, candidatos, normalized=False):
+    """
+    Calcula a similaridade entre cada titular e cada candidato, em lote
+
+    Equivale a chamar calculate_name_similarity para cada combinação (mesmas métricas e
+    pesos), mas Levenshtein e Jaro-Winkler são calculados em C pelo rapidfuzz e o cosseno
+    dos trigramas e o Jaccard como produtos esparsos sobre um vocabulário compartilhado.
+
+    Args:
+        titulares (str | list): Um nome ou uma lista de N nomes
+        candidatos (list): Lista de M nomes a comparar
+        normalized (bool): Se True, os nomes já passaram por normalize_name
+
+    Returns:
+        numpy.ndarray: Scores entre 0 e 1, com formato (M,) para um titular ou (N, M) para uma lista
+    """
+    single = isinstance(titulares, str)
+    nomes1 = [titulares] if single else list(titulares)
+    nomes2 = list(candidatos)
+    if not normalized:
+        nomes1 = [normalize_name(nome) for nome in nomes1]
+        nomes2 = [normalize_name(nome) for nome in nomes2]
+
+    scores = np.zeros((len(nomes1), len(nomes2)))
+    if nomes1 and nomes2:
+        rows1 = np.repeat(np.arange(len(nomes1), dtype=np.int64), len(nomes2))
+        rows2 = np.tile(np.arange(len(nomes2), dtype=np.int64), len(nomes1))
+        levenshtein_scores = cdist(nomes1, nomes2, scorer=Indel.normalized_similarity, dtype=np.float64)
+        jaro_scores = cdist(nomes1, nomes2, scorer=JaroWinkler.normalized_similarity, dtype=np.float64)
+        scores = _score_indexed_pairs(
+            nomes1, rows1, nomes2, rows2, levenshtein_scores.ravel(), jaro_scores.ravel()
+        ).reshape(len(nomes1), len(nomes2))
+
+    return scores[0] if single else scores
+
+
+def score_name_pairs(nomes1, nomes2, normalized=False):
+    """
+    Calcula a similaridade par a par entre nomes1[i] e nomes2[i], em lote
+
+    Usado quando cada titular tem seus próprios candidatos (recertificação de toda a
+    tabela de acordos): evita calcular a matriz N × M inteira.
+
+    Returns:
+        numpy.ndarray: Scores entre 0 e 1, um por par
+    """
+    nomes1 = list(nomes1)
+    nomes2 = list(nomes2)
+    if len(nomes1) != len(nomes2):
+        raise ValueError("nomes1 e nomes2 precisam ter o mesmo tamanho")
+    if not normalized:
+        nomes1 = [normalize_name(nome) for nome in nomes1]
+        nomes2 = [normalize_name(nome) for nome in nomes2]
+    if not nomes1:
+        return np.zeros(0)
+
+    # Nomes repetidos (o mesmo advogado em milhares de acordos) são perfilados uma única vez
+    unique1, rows1 = np.unique(np.array(nomes1, dtype=object), return_inverse=True)
+    unique2, rows2 = np.unique(np.array(nomes2, dtype=object), return_inverse=True)
+    levenshtein_scores = cpdist(nomes1, nomes2, scorer=Indel.normalized_similarity, dtype=np.float64)
+    jaro_scores = cpdist(nomes1, nomes2, scorer=JaroWinkler.normalized_similarity, dtype=np.float64)
+    return _score_indexed_pairs(
+        list(unique1), rows1.astype(np.int64), list(unique2), rows2.astype(np.int64),
+        levenshtein_scores, jaro_scores
+    )
+
+
+def match_name_pairs(nomes1, nomes2, threshold=SIMILARITY_THRESHOLD, normalized=False):
+    """
+    Versão em lote de names_match: verifica par a par se nomes1[i] e nomes2[i] passam do limiar
+
+    Cada estágio da cascata só é calculado para os pares que os anteriores não decidiram.
+
+    Returns:
+        numpy.ndarray: Um bool por par
+    """
+    nomes1 = list(nomes1)
+    nomes2 = list(nomes2)
+    if len(nomes1) != len(nomes2):
+        raise ValueError("nomes1 e nomes2 precisam ter o mesmo tamanho")
+    if not normalized:
+        nomes1 = [normalize_name(nome) for nome in nomes1]
+        nomes2 = [normalize_name(nome) for nome in nomes2]
+
+    matches = np.zeros(len(nomes1), dtype=bool)
+    if not nomes1:
+        return matches
+
+    unique1, rows1 = np.unique(np.array(nomes1, dtype=object), return_inverse=True)
+    unique2, rows2 = np.unique(np.array(nomes2, dtype=object), return_inverse=True)
+    unique1, unique2 = list(unique1), list(unique2)
+    rows1, rows2 = rows1.astype(np.int64), rows2.astype(np.int64)
+    trigrams1, tokens1 = _profile_bags(unique1)
+    trigrams2, tokens2 = _profile_bags(unique2)
+    lengths1 = np.fromiter((len(nome) for nome in unique1), dtype=np.float64, count=len(unique1))[rows1]
+    lengths2 = np.fromiter((len(nome) for nome in unique2), dtype=np.float64, count=len(unique2))[rows2]
+    counts1 = tokens1.sizes[rows1]
+    counts2 = tokens2.sizes[rows2]
+
+    stages = Counter()
+    pending = (lengths1 > 0) & (lengths2 > 0)
+    stages['nome_vazio'] = int(len(pending) - pending.sum())
+
+    # 1. Limites pelos tamanhos (os mesmos de _length_bounds)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        menor = np.minimum(lengths1, lengths2)
+        levenshtein_bound = 2 * menor / (lengths1 + lengths2)
+        jaro_bound = (menor / lengths1 + menor / lengths2 + 1) / 3
+        jaro_bound += 0.4 * (1 - jaro_bound)
+        jaccard_bound = np.minimum(counts1, counts2) / np.maximum(counts1, counts2)
+    decided = pending & (
+        0.3 * levenshtein_bound + 0.2 * jaccard_bound + 0.2 + 0.3 * jaro_bound <= threshold - _BOUND_MARGIN
+    )
+    stages['tamanho'] = int(decided.sum())
+    pending &= ~decided
+
+    # 2. Levenshtein e Jaro-Winkler
+    idx = np.flatnonzero(pending)
+    pares1 = [unique1[i] for i in rows1[idx]]
+    pares2 = [unique2[i] for i in rows2[idx]]
+    levenshtein_scores = cpdist(pares1, pares2, scorer=Indel.normalized_similarity, dtype=np.float64)
+    jaro_scores = cpdist(pares1, pares2, scorer=JaroWinkler.normalized_similarity, dtype=np.float64)
+    parcial = 0.3 * levenshtein_scores + 0.3 * jaro_scores
+    acima = parcial > threshold + _BOUND_MARGIN
+    abaixo = parcial + 0.2 * jaccard_bound[idx] + 0.2 <= threshold - _BOUND_MARGIN
+    matches[idx[acima]] = True
+    stages['levenshtein_jaro'] = int((acima | abaixo).sum())
+    resto = ~(acima | abaixo)
+    idx, levenshtein_scores, jaro_scores, parcial = idx[resto], levenshtein_scores[resto], jaro_scores[resto], parcial[resto]
+
+    # 3. Jaccard das palavras
+    jaccard_scores = _jaccard_scores(tokens1, rows1[idx], tokens2, rows2[idx])
+    parcial = parcial + 0.2 * jaccard_scores
+    acima = parcial > threshold + _BOUND_MARGIN
+    abaixo = parcial + 0.2 <= threshold - _BOUND_MARGIN
+    matches[idx[acima]] = True
+    stages['jaccard'] = int((acima | abaixo).sum())
+    resto = ~(acima | abaixo)
+    idx, levenshtein_scores, jaro_scores, jaccard_scores = (
+        idx[resto], levenshtein_scores[resto], jaro_scores[resto], jaccard_scores[resto]
+    )
+
+    # 4. Cosseno dos trigramas e score final
+    cosine_scores = _cosine_scores(trigrams1, rows1[idx], trigrams2, rows2[idx])
+    final_scores = (
+        0.3 * levenshtein_scores +
+        0.2 * jaccard_scores +
+        0.2 * cosine_scores +
+        0.3 * jaro_scores
+    )
+    matches[idx] = final_scores > threshold
+    stages['cosseno'] = len(idx)
+
+    _count_stages(stages)
+    return matches
+
@@ -0,0 +1,311 @@
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _cell_text(cell):
+    """Texto de uma célula com espaços normalizados (equivalente ao .text do WebDriver)"""
+    return ' '.join(cell.get_text(' ').split())
+
+
+def parse_grid_rows(table_html, base_url=''):
+    """
+    Extrai as linhas do grid de processos a partir do HTML da tabela, em uma única passada
+    
+    Args:
+        table_html (str): outerHTML da tabela do grid (ou o código fonte da página)
+        base_url (str): URL da página, usada para resolver links relativos
+        
+    Returns:
+        list: Tuplas (process_id, details_url, cell_data) para cada linha válida
+    """
+    soup = BeautifulSoup(table_html, 'html.parser')
+    # Aceita tanto o outerHTML da tabela quanto a página inteira
+    table = soup.find('table', class_='table') or soup.find('table') or soup
+
+    page_rows = []
+    for row_index, row in enumerate(table.select('tbody tr'), 1):
+        try:
+            cells = row.find_all('td')
+            if len(cells) < 10:
+                continue
+
+            # Extrai dados básicos da linha
+            cell_data = [_cell_text(cell) for cell in cells]
+
+            # Extrai o ID e link do processo
+            process_link = cells[0].find('a')
+            if process_link is None:
+                logger.debug(f"Linha {row_index} sem link de processo")
+                continue
+            process_id = process_link.get('data-id') or cell_data[1]
+            href = process_link.get('href')
+            details_url = urljoin(base_url, href) if href else None
+
+            page_rows.append((process_id, details_url, cell_data))
+
+        except Exception as e:
+            logger.error(f"Erro ao interpretar linha {row_index} do grid: {str(e)}")
+            continue
+
+    return page_rows
+
+
+def parse_label_values(html):
+    """
+    Extrai todos os pares rótulo/valor de uma página de detalhes em uma única passada
+    
+    Cada par corresponde a uma célula <td> com um <strong> (o rótulo) seguida da
+    célula com o valor, o mesmo padrão das XPaths
+    "//td[strong[text()='Rótulo:']]/following-sibling::td".
+    
+    Returns:
+        dict: Valor de cada rótulo (primeira ocorrência), indexado pelo texto do rótulo
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    labels = {}
+    for strong in soup.select('td > strong'):
+        label = ' '.join(strong.get_text(' ').split())
+        if not label or label in labels:
+            continue
+        value_cell = strong.parent.find_next_sibling('td')
+        if value_cell is not None:
+            labels[label] = _cell_text(value_cell)
+    return labels
+
+
+def parse_labeled_cells(html):
+    """
+    Lista (texto da célula, valor da célula seguinte) para todas as células rotuladas,
+    usada nas buscas por "contains" (ex.: advogados adversos com rótulos variáveis)
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    cells = []
+    for cell in soup.find_all('td'):
+        value_cell = cell.find_next_sibling('td')
+        if value_cell is not None:
+            cells.append((_cell_text(cell), _cell_text(value_cell)))
+    return cells
+
+
+def _advogado_adverso_label(i):
+    """Rótulo do i-ésimo advogado adverso na página de detalhes"""
+    if i == 1:
+        return "Advogado Adverso:"
+    elif i == 2:
+        return "Segundo Advogado Adverso:"
+    elif i == 3:
+        return "Terceiro Advogado Adverso:"
+    return f"{i}º Advogado Adverso:"
+
+
+def parse_process_fields(labels):
+    """Campos do processo ('processo') a partir dos pares rótulo/valor da página"""
+    return {
+        'status': labels.get('Status:', ''),
+        'escritorio_celula': labels.get('Escritório / Célula:', ''),
+        'data_cadastro': labels.get('Data de Cadastro:', ''),
+        'comarca': labels.get('Comarca:', ''),
+        'fase': labels.get('Fase', ''),
+        'numero': labels.get('Número do Processo:', '')
+    }
+
+
+def parse_parties(html, labels=None, max_advogados=10):
+    """
+    Extrai os dados das partes ('partes') do HTML da aba Geral (#box-dadosprincipais)
+    
+    Retorna o mesmo dicionário de ProcessDetailsScraper.extract_parties_data.
+    Aceita os pares rótulo/valor já extraídos para evitar uma segunda interpretação do HTML.
+    """
+    if labels is None:
+        labels = parse_label_values(html)
+    labeled_cells = None
+    parties_data = {}
+
+    # Extrai parte adversa
+    for parte_label in ["Parte Adversa:", "Autor:", "Requerente:"]:
+        parte_name = labels.get(parte_label)
+        if parte_name:
+            parties_data['parte_adversa'] = parte_name
+            logger.info(f"Parte adversa encontrada: {parte_name}")
+            break
+
+    # Extrai CPF/CNPJ da parte adversa
+    for cpf_label in ["CPF/CNPJ Parte Adversa:", "CPF/CNPJ Autor:", "CPF/CNPJ Requerente:"]:
+        cpf_value = labels.get(cpf_label)
+        if cpf_value:
+            parties_data['cpf_cnpj_parte_adverso'] = cpf_value
+            logger.info(f"CPF/CNPJ da parte adversa encontrado: {cpf_value}")
+            break
+
+    # Extrai advogado interno
+    adv_interno = labels.get("Advogado Interno:")
+    if adv_interno:
+        parties_data['advogado_interno'] = adv_interno
+        logger.info(f"Advogado interno encontrado: {adv_interno}")
+
+    # Extrai advogados adversos
+    advogados = []
+    for i in range(1, max_advogados + 1):
+        prefix = _advogado_adverso_label(i)
+        adv_name = labels.get(prefix)
+        if not adv_name:
+            # Rótulo fora de um <strong>: procura pela célula que contém o texto
+            if labeled_cells is None:
+                labeled_cells = parse_labeled_cells(html)
+            adv_name = next((value for text, value in labeled_cells if prefix in text), None)
+        if not adv_name:
+            # Provavelmente não há mais advogados
+            break
+        advogados.append({'nome': adv_name})
+        logger.info(f"Advogado adverso encontrado: {adv_name}")
+
+    if advogados:
+        parties_data['advogados_adversos'] = advogados
+
+    return parties_data
+
+
+def parse_financial_rows(html, base_url=''):
+    """
+    Extrai os lançamentos de acordo da tabela financeira (#financeiroList) a partir do HTML
+    
+    Retorna a mesma lista 'lancamentos' de FinancialScraper.extract_financial_data.
+    
+    Returns:
+        list: Lançamentos do tipo acordo, ou None se a tabela não estiver no HTML
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Tenta diferentes seletores para a tabela principal
+    financial_table = None
+    for selector in ["#financeiroList table.table-hover", "#financeiroList table.paginate",
+                     "table.table-hover", "table.paginate"]:
+        financial_table = soup.select_one(selector)
+        if financial_table is not None:
+            break
+    if financial_table is None:
+        return None
+
+    # Verifica o índice da coluna tipo
+    header_texts = [_cell_text(h) for h in financial_table.select('thead th')]
+    tipo_index = next((i for i, h in enumerate(header_texts) if 'TIPO' in h.upper()), 4)
+
+    lancamentos = []
+    for row in financial_table.select('tbody tr'):
+        cells = row.find_all('td')
+        if len(cells) < 9:
+            continue
+
+        # Primeiro verifica se é um acordo antes de extrair todos os dados
+        tipo_cell = _cell_text(cells[tipo_index])
+        if not ('ACORDO' in tipo_cell.upper() or tipo_cell.upper() in 'ACORDO'):
+            continue
+
+        lancamento = {}
+
+        # Link na primeira coluna, dando preferência aos links de acordo
+        hrefs = [urljoin(base_url, a.get('href', '')) for a in cells[0].find_all('a')]
+        if hrefs:
+            acordo_hrefs = [href for href in hrefs if 'acordo' in href.lower()]
+            lancamento['link'] = acordo_hrefs[0] if acordo_hrefs else hrefs[0]
+
+        for field, index in [('classificacao', 3), ('tipo', tipo_index), ('valor', 5),
+                             ('natureza', 6), ('data_pagamento', 7), ('usuario', 8)]:
+            value = _cell_text(cells[index])
+            if value:  # Só adiciona se tiver valor
+                lancamento[field] = value
+        lancamento['is_acordo'] = True  # Já sabemos que é acordo neste ponto
+
+        lancamentos.append(lancamento)
+
+    return lancamentos
+
+
+# Mapeamento dos rótulos da página de detalhes do acordo
+ACORDO_FIELD_MAPPING = {
+    'numero': 'Número',
+    'parte_adversa': 'Parte Adversa',
+    'valor': 'Valor',
+    'status': 'Status',
+    'escritorio_celula': 'Escritório/Célula',
+    'comarca': 'Comarca',
+    'estado': 'Estado',
+    'fase': 'Fase',
+    'advogado_adverso': 'Advogado Adverso',
+    'cpf_cnpj_parte_adverso': 'CPF/CNPJ Parte Adversa',
+    'nome_titular': 'Nome do Titular',
+    'cpf_titular': 'CPF do Titular',
+    'data_pagamento': 'Data Pagamento'
+}
+
+
+def parse_acordo_details(html):
+    """
+    Extrai os campos da página de detalhes de um acordo (tabela table-striped)
+    
+    Segue as mesmas regras da leitura pelo navegador em
+    ProcessDetailsScraper.extract_process_details.
+    
+    Returns:
+        dict: Campos do acordo ({} se a tabela estiver vazia), ou None se a tabela não estiver no HTML
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.select_one('table.table-striped')
+    if table is None:
+        return None
+
+    rows = table.find_all('tr')
+    if not rows:
+        return {}
+
+    acordo_details = {}
+    for row in rows:
+        cells = row.find_all('td')
+        if len(cells) < 3:
+            continue
+
+        # Pega o label da primeira célula
+        label_element = cells[0].find('strong')
+        if label_element is None:
+            continue
+        label = _cell_text(label_element).replace(":", "")
+
+        # Trata células que podem conter links
+        link = cells[1].find('a')
+        if link is not None:
+            # Para campos específicos, pegamos o href do link
+            if label in ['Processo', 'PA']:
+                value = (link.get('href') or '').split('/')[-1].strip()
+            else:
+                value = _cell_text(link)
+        else:
+            value = _cell_text(cells[1])
+
+        # Procura o campo correspondente ao label
+        for campo, campo_label in ACORDO_FIELD_MAPPING.items():
+            if campo_label == label:
+                acordo_details[campo] = value
+
+        # Pega o label da segunda célula
+        if _cell_text(cells[2]) != '':
+            label_element = cells[2].find('strong')
+            if label_element is None or len(cells) < 4:
+                continue
+            label = _cell_text(label_element).replace(":", "")
+            value = _cell_text(cells[3])
+
+            # Procura o campo correspondente ao label
+            for campo, campo_label in ACORDO_FIELD_MAPPING.items():
+                if campo == 'nome_titular':
+                    if acordo_details.get(label) == '':
+                        acordo_details[campo] = value
+                        break
+                elif campo_label == label:
+                    acordo_details[campo] = value
+                    break
+
+    return acordo_details
@@ -0,0 +1,101 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+from config import NAME_CACHE_SIZE
+
+# Regras aplicadas em ordem sobre cada palavra já normalizada (sem acentos, minúscula).
+# A normalização troca ç por c; os finais -ção/-ções (cao/coes) voltam a soar como s
+_PHONETIC_RULES = [
+    (re.compile(r'ph'), 'f'),                 # Raphael/Rafael
+    (re.compile(r'th'), 't'),                 # Thiago/Tiago, Mathias/Matias
+    (re.compile(r'[cs]h'), 'x'),              # Cheila/Sheila/Xeila
+    (re.compile(r'l[hi](?=[aeiou])'), 'l'),   # Emilha/Emilia, Guilherme/Guilerme
+    (re.compile(r'n[hi](?=[aeiou])'), 'n'),   # Antonha/Antonia
+    (re.compile(r'lh'), 'l'),
+    (re.compile(r'nh'), 'n'),
+    (re.compile(r'y'), 'i'),                  # Yara/Iara, Wanderley/Wanderlei
+    (re.compile(r'w'), 'v'),                  # Walter/Valter
+    (re.compile(r'[sx]c(?=[ei])'), 's'),      # Nascimento/Nasimento, Excelsa/Eselsa
+    (re.compile(r'c(?=[ei])'), 's'),          # Cecilia/Sesilia
+    (re.compile(r'co(es)$'), r'so\1'),        # Conceicoes/Conseisoes
+    (re.compile(r'cao$'), 'sao'),             # Conceicao/Conseisao, Assuncao/Assunsao
+    (re.compile(r'qu(?=[ei])'), 'k'),         # Quiteria/Kiteria
+    (re.compile(r'q'), 'k'),
+    (re.compile(r'c'), 'k'),                  # Katia/Catia, Erika/Erica
+    (re.compile(r'g(?=[ei])'), 'j'),          # Geferson/Jeferson
+    (re.compile(r'gu(?=[ei])'), 'g'),         # Guilherme: g duro, distinto de ge/gi
+    (re.compile(r'z'), 's'),                  # Souza/Sousa, Luiz/Luis
+    (re.compile(r'h'), ''),                   # H mudo: Helio/Elio, Hilda/Ilda
+    (re.compile(r'n$'), 'm'),                 # Cristian/Cristiam
+    (re.compile(r'e$'), 'i'),                 # Stefanie/Stefani
+    (re.compile(r'o$'), 'u'),
+    (re.compile(r'(.)\1+'), r'\1'),           # Letras dobradas: Marcello/Marcelo, Gonssalves
+]
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def phonetic_key(token):
+    """
+    Chave fonética (português do Brasil) de uma palavra já normalizada
+
+    Unifica grafias equivalentes comuns em nomes: ph/f, th/t, ch/sh/x, y/i, w/v, k/q/c,
+    c/s antes de e/i, sc/s, ç/s nos finais -ção/-ções, g/j antes de e/i, gu/g, z/s, h mudo,
+    m/n finais e letras dobradas.
+    """
+    key = token
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def phonetic_keys(nome_norm):
+    """
+    Chaves fonéticas distintas das palavras de um nome normalizado, ordenadas
+
+    Gravadas no índice de titulares: candidatos de uma busca por nome precisam
+    compartilhar alguma delas (ou trigramas) antes de serem pontuados.
+    """
+    return sorted({key for key in (phonetic_key(token) for token in nome_norm.split()) if key})
+
+
+def blocking_keys(nome_norm):
+    """
+    Chave de bloqueio de um nome normalizado: as chaves fonéticas do primeiro e do último
+    nome ('<primeiro>|<último>'), ou a da única palavra
+
+    Nomes do mesmo bloco variam na grafia e nos sobrenomes do meio; pessoas que só dividem
+    um sobrenome ficam em blocos diferentes, o que evita encadear titulares distintos no
+    agrupamento.
+    """
+    keys = [key for key in (phonetic_key(token) for token in nome_norm.split()) if key]
+    if not keys:
+        return set()
+    return {f"{keys[0]}|{keys[-1]}" if len(keys) > 1 else keys[0]}
+
+
+def blocked_pairs(nomes_norm, max_block=None):
+    """
+    Pares de nomes que compartilham um bloco (blocking_keys), os únicos a pontuar por completo
+
+    Args:
+        nomes_norm (list): Nomes já normalizados
+        max_block (int): Blocos com mais nomes que isso são descartados (None = sem limite)
+
+    Returns:
+        tuple: (conjunto de pares de índices (i, j) com i < j, quantidade de blocos descartados)
+    """
+    blocos = defaultdict(list)
+    for i, nome in enumerate(nomes_norm):
+        for chave in blocking_keys(nome):
+            blocos[chave].append(i)
+
+    pares = set()
+    descartados = 0
+    for membros in blocos.values():
+        if max_block is not None and len(membros) > max_block:
+            descartados += 1
+            continue
+        for a, i in enumerate(membros):
+            for j in membros[a + 1:]:
+                pares.add((i, j))
+    return pares, descartados
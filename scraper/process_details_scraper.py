@@ -5,96 +5,40 @@ from selenium.common.exceptions import TimeoutException
 from unidecode import unidecode
 import re
 import time
+import numpy as np
 import logging
 from .financial_scraper import FinancialScraper
-from difflib import SequenceMatcher
-from collections import Counter
-import numpy as np
-from Levenshtein import ratio as levenshtein_ratio
-from textdistance import jaccard, jaro_winkler
-import math
-from config import get_logger
+from .page_parsers import (
+    parse_label_values, parse_process_fields, parse_parties,
+    parse_financial_rows, parse_acordo_details
+)
+from .http_fetcher import HttpPageFetcher
+from .name_matching import normalize_name, names_match, match_name_pairs, calculate_name_similarity
+from .documents import (
+    compare_documents, MOTIVO_DOCUMENTO_CONFERE, MOTIVO_DOCUMENTO_DIVERGENTE,
+    MOTIVO_NOME_CONFERE, MOTIVO_NOME_DIVERGENTE, MOTIVO_SEM_TITULAR
+)
+from concurrent.futures import ThreadPoolExecutor
+from config import get_logger, EXTRACTION_BACKEND, ACORDO_FETCH_WORKERS
 
 logger = get_logger(__name__)
 
-def calculate_name_similarity(nome1, nome2):
-    """
-    Calcula a similaridade entre dois nomes usando múltiplas métricas.
-    
-    Métricas utilizadas:
-    1. Distância de Levenshtein
-    2. Coeficiente de Jaccard
-    3. Similaridade de Cosseno (usando n-gramas)
-    4. Jaro-Winkler
-    
-    Returns:
-        float: Score de similaridade entre 0 e 1
-    """
-    if not nome1 or not nome2:
-        return 0.0
-        
-    # Normalização dos nomes
-    nome1_norm = ProcessDetailsScraper._normalize_name(None, nome1)
-    nome2_norm = ProcessDetailsScraper._normalize_name(None, nome2)
-    
-    if not nome1_norm or not nome2_norm:
-        return 0.0
-    
-    # 1. Levenshtein Ratio (peso: 0.3)
-    levenshtein_score = levenshtein_ratio(nome1_norm, nome2_norm)
-    
-    # 2. Coeficiente de Jaccard (peso: 0.2)
-    jaccard_score = jaccard.normalized_similarity(nome1_norm.split(), nome2_norm.split())
-    
-    # 3. Similaridade de Cosseno usando n-gramas (peso: 0.2)
-    def get_ngrams(text, n=3):
-        return [text[i:i+n] for i in range(len(text)-n+1)]
-    
-    def cosine_similarity(vec1, vec2):
-        intersection = set(vec1.keys()) & set(vec2.keys())
-        numerator = sum([vec1[x] * vec2[x] for x in intersection])
-        
-        sum1 = sum([vec1[x]**2 for x in vec1.keys()])
-        sum2 = sum([vec2[x]**2 for x in vec2.keys()])
-        denominator = math.sqrt(sum1) * math.sqrt(sum2)
-        
-        if not denominator:
-            return 0.0
-        return float(numerator) / denominator
-    
-    # Cria vetores de n-gramas
-    ngrams1 = Counter(get_ngrams(nome1_norm))
-    ngrams2 = Counter(get_ngrams(nome2_norm))
-    
-    cosine_score = cosine_similarity(ngrams1, ngrams2)
-    
-    # 4. Jaro-Winkler (peso: 0.3)
-    jaro_score = jaro_winkler.normalized_similarity(nome1_norm, nome2_norm)
-    
-    # Cálculo do score final ponderado
-    final_score = (
-        0.3 * levenshtein_score +  # Levenshtein tem peso maior por ser mais preciso para nomes
-        0.2 * jaccard_score +      # Jaccard é bom para comparar conjuntos de palavras
-        0.2 * cosine_score +       # Cosseno captura similaridades em nível de caractere
-        0.3 * jaro_score          # Jaro-Winkler é especialmente bom para strings curtas como nomes
-    )
-    
-    logger.debug(f"""
-    Scores de similaridade para '{nome1}' e '{nome2}':
-    - Nomes normalizados: '{nome1_norm}' e '{nome2_norm}'
-    - Levenshtein: {levenshtein_score:.3f}
-    - Jaccard: {jaccard_score:.3f}
-    - Cosseno: {cosine_score:.3f}
-    - Jaro-Winkler: {jaro_score:.3f}
-    - Score Final: {final_score:.3f}
-    """)
-    
-    return final_score
-
 class ProcessDetailsScraper:
-    def __init__(self, driver):
+    DETAILS_URL = "https://cetelem.djur.adv.br/processo/details/{process_id}"
+
+    def __init__(self, driver, snapshot_mode=True, backend=EXTRACTION_BACKEND):
+        """
+        Args:
+            driver: WebDriver do Selenium
+            snapshot_mode (bool): Se True, aguarda uma única vez a aba Geral e extrai todos
+                os campos do HTML capturado; se False, usa uma XPath/espera por campo
+            backend (str): 'http' busca as páginas diretamente com os cookies do driver,
+                recorrendo ao navegador apenas quando necessário; 'browser' usa só o Selenium
+        """
         self.driver = driver
+        self.snapshot_mode = snapshot_mode
         self.financial_scraper = FinancialScraper(driver)
+        self.http_fetcher = HttpPageFetcher(driver) if backend == 'http' and driver is not None else None
 
     def _log_time(self, start_time, step_name):
         """Calcula e loga o tempo gasto em uma etapa"""
@@ -114,6 +58,145 @@ class ProcessDetailsScraper:
         if not nome_titular:
             return False
         
+        nomes_para_comparar = self._collect_comparison_names(process_details, grid_data)
+        
+        # Normaliza o nome do titular para comparação
+        nome_titular_norm = self._normalize_name(nome_titular)
+        
+        # 1. Verifica se o nome do titular está contido em algum dos outros nomes
+        if self._find_direct_match(nome_titular, nome_titular_norm, nomes_para_comparar):
+            return False
+        
+        # 2. Verifica similaridade entre os nomes (>50%), parando no primeiro estágio da cascata que decide
+        for info in nomes_para_comparar:
+            if names_match(nome_titular_norm, normalize_name(info['nome'])):
+                logger.warning(
+                    f"Match por similaridade encontrado entre '{nome_titular}' e '{info['nome']}'"
+                )
+                return False
+            logger.info(f"Sem similaridade entre '{nome_titular}' e '{info['nome']}'")
+            
+        return True
+
+    def check_name_matches_batch(self, casos):
+        """
+        Versão em lote de check_name_matches, para verificar muitos acordos de uma vez
+        
+        Args:
+            casos (list): Tuplas (nome_titular, process_details, grid_data)
+            
+        Returns:
+            list: Um bool por caso, com o mesmo significado do retorno de check_name_matches
+        """
+        resultados = [False] * len(casos)
+        pares_titular = []
+        pares_nome = []
+        pares_caso = []
+        
+        for idx, (nome_titular, process_details, grid_data) in enumerate(casos):
+            if not nome_titular:
+                continue
+            nomes_para_comparar = self._collect_comparison_names(process_details, grid_data)
+            nome_titular_norm = self._normalize_name(nome_titular)
+            if self._find_direct_match(nome_titular, nome_titular_norm, nomes_para_comparar):
+                continue
+            resultados[idx] = True
+            for info in nomes_para_comparar:
+                pares_titular.append(nome_titular_norm)
+                pares_nome.append(normalize_name(info['nome']))
+                pares_caso.append(idx)
+        
+        if pares_caso:
+            # Basta um nome com similaridade acima de 50% para o caso não ser suspeito
+            matches = match_name_pairs(pares_titular, pares_nome, normalized=True)
+            for idx in set(np.array(pares_caso)[matches].tolist()):
+                resultados[idx] = False
+        
+        return resultados
+
+    def check_fraud(self, nome_titular, cpf_titular, process_details, grid_data, documentos_parte=()):
+        """
+        Decide se um acordo é suspeita de fraude, começando pelos documentos
+        
+        Se o CPF/CNPJ do titular e o da parte adversa forem válidos, a decisão sai da
+        comparação entre eles, sem métricas de similaridade. Só quando faltar documento
+        válido de um dos lados os nomes são comparados (check_name_matches).
+        
+        Args:
+            documentos_parte (iterable): CPF/CNPJ da parte adversa de outras fontes
+                (página do acordo, linha do grid do próprio processo), além do do processo
+            
+        Returns:
+            tuple: (suspeita de fraude, motivo da decisão — uma das constantes MOTIVO_*)
+        """
+        decisao = self._check_documents(cpf_titular, process_details, documentos_parte)
+        if decisao is not None:
+            return decisao
+        if not nome_titular:
+            return False, MOTIVO_SEM_TITULAR
+        if self.check_name_matches(nome_titular, process_details, grid_data):
+            return True, MOTIVO_NOME_DIVERGENTE
+        return False, MOTIVO_NOME_CONFERE
+
+    def check_fraud_batch(self, casos):
+        """
+        Versão em lote de check_fraud
+        
+        Args:
+            casos (list): Tuplas (nome_titular, cpf_titular, process_details, grid_data) ou
+                (nome_titular, cpf_titular, process_details, grid_data, documentos_parte)
+            
+        Returns:
+            list: Uma tupla (suspeita de fraude, motivo) por caso
+        """
+        resultados = [None] * len(casos)
+        pendentes = []
+        for idx, caso in enumerate(casos):
+            nome_titular, cpf_titular, process_details = caso[:3]
+            documentos_parte = caso[4] if len(caso) > 4 else ()
+            resultados[idx] = self._check_documents(cpf_titular, process_details, documentos_parte)
+            if resultados[idx] is None:
+                if nome_titular:
+                    pendentes.append(idx)
+                else:
+                    resultados[idx] = (False, MOTIVO_SEM_TITULAR)
+        
+        # Sem documentos válidos: decide pelos nomes, todos em um único lote
+        if pendentes:
+            suspeitas = self.check_name_matches_batch(
+                [(casos[idx][0], casos[idx][2], casos[idx][3]) for idx in pendentes]
+            )
+            for idx, suspeita in zip(pendentes, suspeitas):
+                resultados[idx] = (True, MOTIVO_NOME_DIVERGENTE) if suspeita else (False, MOTIVO_NOME_CONFERE)
+        
+        return resultados
+
+    def _check_documents(self, cpf_titular, process_details, documentos_parte=()):
+        """
+        Compara os documentos; retorna (suspeita, motivo) ou None se a decisão depender dos nomes
+
+        Os documentos da parte adversa vêm só do processo e de documentos_parte: o grid_data
+        é o catálogo inteiro, e nenhuma linha dele identifica o processo verificado.
+        """
+        documentos = list(documentos_parte or ())
+        documentos.append(process_details.get('partes', {}).get('cpf_cnpj_parte_adverso'))
+        
+        motivo = compare_documents(cpf_titular, documentos)
+        if motivo == MOTIVO_DOCUMENTO_CONFERE:
+            logger.info("CPF/CNPJ do titular confere com o da parte adversa")
+            return False, motivo
+        if motivo == MOTIVO_DOCUMENTO_DIVERGENTE:
+            logger.warning("CPF/CNPJ do titular diverge do da parte adversa")
+            return True, motivo
+        return None
+
+    def _collect_comparison_names(self, process_details, grid_data):
+        """
+        Reúne os nomes (parte adversa e advogados) a comparar com o nome do titular
+
+        grid_data traz a linha do catálogo do próprio processo ([entrada]): sem parte adversa
+        na página, o nome vem do campo adverso dessa linha, nunca de outro processo.
+        """
         # Lista de nomes para comparar
         nomes_para_comparar = []
         
@@ -126,7 +209,7 @@ class ProcessDetailsScraper:
             if 'parte_adversa' in partes and partes['parte_adversa'] and partes['parte_adversa'].strip() not in ['', 'N/A']:
                 parte_adversa = partes['parte_adversa'].replace('AUTOR - ', '').strip()
                 logger.info(f"Usando parte adversa do processo: {parte_adversa}")
-            elif grid_data[0]['grid_data'][3]:
+            elif grid_data and grid_data[0]['grid_data'][3]:
                 # O campo adverso está na posição 3 do grid_data
                 grid_adverso = grid_data[0]['grid_data'][3].strip()
                 if grid_adverso and grid_adverso not in ['', 'N/A']:
@@ -161,10 +244,10 @@ class ProcessDetailsScraper:
                                 'tipo': 'advogado_adverso'
                             })
         
-        # Normaliza o nome do titular para comparação
-        nome_titular_norm = self._normalize_name(nome_titular)
-        
-        # 1. Verifica se o nome do titular está contido em algum dos outros nomes
+        return nomes_para_comparar
+
+    def _find_direct_match(self, nome_titular, nome_titular_norm, nomes_para_comparar):
+        """Verifica se o nome do titular está contido em algum dos nomes (ou vice-versa)"""
         for info in nomes_para_comparar:
             nome_norm = self._normalize_name(info['nome'])
             
@@ -173,127 +256,22 @@ class ProcessDetailsScraper:
                 logger.warning(
                     f"Match direto encontrado entre '{nome_titular}' (normalizado: '{nome_titular_norm}') e '{info['nome']}' (normalizado: '{nome_norm}')"
                 )
-                return False
-        
-        # 2. Verifica similaridade entre os nomes
-        for info in nomes_para_comparar:
-            similarity = calculate_name_similarity(nome_titular, info['nome'])
-            logger.info(f"Comparando '{nome_titular}' com '{info['nome']}' - Similaridade: {similarity:.2f}")
-            
-            if similarity > 0.5:  # 50% de similaridade
-                logger.warning(
-                    f"Match por similaridade encontrado entre '{nome_titular}' e '{info['nome']}' "
-                    f"com {similarity:.2f} de similaridade"
-                )
-                return False
-            
-        return True
+                return True
+        return False
 
     def _normalize_name(self, name):
+        """Normaliza um nome para comparação (ver name_matching.normalize_name)"""
+        return normalize_name(name)
+
+    def extract_process_details(self, process_id, grid_data, documentos_parte=()):
         """
-        Normaliza um nome para comparação, aplicando as seguintes transformações:
-        1. Remove acentos e caracteres especiais
-        2. Converte para minúsculo
-        3. Remove títulos honoríficos e sufixos empresariais
-        4. Remove caracteres não alfanuméricos
-        5. Padroniza espaços e pontuação
-        6. Remove palavras comuns e stopwords
-        """
-        if not name:
-            return ""
-        
-        # Converte para minúsculo e remove espaços extras nas extremidades
-        normalized = name.lower().strip()
-        
-        # Remove acentos e caracteres especiais usando unidecode
-        normalized = unidecode(normalized)
-        
-        # Lista expandida de palavras para remover
-        palavras_para_remover = [
-            # Stopwords em português
-            'a', 'ao', 'aos', 'aquela', 'aquelas', 'aquele', 'aqueles', 'aquilo',
-            'as', 'ate', 'com', 'como', 'da', 'das', 'de', 'dela', 'delas',
-            'dele', 'deles', 'depois', 'do', 'dos', 'e', 'ela', 'elas', 'ele',
-            'eles', 'em', 'entre', 'era', 'eram', 'essa', 'essas', 'esse',
-            'esses', 'esta', 'estas', 'este', 'estes', 'eu', 'isso', 'isto',
-            'ja', 'la', 'lhe', 'lhes', 'lo', 'mas', 'me', 'mesmo', 'meu',
-            'meus', 'minha', 'minhas', 'muito', 'na', 'nas', 'nem', 'no', 'nos',
-            'nossa', 'nossas', 'nosso', 'nossos', 'num', 'numa', 'o', 'os',
-            'ou', 'para', 'pela', 'pelas', 'pelo', 'pelos', 'por', 'qual',
-            'quando', 'que', 'quem', 'sao', 'se', 'seja', 'sejam', 'sem',
-            'seu', 'seus', 'so', 'sua', 'suas', 'tambem', 'te', 'tem', 'tinha',
-            'um', 'uma', 'voce', 'voces', 'vos', 'vosso', 'vossa', 'vossos',
-            'vossas',
-            
-            # Títulos honoríficos e profissionais
-            'dr', 'dra', 'doutor', 'doutora', 'adv', 'advogado', 'advogada',
-            'professor', 'professora', 'prof', 'profa', 'mestre', 'mestra',
-            'especialista', 'bacharel', 'excelentissimo', 'excelentissima',
-            'ilustrissimo', 'ilustrissima', 'senhor', 'senhora', 'sr', 'sra',
-            'vossa', 'excelencia', 'meritissimo', 'meritissima',
-            'senhor', 'senhora', 'sr', 'sra', 'vossa', 'excelencia',
-            'meritissimo', 'meritissima',
-            
-            # Sufixos empresariais e termos jurídicos
-            'me', 'mei', 'ltda', 'sa', 's/a', 'ss', 'epp', 'eireli',
-            'sociedade', 'individual', 'empresaria', 'limitada', 'simples',
-            'microempresa', 'microempreendedor', 'empresa', 'comercio',
-            'industria', 'servicos', 'representacoes', 'distribuicao',
-            'importacao', 'exportacao', 'assessoria', 'consultoria',
-            'consultor', 'consultora', 'engenheiro', 'engenharia',
-            'arquiteto', 'arquitetura', 'arquiteto', 'arquitetura',
-            'advogado', 'advogada', 'advogados', 'advogada', 'advogados',
-            
-            # Conectores e preposições compostas
-            'junto', 'perante', 'mediante', 'durante', 'apos', 'sobre',
-            'sob', 'ate', 'desde', 'entre', 'contra', 'por', 'para',
-            'com', 'sem',
-            
-            # Sufixos e designações familiares
-            'junior', 'jr', 'senior', 'sr', 'filho', 'filha', 'neto',
-            'neta', 'sobrinho', 'sobrinha', 'primo', 'prima', 'tio', 'tia',
-            'avo', 'avoa',
-
-            # Outros termos comuns em nomes empresariais
-            'grupo', 'holding', 'participacoes', 'empreendimentos',
-            'administracao', 'gestao', 'negocios', 'comercial',
-            'industrial', 'brasil', 'brasileiro', 'brasileira', 'nacional',
-            'internacional', 'global', 'local', 'regional',
-            'fundacao', 'fundacao', 'fundacao', 'fundacao',        ]
-        
-        # Remove caracteres especiais mantendo apenas letras, números e espaços
-        # Substitui múltiplos espaços por um único espaço
-        normalized = re.sub(r'[^a-z0-9\s]', ' ', normalized)
-        normalized = re.sub(r'\s+', ' ', normalized)
-        
-        # Divide o texto em palavras
-        palavras = normalized.split()
-        
-        # Remove palavras comuns e garante tamanho mínimo
-        palavras_filtradas = [
-            palavra for palavra in palavras 
-            if palavra not in palavras_para_remover 
-            and len(palavra) > 1  # Remove palavras com apenas 1 caractere
-        ]
-        
-        # Se após a filtragem não sobrar nenhuma palavra, retorna a string vazia
-        if not palavras_filtradas:
-            return ""
-        
-        # Junta as palavras novamente
-        resultado = ' '.join(palavras_filtradas)
-        
-        # Remove espaços extras que possam ter sido criados
-        resultado = resultado.strip()
-        
-        # Log para debug
-        if resultado != name.lower():
-            logger.debug(f"Nome normalizado: '{name}' -> '{resultado}'")
-        
-        return resultado
+        Extrai detalhes completos de um processo específico
 
-    def extract_process_details(self, process_id, grid_data):
-        """Extrai detalhes completos de um processo específico"""
+        Args:
+            grid_data (list): Linha do catálogo deste processo, em uma lista ([entrada])
+            documentos_parte (iterable): CPF/CNPJ da parte adversa na linha do grid deste
+                processo, comparados com o do titular de cada acordo
+        """
         process_start = time.time()
         total_time = 0
 
@@ -301,10 +279,18 @@ class ProcessDetailsScraper:
             if not process_id:
                 logger.warning(f"ID do processo não fornecido")
                 return None
+
+            # Backend HTTP: busca direta das páginas, recorrendo ao navegador se necessário
+            if self.http_fetcher is not None:
+                process_details = self._extract_process_details_http(process_id, grid_data, documentos_parte)
+                if process_details is not None:
+                    self._log_time(process_start, f"TEMPO TOTAL do processo {process_id} (HTTP)")
+                    return process_details
+                logger.info(f"Processo {process_id}: usando o navegador")
                 
             # Navega para a página de detalhes do processo
             nav_start = time.time()
-            details_url = f"https://cetelem.djur.adv.br/processo/details/{process_id}"
+            details_url = self.DETAILS_URL.format(process_id=process_id)
             logger.info(f"Acessando detalhes do processo: {details_url}")
             self.driver.get(details_url)
             total_time += self._log_time(nav_start, "Navegação para página de detalhes")
@@ -327,66 +313,67 @@ class ProcessDetailsScraper:
                 'detalhes_acordo': {}
             }
 
+            # Modo snapshot: uma única espera pela aba Geral e leitura offline de todos os campos
+            snapshot_html = self._capture_details_snapshot() if self.snapshot_mode else None
+            snapshot_labels = parse_label_values(snapshot_html) if snapshot_html else None
+
             # Extrai os dados do processo da página
-            status_pagina = self.safe_get_text("//td[strong[text()='Status:']]/following-sibling::td")
-            escritorio_pagina = self.safe_get_text("//td[strong[text()='Escritório / Célula:']]/following-sibling::td")
-            data_cadastro = self.safe_get_text("//td[strong[text()='Data de Cadastro:']]/following-sibling::td")
-            
-            # Se os dados da página estiverem vazios, usa os dados do grid
-            status_final = status_pagina
-            escritorio_final = escritorio_pagina
-            
-            if grid_data and len(grid_data) > 8:
-                if not status_pagina or status_pagina.strip() in ['', 'N/A']:
-                    status_final = grid_data[8]  # Status está na posição 8
-                    logger.info(f"Usando status do grid_data: {status_final}")
+            if snapshot_labels is not None:
+                process_details['processo'] = self._build_process_section(parse_process_fields(snapshot_labels), grid_data)
+            else:
+                status_pagina = self.safe_get_text("//td[strong[text()='Status:']]/following-sibling::td")
+                escritorio_pagina = self.safe_get_text("//td[strong[text()='Escritório / Célula:']]/following-sibling::td")
+                data_cadastro = self.safe_get_text("//td[strong[text()='Data de Cadastro:']]/following-sibling::td")
                 
-                if not escritorio_pagina or escritorio_pagina.strip() in ['', 'N/A']:
-                    escritorio_final = grid_data[7]  # Escritório está na posição 7
-                    logger.info(f"Usando escritório do grid_data: {escritorio_final}")
-
-            numero_processo = grid_data[0].get('grid_data')[2]
-            if numero_processo == '':
-                numero_processo = self.safe_get_text("//td[strong[text()='Número do Processo:']]/following-sibling::td")
+                # Se os dados da página estiverem vazios, usa os dados do grid
+                status_final = status_pagina
+                escritorio_final = escritorio_pagina
+                
+                if grid_data and len(grid_data) > 8:
+                    if not status_pagina or status_pagina.strip() in ['', 'N/A']:
+                        status_final = grid_data[8]  # Status está na posição 8
+                        logger.info(f"Usando status do grid_data: {status_final}")
                     
-            process_details['processo'] = {
-                'numero': numero_processo,
-                'escritorio_celula': escritorio_final,
-                'comarca': self.safe_get_text("//td[strong[text()='Comarca:']]/following-sibling::td"),
-                'fase': self.safe_get_text("//td[strong[text()='Fase']]/following-sibling::td"),
-                'status': status_final,
-                'data_cadastro': data_cadastro
-            }
+                    if not escritorio_pagina or escritorio_pagina.strip() in ['', 'N/A']:
+                        escritorio_final = grid_data[7]  # Escritório está na posição 7
+                        logger.info(f"Usando escritório do grid_data: {escritorio_final}")
+
+                numero_processo = grid_data[0].get('grid_data')[2]
+                if numero_processo == '':
+                    numero_processo = self.safe_get_text("//td[strong[text()='Número do Processo:']]/following-sibling::td")
+                        
+                process_details['processo'] = {
+                    'numero': numero_processo,
+                    'escritorio_celula': escritorio_final,
+                    'comarca': self.safe_get_text("//td[strong[text()='Comarca:']]/following-sibling::td"),
+                    'fase': self.safe_get_text("//td[strong[text()='Fase']]/following-sibling::td"),
+                    'status': status_final,
+                    'data_cadastro': data_cadastro
+                }
 
             # Extrai dados das partes primeiro para ter os nomes para comparação
             try:
                 parties_start = time.time()
-                # Clica na aba Geral
-                geral_tab = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, 'a[href="#box-dadosprincipais"]'))
-                )
-                self.driver.execute_script("arguments[0].click();", geral_tab)
-                
-                # Aguarda o carregamento da aba
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "box-dadosprincipais"))
-                )
-                
-                # Extrai dados das partes
-                process_details['partes'] = self.extract_parties_data()
+                if snapshot_labels is not None:
+                    # Partes extraídas do mesmo snapshot, sem novas esperas
+                    process_details['partes'] = parse_parties(snapshot_html, labels=snapshot_labels)
+                else:
+                    # Clica na aba Geral
+                    geral_tab = WebDriverWait(self.driver, 10).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, 'a[href="#box-dadosprincipais"]'))
+                    )
+                    self.driver.execute_script("arguments[0].click();", geral_tab)
+                    
+                    # Aguarda o carregamento da aba
+                    WebDriverWait(self.driver, 10).until(
+                        EC.presence_of_element_located((By.ID, "box-dadosprincipais"))
+                    )
+                    
+                    # Extrai dados das partes
+                    process_details['partes'] = self.extract_parties_data()
                 total_time += self._log_time(parties_start, "Extração dos dados das partes")
                 
-                # Armazena grid_data apenas para validação de suspeita de fraude
-                if grid_data:
-                    process_details['grid_data'] = grid_data
-                
-                # Popula polo ativo
-                if 'parte_adversa' in process_details['partes'] and process_details['partes']['parte_adversa']:
-                    process_details['partes']['polo_ativo'] = [{
-                        'nome': process_details['partes']['parte_adversa'].replace('AUTOR - ', ''),
-                        'cpf_cnpj': process_details['partes'].get('cpf_cnpj_parte_adverso', ''),
-                        'tipo': 'AUTOR'
-                    }]
+                self._complete_parties(process_details, grid_data)
             
             except Exception as e:
                 logger.error(f"Erro ao extrair dados das partes: {str(e)}")
@@ -416,172 +403,36 @@ class ProcessDetailsScraper:
                     
                     logger.info(f"Encontrados {len(acordos)} acordos para processar")
                     
+                    # Busca todas as páginas de acordo de uma vez, sem sair da página do processo
+                    acordos_start = time.time()
+                    acordo_pages = self._fetch_acordo_pages(acordos)
+                    total_time += self._log_time(acordos_start, f"Busca das páginas de {len(acordo_pages)} acordos")
+                    
                     # Para cada acordo encontrado, extrai os detalhes
                     for idx, acordo in enumerate(acordos, 1):
-                        acordo_start = time.time()
                         logger.info(f"Processando acordo {idx} de {len(acordos)}")
+                        acordo_link = acordo.get('link')
+                        if not acordo_link or not acordo_link.strip():
+                            logger.warning(f"Link do acordo {idx} está vazio")
+                            continue
+
                         try:
-                            # Verifica e acessa o link do acordo
-                            if 'link' in acordo:
-                                acordo_link = acordo['link']
-                                logger.info(f"Link do acordo encontrado: {acordo_link}")
-                                
-                                # Verifica se o link é válido
-                                if not acordo_link or not acordo_link.strip():
-                                    logger.warning(f"Link do acordo {idx} está vazio")
-                                    continue
-                                    
-                                logger.info(f"Acessando link do acordo: {acordo_link}")
-                                # Guarda a URL atual para voltar depois
-                                current_url = self.driver.current_url
-                                
-                                try:
-                                    # Navega para a página do acordo
-                                    logger.info(f"Navegando para a página do acordo: {acordo_link}")
-                                    self.driver.get(acordo_link)
-                                    
-                                    # Aguarda a página carregar
-                                    WebDriverWait(self.driver, 10).until(
-                                        EC.presence_of_element_located((By.CLASS_NAME, "panel-body"))
-                                    )
-                                    
-                                    # Aguarda o carregamento da tabela principal e extrai suas linhas
-                                    table = WebDriverWait(self.driver, 10).until(
-                                        EC.presence_of_element_located((By.CSS_SELECTOR, "table.table-striped"))
-                                    )
-                                    
-                                    # Aguarda a tabela estar realmente carregada
-                                    WebDriverWait(self.driver, 5).until(
-                                        lambda d: len(d.find_elements(By.CSS_SELECTOR, "table.table-striped tr")) > 0
-                                    )
-                                    
-                                    rows = table.find_elements(By.TAG_NAME, "tr")
-                                    if not rows:
-                                        logger.error("Tabela de detalhes do acordo está vazia")
-                                        self.driver.get(current_url)
-                                        continue
-                                    
-                                    logger.info(f"Tabela carregada com {len(rows)} linhas")
-                                    
-                                    # Extrai os detalhes do acordo
-                                    acordo_details = {}
-                                    
-                                    # Mapeamento de campos
-                                    field_mapping = {
-                                        'numero': 'Número',
-                                        'parte_adversa': 'Parte Adversa',
-                                        'valor': 'Valor',
-                                        'status': 'Status',
-                                        'escritorio_celula': 'Escritório/Célula',
-                                        'comarca': 'Comarca',
-                                        'estado': 'Estado',
-                                        'fase': 'Fase',
-                                        'advogado_adverso': 'Advogado Adverso',
-                                        'cpf_cnpj_parte_adverso': 'CPF/CNPJ Parte Adversa',
-                                        'nome_titular': 'Nome do Titular',
-                                        'cpf_titular': 'CPF do Titular',
-                                        'data_pagamento': 'Data Pagamento'  # Ajustado para corresponder ao campo na tabela
-                                    }
-                                    
-                                    # Extrai valores da tabela
-                                    for row in rows:
-                                        try:
-                                            cells = row.find_elements(By.TAG_NAME, "td")
-                                            if len(cells) >= 3:
-                                                # Pega o label da primeira célula
-                                                label_element = cells[0].find_element(By.TAG_NAME, "strong")
-                                                if label_element:
-                                                    label = label_element.text.strip().replace(":", "")
-                                                    # Trata células que podem conter links
-                                                    try:
-                                                        link = cells[1].find_element(By.TAG_NAME, "a")
-                                                        # Para campos específicos, pegamos o href do link
-                                                        if label in ['Processo', 'PA']:
-                                                            value = link.get_attribute('href').split('/')[-1].strip()
-                                                        else:
-                                                            value = link.text.strip()
-                                                    except:
-                                                        value = cells[1].text.strip()
-                                                        
-                                                    # Procura o campo correspondente ao label
-                                                    for campo, campo_label in field_mapping.items():
-                                                        if campo_label == label:
-                                                            acordo_details[campo] = value
-                                                        
-                                                # Pega o label da segunda célula
-                                                if len(cells) >= 2:
-                                                    if cells[2].text != '': 
-                                                        label_element = cells[2].find_element(By.TAG_NAME, "strong")   
-                                                        if label_element:
-                                                            label = label_element.text.strip().replace(":", "")
-                                                            value = cells[3].text.strip()
-                                                                
-                                                            # Procura o campo correspondente ao label
-                                                            for campo, campo_label in field_mapping.items():
-                                                                if campo == 'nome_titular':
-                                                                    if acordo_details.get(label) == '':
-                                                                        acordo_details[campo] = value
-                                                                        break
-                                                                else:
-                                                                    if campo_label == label:
-                                                                        acordo_details[campo] = value
-                                                                        break
-                                                                                                                                                    
-                                        except Exception as e:
-                                            logger.debug(f"Erro ao processar linha da tabela: {str(e)}")
-                                            continue
-                                    
-                                    # Marca o lancamento como acordo e verifica suspeita de fraude
-                                    acordo_details['is_acordo'] = 'Sim'
-                                    nome_titular = acordo_details.get('nome_titular', '')
-                                    cpf_titular = acordo_details.get('cpf_titular', '')
-                                    
-                                    # Verifica suspeita de fraude apenas se tivermos um nome de titular
-                                    if nome_titular:
-                                        suspeita_fraude = 'Não'
-                                        if self.check_name_matches(nome_titular, process_details, grid_data):
-                                            suspeita_fraude = 'Sim'
-                                            
-                                        acordo_details['suspeita_fraude'] = suspeita_fraude
-                                        
-                                        # Atualiza o campo no grid financeiro
-                                        logger.info(f"Atualizando suspeita de fraude para '{suspeita_fraude}' no acordo {acordo_link}")
-                                        if not self.financial_scraper.update_acordo_suspeita_fraude(acordo_link, suspeita_fraude):
-                                            logger.warning(f"Não foi possível atualizar suspeita de fraude no grid para o acordo {acordo_link}")
-                                    else:
-                                        logger.warning(f"Nome do titular não encontrado para o acordo {acordo_link}")
-                                        acordo_details['suspeita_fraude'] = 'Não'
-                                    
-                                    # Adiciona o acordo extraído à lista
-                                    if acordo_details:
-                                        process_details['detalhes_acordo'] = {'acordo': acordo_details}
-                                        logger.info(f"Acordo {idx} adicionado com sucesso")
-                                    else:
-                                        logger.warning(f"Acordo {idx} não contém dados")
-                                        
-                                except Exception as e:
-                                    logger.error(f"Erro ao extrair dados do acordo: {str(e)}")
-                                finally:
-                                    # Volta para a página do processo
-                                    logger.info("Voltando para a página do processo")
-                                    self.driver.get(current_url)
-                                    
-                                    # Aguarda carregamento e clica na aba financeira
-                                    WebDriverWait(self.driver, 10).until(
-                                        EC.presence_of_element_located((By.CLASS_NAME, "panel-body"))
-                                    )
-                                    financial_tab = WebDriverWait(self.driver, 10).until(
-                                        EC.element_to_be_clickable((By.CSS_SELECTOR, 'a[href="#box-financeiro"]'))
-                                    )
-                                    self.driver.execute_script("arguments[0].click();", financial_tab)
-                                    WebDriverWait(self.driver, 10).until(
-                                        EC.presence_of_element_located((By.CSS_SELECTOR, "#financeiroList table.table-hover"))
-                                    )
-                                    
+                            acordo_html = acordo_pages.get(acordo_link)
+                            acordo_details = parse_acordo_details(acordo_html) if acordo_html else None
+
+                            # Conteúdo ausente no HTML do servidor: abre o acordo em uma segunda aba
+                            if acordo_details is None:
+                                acordo_html = self._fetch_acordo_in_tab(acordo_link)
+                                acordo_details = parse_acordo_details(acordo_html) if acordo_html else None
+
+                            if not acordo_details:
+                                logger.error(f"Tabela de detalhes do acordo {acordo_link} está vazia ou indisponível")
+                                continue
+
+                            self._apply_acordo_details(process_details, acordo_details, acordo_link, grid_data, idx,
+                                                       documentos_parte)
                         except Exception as e:
-                            logger.error(f"Erro ao processar acordo: {str(e)}")
-                            # Garante que voltamos para a página do processo
-                            self.driver.get(current_url)
+                            logger.error(f"Erro ao extrair dados do acordo: {str(e)}")
                             continue
                             
             except Exception as e:
@@ -598,6 +449,229 @@ class ProcessDetailsScraper:
             logger.error(f"Erro ao extrair detalhes do processo: {str(e)}")
             return None
 
+    def _build_process_section(self, page_fields, grid_data):
+        """Monta process_details['processo'] a partir dos campos lidos da página, completando com o grid"""
+        status_final = page_fields['status']
+        escritorio_final = page_fields['escritorio_celula']
+
+        # Se os dados da página estiverem vazios, usa os dados do grid
+        if grid_data and len(grid_data) > 8:
+            if not status_final or status_final.strip() in ['', 'N/A']:
+                status_final = grid_data[8]  # Status está na posição 8
+                logger.info(f"Usando status do grid_data: {status_final}")
+
+            if not escritorio_final or escritorio_final.strip() in ['', 'N/A']:
+                escritorio_final = grid_data[7]  # Escritório está na posição 7
+                logger.info(f"Usando escritório do grid_data: {escritorio_final}")
+
+        numero_processo = grid_data[0].get('grid_data')[2]
+        if numero_processo == '':
+            numero_processo = page_fields['numero']
+
+        return {
+            'numero': numero_processo,
+            'escritorio_celula': escritorio_final,
+            'comarca': page_fields['comarca'],
+            'fase': page_fields['fase'],
+            'status': status_final,
+            'data_cadastro': page_fields['data_cadastro']
+        }
+
+    def _complete_parties(self, process_details, grid_data):
+        """Guarda o grid_data e popula o polo ativo a partir da parte adversa"""
+        # Armazena grid_data apenas para validação de suspeita de fraude
+        if grid_data:
+            process_details['grid_data'] = grid_data
+        
+        # Popula polo ativo
+        if 'parte_adversa' in process_details['partes'] and process_details['partes']['parte_adversa']:
+            process_details['partes']['polo_ativo'] = [{
+                'nome': process_details['partes']['parte_adversa'].replace('AUTOR - ', ''),
+                'cpf_cnpj': process_details['partes'].get('cpf_cnpj_parte_adverso', ''),
+                'tipo': 'AUTOR'
+            }]
+
+    def _apply_acordo_details(self, process_details, acordo_details, acordo_link, grid_data, idx, documentos_parte=()):
+        """Marca o acordo, verifica suspeita de fraude e o registra em process_details"""
+        # Marca o lancamento como acordo e verifica suspeita de fraude
+        acordo_details['is_acordo'] = 'Sim'
+        nome_titular = acordo_details.get('nome_titular', '')
+        
+        # Verifica suspeita de fraude pelos documentos ou, na falta deles, pelo nome do titular
+        if nome_titular or acordo_details.get('cpf_titular'):
+            suspeita, motivo = self.check_fraud(
+                nome_titular, acordo_details.get('cpf_titular'), process_details, grid_data,
+                documentos_parte=[acordo_details.get('cpf_cnpj_parte_adverso'), *documentos_parte]
+            )
+            suspeita_fraude = 'Sim' if suspeita else 'Não'
+                
+            acordo_details['suspeita_fraude'] = suspeita_fraude
+            acordo_details['motivo_suspeita'] = motivo
+            
+            # Atualiza o campo no grid financeiro
+            logger.info(f"Atualizando suspeita de fraude para '{suspeita_fraude}' no acordo {acordo_link}")
+            if not self.financial_scraper.update_acordo_suspeita_fraude(acordo_link, suspeita_fraude):
+                logger.warning(f"Não foi possível atualizar suspeita de fraude no grid para o acordo {acordo_link}")
+        else:
+            logger.warning(f"Nome do titular não encontrado para o acordo {acordo_link}")
+            acordo_details['suspeita_fraude'] = 'Não'
+            acordo_details['motivo_suspeita'] = MOTIVO_SEM_TITULAR
+        
+        # Adiciona o acordo extraído à lista
+        if acordo_details:
+            process_details['detalhes_acordo'] = {'acordo': acordo_details}
+            logger.info(f"Acordo {idx} adicionado com sucesso")
+        else:
+            logger.warning(f"Acordo {idx} não contém dados")
+
+    def _extract_process_details_http(self, process_id, grid_data, documentos_parte=()):
+        """
+        Extrai os detalhes do processo buscando as páginas por HTTP, sem renderizá-las no Chrome
+        
+        Returns:
+            dict: Mesma estrutura de extract_process_details, ou None quando alguma página
+                  exigir o navegador (página de login ou conteúdo gerado por JavaScript)
+        """
+        self.http_fetcher.sync_cookies()
+
+        details_url = self.DETAILS_URL.format(process_id=process_id)
+        html = self.http_fetcher.fetch(details_url, required_id='box-dadosprincipais')
+        if html is None:
+            return None
+
+        labels = parse_label_values(html)
+        lancamentos = parse_financial_rows(html, details_url)
+        if not labels or lancamentos is None:
+            logger.info(f"Dados principais ou financeiros ausentes no HTML do processo {process_id}")
+            return None
+
+        process_details = {
+            'processo': self._build_process_section(parse_process_fields(labels), grid_data),
+            'partes': parse_parties(html, labels=labels),
+            'financeiro': {'lancamentos': lancamentos, 'resumo': {}},
+            'detalhes_acordo': {}
+        }
+        self._complete_parties(process_details, grid_data)
+        self.financial_scraper.financial_data = process_details['financeiro']
+
+        logger.info(f"Encontrados {len(lancamentos)} acordos para processar")
+        acordo_pages = self._fetch_acordo_pages(lancamentos)
+        for idx, acordo in enumerate(lancamentos, 1):
+            acordo_link = acordo.get('link')
+            if not acordo_link or not acordo_link.strip():
+                logger.warning(f"Link do acordo {idx} está vazio")
+                continue
+
+            acordo_html = acordo_pages.get(acordo_link)
+            if acordo_html is None:
+                return None
+
+            acordo_details = parse_acordo_details(acordo_html)
+            if acordo_details is None:
+                logger.info(f"Tabela de detalhes ausente no HTML do acordo {acordo_link}")
+                return None
+            if not acordo_details:
+                logger.error("Tabela de detalhes do acordo está vazia")
+                continue
+
+            self._apply_acordo_details(process_details, acordo_details, acordo_link, grid_data, idx, documentos_parte)
+
+        return process_details
+
+    def _get_http_fetcher(self):
+        """Retorna o HttpPageFetcher do scraper, criando-o sob demanda no backend 'browser'"""
+        if self.http_fetcher is None:
+            self.http_fetcher = HttpPageFetcher(self.driver)
+        return self.http_fetcher
+
+    def _fetch_acordo_pages(self, acordos):
+        """
+        Busca em paralelo, por HTTP com os cookies do navegador, as páginas de todos os acordos
+        
+        Args:
+            acordos (list): Lançamentos de acordo com a chave 'link'
+            
+        Returns:
+            dict: link -> HTML da página (None quando a página exigir o navegador)
+        """
+        acordo_links = list(dict.fromkeys(
+            acordo['link'] for acordo in acordos if acordo.get('link') and acordo['link'].strip()
+        ))
+        if not acordo_links:
+            return {}
+
+        fetcher = self._get_http_fetcher()
+        fetcher.sync_cookies()
+        workers = max(1, min(ACORDO_FETCH_WORKERS, len(acordo_links)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(fetcher.fetch, acordo_links))
+        return dict(zip(acordo_links, pages))
+
+    def _fetch_acordo_in_tab(self, acordo_link, timeout=10):
+        """
+        Abre o acordo em uma segunda aba e retorna o HTML, mantendo a página do processo intacta
+        
+        Returns:
+            str: HTML da página do acordo, ou None em caso de falha
+        """
+        if self.driver is None:
+            return None
+
+        process_window = self.driver.current_window_handle
+        try:
+            logger.info(f"Abrindo acordo em segunda aba: {acordo_link}")
+            self.driver.switch_to.new_window('tab')
+            self.driver.get(acordo_link)
+            WebDriverWait(self.driver, timeout).until(
+                lambda d: len(d.find_elements(By.CSS_SELECTOR, "table.table-striped tr")) > 0
+            )
+            return self.driver.page_source
+        except Exception as e:
+            logger.error(f"Erro ao carregar acordo {acordo_link} na segunda aba: {str(e)}")
+            return None
+        finally:
+            try:
+                if self.driver.current_window_handle != process_window:
+                    self.driver.close()
+            finally:
+                self.driver.switch_to.window(process_window)
+
+    def _capture_details_snapshot(self, timeout=10):
+        """
+        Aguarda uma única vez a aba Geral (#box-dadosprincipais) ficar pronta e captura seu HTML
+        
+        Se os campos do processo (Status, Comarca...) não estiverem dentro da aba,
+        o código fonte da página é anexado ao snapshot.
+        
+        Returns:
+            str: HTML capturado ou None se a aba não ficou pronta (usa-se então o modo por campo)
+        """
+        try:
+            snapshot_start = time.time()
+            geral_tab = WebDriverWait(self.driver, timeout).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, 'a[href="#box-dadosprincipais"]'))
+            )
+            self.driver.execute_script("arguments[0].click();", geral_tab)
+
+            # Aguarda a aba estar preenchida com os rótulos
+            box = WebDriverWait(self.driver, timeout).until(
+                EC.presence_of_element_located((By.ID, "box-dadosprincipais"))
+            )
+            WebDriverWait(self.driver, timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "#box-dadosprincipais td strong"))
+            )
+
+            html = box.get_attribute('outerHTML')
+            if 'Status:' not in html:
+                html += self.driver.page_source
+
+            self._log_time(snapshot_start, "Captura do snapshot da aba Geral")
+            return html
+
+        except Exception as e:
+            logger.warning(f"Não foi possível capturar o snapshot da aba Geral, usando extração por campo: {str(e)}")
+            return None
+
     def extract_parties_data(self):
         """Extrai dados das partes"""
         parties_data = {}
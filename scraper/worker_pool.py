@@ -0,0 +1,229 @@
+import queue
+import threading
+import time
+import psutil
+from .process_details_scraper import ProcessDetailsScraper
+from .documents import entry_documents
+from config import get_logger, EXTRACTION_WORKERS, WORKER_MAX_RSS_MB
+
+logger = get_logger(__name__)
+
+# Sentinela para encerrar as threads dos workers
+_STOP = object()
+
+
+def get_driver_rss_mb(driver):
+    """Soma a memória residente (RSS, em MB) do chromedriver e do Chrome de um driver"""
+    pids = []
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    if process is not None:
+        pids.append(process.pid)
+    browser_pid = getattr(driver, 'browser_pid', None)
+    if browser_pid:
+        pids.append(browser_pid)
+
+    total = 0
+    seen = set()
+    for pid in pids:
+        try:
+            root = psutil.Process(pid)
+            for proc in [root] + root.children(recursive=True):
+                if proc.pid in seen:
+                    continue
+                seen.add(proc.pid)
+                total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+
+class ExtractionWorkerPool:
+    """
+    Pool de navegadores autenticados que extrai os detalhes dos processos em paralelo
+
+    Cada worker é uma instância própria de LegalScraper (criada por scraper_factory),
+    logada via auto_login com seu próprio código TOTP: LegalScraper.get_mfa_code não repete
+    o passo TOTP de um login anterior, e logins na mesma janela de 30 s esperam a seguinte.
+    Os workers consomem uma fila compartilhada de entradas do catálogo e os resultados são
+    devolvidos na ordem do catálogo, de modo que o chamador grave no banco sempre na mesma
+    sequência.
+    """
+
+    def __init__(self, scraper_factory, num_workers=EXTRACTION_WORKERS, max_rss_mb=WORKER_MAX_RSS_MB):
+        """
+        Args:
+            scraper_factory (callable): Cria um LegalScraper ainda não inicializado
+            num_workers (int): Quantidade de navegadores em paralelo
+            max_rss_mb (int): Limite de memória por worker (Chrome + chromedriver); 0 desativa
+        """
+        self.scraper_factory = scraper_factory
+        self.num_workers = max(1, int(num_workers))
+        self.max_rss_mb = max_rss_mb
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._threads = []
+        self._scrapers = {}
+        self._scrapers_lock = threading.Lock()
+        # Os logins são feitos um de cada vez, cada um com o código MFA de um passo TOTP novo
+        self._login_lock = threading.Lock()
+        self._started = False
+        self._run_id = 0
+
+    def start(self):
+        """Inicia as threads dos workers (o login de cada navegador ocorre na própria thread)"""
+        if self._started:
+            return
+        self._started = True
+        for worker_id in range(1, self.num_workers + 1):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(worker_id,),
+                name=f"extraction-worker-{worker_id}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Pool de extração iniciado com {self.num_workers} workers")
+
+    def imap(self, entries):
+        """
+        Extrai os detalhes das entradas do catálogo em paralelo
+
+        Args:
+            entries (list): Entradas do catálogo com origem 'scrape'
+
+        Yields:
+            dict: Detalhes de cada processo (ou None em caso de falha), na ordem de entries
+        """
+        if not entries:
+            return
+        self.start()
+
+        # Cada execução tem seu próprio id para descartar resultados de execuções interrompidas
+        self._drain_tasks()
+        self._run_id += 1
+        run_id = self._run_id
+        for index, entry in enumerate(entries):
+            self._tasks.put((run_id, index, entry))
+
+        pending = {}
+        next_index = 0
+        try:
+            while next_index < len(entries):
+                try:
+                    result_run_id, index, details = self._results.get(timeout=1)
+                    if result_run_id == run_id:
+                        pending[index] = details
+                except queue.Empty:
+                    if not self._alive_workers():
+                        logger.error("Nenhum worker de extração ativo; processos restantes ficarão sem detalhes")
+                        self._drain_tasks()
+                        for index in range(next_index, len(entries)):
+                            pending.setdefault(index, None)
+
+                while next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index += 1
+        finally:
+            # Extração interrompida pelo chamador (ex.: cancelamento): descarta o que não começou
+            if next_index < len(entries):
+                self._drain_tasks()
+
+    def close(self):
+        """Encerra os workers e fecha todos os navegadores do pool"""
+        if not self._started:
+            return
+        self._drain_tasks()
+        for _ in self._threads:
+            self._tasks.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout=30)
+        with self._scrapers_lock:
+            for scraper in self._scrapers.values():
+                scraper.close()
+            self._scrapers.clear()
+        self._threads = []
+        self._started = False
+        logger.info("Pool de extração encerrado")
+
+    def _alive_workers(self):
+        return sum(1 for thread in self._threads if thread.is_alive())
+
+    def _drain_tasks(self):
+        """Descarta as tarefas ainda não iniciadas"""
+        try:
+            while True:
+                self._tasks.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _start_scraper(self, worker_id):
+        """Cria e autentica o navegador de um worker"""
+        scraper = self.scraper_factory()
+        with self._login_lock:
+            logger.info(f"Worker {worker_id}: iniciando navegador e realizando login")
+            scraper.initialize()
+        with self._scrapers_lock:
+            self._scrapers[worker_id] = scraper
+        return scraper
+
+    def _restart_scraper(self, worker_id, scraper, reason):
+        logger.warning(f"Worker {worker_id}: reiniciando navegador ({reason})")
+        scraper.close()
+        with self._scrapers_lock:
+            self._scrapers.pop(worker_id, None)
+        return self._start_scraper(worker_id)
+
+    def _worker_loop(self, worker_id):
+        try:
+            scraper = self._start_scraper(worker_id)
+        except Exception as e:
+            logger.error(f"Worker {worker_id}: falha ao inicializar: {str(e)}")
+            return
+        details_scraper = ProcessDetailsScraper(scraper.driver)
+
+        while True:
+            task = self._tasks.get()
+            if task is _STOP:
+                break
+
+            run_id, index, entry = task
+            task_start = time.time()
+            details = None
+            try:
+                details = details_scraper.extract_process_details(entry['id'], [entry], entry_documents(entry))
+
+                # Sessão expirada: refaz o login e tenta mais uma vez
+                if details is None and scraper._is_login_page():
+                    logger.warning(f"Worker {worker_id}: sessão expirada, refazendo login")
+                    with self._login_lock:
+                        success, message = scraper.auto_login()
+                    if success:
+                        details = details_scraper.extract_process_details(entry['id'], [entry], entry_documents(entry))
+                    else:
+                        logger.error(f"Worker {worker_id}: falha ao refazer login: {message}")
+            except Exception as e:
+                logger.error(f"Worker {worker_id}: erro ao extrair processo {entry['id']}: {str(e)}")
+            finally:
+                self._results.put((run_id, index, details))
+
+            logger.info(f"Worker {worker_id}: processo {entry['id']} em {time.time() - task_start:.2f} segundos")
+
+            # Recicla o navegador se ele morreu ou ultrapassou o limite de memória
+            try:
+                reason = None
+                try:
+                    _ = scraper.driver.current_url
+                except Exception:
+                    reason = "navegador inativo"
+                if reason is None and self.max_rss_mb:
+                    rss_mb = get_driver_rss_mb(scraper.driver)
+                    if rss_mb > self.max_rss_mb:
+                        reason = f"RSS {rss_mb:.0f} MB acima do limite de {self.max_rss_mb} MB"
+                if reason:
+                    scraper = self._restart_scraper(worker_id, scraper, reason)
+                    details_scraper = ProcessDetailsScraper(scraper.driver)
+            except Exception as e:
+                logger.error(f"Worker {worker_id}: falha ao reiniciar navegador, encerrando worker: {str(e)}")
+                return
@@ -1,3 +1,17 @@
+// Estado da busca paginada: filtros e ordenação da busca atual e os cursores das páginas
+// visitadas (cursors[i] abre a página i; null é a primeira página)
+const searchState = {
+    filters: {},
+    sort: 'assessment_date',
+    order: 'desc',
+    pageSize: 100,
+    cursors: [null],
+    nextCursor: null,
+    total: null,
+    totalExato: true,
+    requestId: 0
+};
+
 // Função para inicializar os componentes da página
 document.addEventListener('DOMContentLoaded', function() {
     // Configurar Flatpickr para português
@@ -24,6 +38,14 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Botão Limpar
     document.getElementById('clearButton').addEventListener('click', clearFilters);
+
+    // Ordenação pelas colunas e navegação entre páginas
+    document.querySelectorAll('#fraudeTable th.sortable').forEach(th => {
+        th.addEventListener('click', () => changeSort(th.dataset.sort));
+    });
+    document.getElementById('prevPageButton').addEventListener('click', previousPage);
+    document.getElementById('nextPageButton').addEventListener('click', nextPage);
+    updateSortIndicators();
 });
 
 // Função para inicializar os filtros
@@ -145,27 +167,41 @@ function clearFilters() {
     searchData();
 }
 
-// Função para buscar dados
-async function searchData() {
+// Função para buscar dados: nova busca a partir da primeira página
+function searchData() {
+    const startDate = document.getElementById('startDate')?.value;
+    const endDate = document.getElementById('endDate')?.value;
+    const idFilter = document.getElementById('idFilter')?.value;
+    const processo = document.getElementById('processoFilter')?.value;
+    const avaliacao = document.getElementById('avaliacaoFilter')?.value;
+    const motivo = document.getElementById('motivoFilter')?.value;
+
+    searchState.filters = {
+        start_date: startDate,
+        end_date: endDate,
+        external_id: idFilter,
+        processo: processo,
+        assessment_result: avaliacao === 'Todos' ? null : avaliacao,
+        reason_conclusion: motivo === 'Todos' ? null : motivo
+    };
+    searchState.cursors = [null];
+    return loadPage();
+}
+
+// Função para carregar a página atual (último cursor de searchState.cursors)
+async function loadPage() {
     const startTime = performance.now();
+    const requestId = ++searchState.requestId;
+    const cursor = searchState.cursors[searchState.cursors.length - 1];
     document.getElementById('searchTimer').style.display = 'none';
     
     try {
-        const startDate = document.getElementById('startDate')?.value;
-        const endDate = document.getElementById('endDate')?.value;
-        const idFilter = document.getElementById('idFilter')?.value;
-        const processo = document.getElementById('processoFilter')?.value;
-        const avaliacao = document.getElementById('avaliacaoFilter')?.value;
-        const motivo = document.getElementById('motivoFilter')?.value;
-        
-        const filters = {
-            start_date: startDate,
-            end_date: endDate,
-            external_id: idFilter,
-            processo: processo,
-            assessment_result: avaliacao === 'Todos' ? null : avaliacao,
-            reason_conclusion: motivo === 'Todos' ? null : motivo
-        };
+        const body = Object.assign({}, searchState.filters, {
+            page_size: searchState.pageSize,
+            sort: searchState.sort,
+            order: searchState.order,
+            cursor: cursor
+        });
         
         // Mostrar loading
         const loadingOverlay = document.getElementById('loadingOverlay');
@@ -173,22 +209,33 @@ async function searchData() {
             loadingOverlay.style.display = 'flex';
         }
         
-        console.log('Enviando filtros:', filters);
+        console.log('Enviando filtros:', body);
         
         const response = await fetch('/fraudeCheck/api/search', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify(filters)
+            body: JSON.stringify(body)
         });
         
+        const data = await response.json();
         if (!response.ok) {
-            throw new Error('HTTP error! status: ' + response.status);
+            throw new Error(data.error || 'HTTP error! status: ' + response.status);
+        }
+        // Resposta de uma busca já substituída por outra
+        if (requestId !== searchState.requestId) {
+            return;
         }
         
-        const data = await response.json();
-        updateTable(data);
+        searchState.nextCursor = data.next_cursor;
+        searchState.pageSize = data.page_size;
+        if (data.total !== undefined) {
+            searchState.total = data.total;
+            searchState.totalExato = data.total_exato;
+        }
+        updateTable(data.items);
+        updatePagination(data.items.length);
         
         const endTime = performance.now();
         const timeTaken = Math.round(endTime - startTime);
@@ -201,12 +248,67 @@ async function searchData() {
     } finally {
         // Esconder loading
         const loadingOverlay = document.getElementById('loadingOverlay');
-        if (loadingOverlay) {
+        if (loadingOverlay && requestId === searchState.requestId) {
             loadingOverlay.style.display = 'none';
         }
     }
 }
 
+// Função para avançar uma página
+function nextPage() {
+    if (!searchState.nextCursor) return;
+    searchState.cursors.push(searchState.nextCursor);
+    loadPage();
+}
+
+// Função para voltar uma página
+function previousPage() {
+    if (searchState.cursors.length <= 1) return;
+    searchState.cursors.pop();
+    loadPage();
+}
+
+// Função para ordenar por uma coluna: a mesma coluna inverte a direção
+function changeSort(sort) {
+    if (searchState.sort === sort) {
+        searchState.order = searchState.order === 'desc' ? 'asc' : 'desc';
+    } else {
+        searchState.sort = sort;
+        searchState.order = sort === 'assessment_date' ? 'desc' : 'asc';
+    }
+    updateSortIndicators();
+    searchState.cursors = [null];
+    loadPage();
+}
+
+// Função para marcar a coluna e a direção da ordenação atual
+function updateSortIndicators() {
+    document.querySelectorAll('#fraudeTable th.sortable').forEach(th => {
+        const indicator = th.querySelector('.sort-indicator');
+        if (th.dataset.sort === searchState.sort) {
+            indicator.textContent = searchState.order === 'desc' ? '▼' : '▲';
+        } else {
+            indicator.textContent = '';
+        }
+    });
+}
+
+// Função para atualizar o total e os botões de navegação
+function updatePagination(rowCount) {
+    const page = searchState.cursors.length;
+    const first = (page - 1) * searchState.pageSize;
+    const total = searchState.total === null ? '' :
+        (searchState.totalExato ? searchState.total.toLocaleString('pt-BR') :
+            'mais de ' + searchState.total.toLocaleString('pt-BR'));
+    
+    document.getElementById('pageInfo').textContent = rowCount === 0 ? '' :
+        `Registros ${(first + 1).toLocaleString('pt-BR')} a ${(first + rowCount).toLocaleString('pt-BR')}` +
+        (total ? ` de ${total}` : '');
+    document.getElementById('prevPageButton').disabled = page <= 1;
+    document.getElementById('nextPageButton').disabled = !searchState.nextCursor;
+    document.getElementById('pagination').style.display = rowCount > 0 || page > 1 ? 'block' : 'none';
+}
+
 // Função para atualizar a tabela com os dados
 function updateTable(data) {
     const tbody = document.querySelector('#fraudeTable tbody');
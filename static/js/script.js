@@ -69,6 +69,50 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   });
 
+  // Acompanha um job de recertificação até o fim, exibindo progresso, vazão e ETA no overlay
+  async function waitForRecertification(jobId) {
+    const progressText = document.getElementById("extractionProgress");
+    const overlay = document.querySelector(".loading-overlay");
+    const cancelButton = document.createElement("button");
+    cancelButton.className = "btn btn-danger mt-3";
+    cancelButton.innerHTML = '<i class="bi bi-stop-circle-fill"></i> Cancelar Recertificação';
+    cancelButton.addEventListener("click", async () => {
+      cancelButton.disabled = true;
+      await fetch(`/fraudeCheck/api/recertify/${jobId}/cancel`, { method: "POST" });
+      showToast("Cancelamento solicitado, gravando os lotes já avaliados", "warning");
+    });
+    overlay.appendChild(cancelButton);
+
+    try {
+      while (true) {
+        const response = await fetch(`/fraudeCheck/api/recertify/${jobId}`);
+        if (!response.ok) {
+          throw new Error("Falha ao consultar a recertificação");
+        }
+        const { job } = await response.json();
+        if (["completed", "failed", "cancelled"].includes(job.status)) {
+          return job;
+        }
+
+        const { agreements_processed, agreements_total } = job.progress;
+        let text = `Recertificando: ${agreements_processed}/${agreements_total} acordos`;
+        if (job.throughput) text += ` | ${job.throughput} acordos/s`;
+        if (job.stats.erros) text += ` | Erros: ${job.stats.erros}`;
+        if (job.eta_seconds !== null) {
+          const minutes = Math.floor(job.eta_seconds / 60);
+          const seconds = Math.round(job.eta_seconds % 60);
+          text += ` | Restante: ${minutes}min ${seconds}s`;
+        }
+        progressText.textContent = text;
+
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+      }
+    } finally {
+      cancelButton.remove();
+      progressText.textContent = "Extraindo processos...";
+    }
+  }
+
   // Adiciona evento de clique ao botão de recertificação de fraude
   const recertifyFraudBtn = document.getElementById("recertifyFraudBtn");
   if (recertifyFraudBtn) {
@@ -133,7 +177,7 @@ document.addEventListener("DOMContentLoaded", function () {
           document.querySelector(".loading-overlay").style.display = "flex";
           document.querySelector(".stop-extraction").style.display = "none";
           
-          // Faz a requisição para a API
+          // Submete a recertificação como job; se já houver uma em andamento, acompanha a existente
           const response = await fetch("/fraudeCheck/api/recertify", {
             method: "POST",
             headers: {
@@ -141,19 +185,24 @@ document.addEventListener("DOMContentLoaded", function () {
             }
           });
 
-          if (!response.ok) {
-            throw new Error("Falha ao recertificar fraudes");
+          const submitted = await response.json();
+          if (!response.ok && !(response.status === 409 && submitted.job_id)) {
+            throw new Error(submitted.error || "Falha ao recertificar fraudes");
           }
 
-          const result = await response.json();
+          const result = await waitForRecertification(submitted.job_id);
           
           // Esconde loading
           document.querySelector(".loading-overlay").style.display = "none";
+
+          if (result.status === "failed") {
+            throw new Error(result.error || "Falha ao recertificar fraudes");
+          }
           
           // Mostra resultado
           const resultHtml = `
             <div class="alert alert-success">
-              <h5>Recertificação concluída com sucesso!</h5>
+              <h5>${result.status === "cancelled" ? "Recertificação cancelada" : "Recertificação concluída com sucesso!"}</h5>
               <p>Total de processos analisados: <strong>${result.stats.total_processos}</strong></p>
               <p>Total de fraudes identificadas: <strong>${result.stats.total_fraudes}</strong></p>
               ${result.stats.erros > 0 ? `<p>Erros durante o processamento: <strong>${result.stats.erros}</strong></p>` : ''}
@@ -307,6 +356,7 @@ let columnFilters = {};
 let lastData = null; // Armazena os últimos dados carregados
 let currentSort = { column: null, direction: "asc" };
 let isExtracting = false;
+let currentJobId = null;
 
 document.addEventListener("DOMContentLoaded", function () {
   // Configuração do Flatpickr nos botões de calendário
@@ -524,22 +574,43 @@ document.addEventListener("DOMContentLoaded", function () {
       });
 
       console.log("Status da resposta:", response.status);
-      const result = await response.json();
-      console.log("Resultado completo:", result);
+      const submitted = await response.json();
+      console.log("Job submetido:", submitted);
+
+      if (!submitted.job_id || (submitted.status !== "accepted" && response.status !== 409)) {
+        console.error("Erro na resposta:", submitted.message);
+        showToast(submitted.message || "Erro ao extrair processos", "error");
+        return;
+      }
+
+      // Acompanha o job até o fim; cada processo concluído entra na tabela assim que chega
+      currentJobId = submitted.job_id;
+      const result = { status: "success", data: [], grid_data: [] };
+      lastData = result;
+      const onResult = (processDetails, gridRow) => {
+        result.data.push(processDetails);
+        result.grid_data.push(gridRow);
+        appendProcessRow(processDetails, gridRow);
+      };
+      const job = await streamExtractionJob(currentJobId, onResult);
+      if (job.status === "failed") {
+        result.status = "error";
+        result.message = job.error;
+      }
 
       if (result.status === "success") {
         console.log("Dados recebidos com sucesso");
-        console.log("Dados para atualizar tabela:", result.data);
+        console.log("Dados na tabela:", result.data);
         
         // Se não houver dados, mostra apenas a mensagem de "nenhum processo encontrado"
         if (!result.data || result.data.length === 0) {
           showToast("Nenhum processo encontrado", "warning");
         } else {
-          // Passar o objeto result diretamente para updateProcessTable
-          // A função updateProcessTable restaurada espera o objeto completo, não apenas tableData
-          console.log("Passando dados completos para updateProcessTable:", result);
-          updateProcessTable(result);
-          showToast("Extração concluída com sucesso!", "success");
+          if (job.status === "cancelled") {
+            showToast(`Extração cancelada: ${result.data.length} processos extraídos`, "warning");
+          } else {
+            showToast("Extração concluída com sucesso!", "success");
+          }
         }
         
         const endTime = performance.now();
@@ -556,10 +627,121 @@ document.addEventListener("DOMContentLoaded", function () {
     } finally {
       document.querySelector(".loading-overlay").style.display = "none";
       document.querySelector(".stop-extraction").style.display = "none";
+      updateExtractionProgress(null);
+      currentJobId = null;
       isExtracting = false;
     }
   }
 
+  // Recebe os resultados do job via Server-Sent Events; se o stream cair, continua por polling
+  function streamExtractionJob(jobId, onResult) {
+    if (!window.EventSource) {
+      return pollExtractionJob(jobId, onResult);
+    }
+
+    return new Promise((resolve, reject) => {
+      let offset = 0;
+      const source = new EventSource(`/api/jobs/${jobId}/events`, {
+        withCredentials: true,
+      });
+
+      source.addEventListener("result", (event) => {
+        const payload = JSON.parse(event.data);
+        offset = Number(event.lastEventId) || offset + 1;
+        onResult(payload.result, payload.grid_row);
+      });
+      source.addEventListener("progress", (event) => {
+        updateExtractionProgress(JSON.parse(event.data));
+      });
+      source.addEventListener("dropped", (event) => {
+        const payload = JSON.parse(event.data);
+        offset = payload.next_offset;
+        console.warn(`${payload.count} resultados descartados do buffer antes do envio`);
+      });
+      source.addEventListener("end", (event) => {
+        source.close();
+        const job = JSON.parse(event.data);
+        updateExtractionProgress(job);
+        resolve(job);
+      });
+      source.onerror = () => {
+        source.close();
+        console.warn("Stream da extração interrompido, continuando por polling");
+        pollExtractionJob(jobId, onResult, offset).then(resolve, reject);
+      };
+    });
+  }
+
+  // Consulta o job de extração até ele terminar, entregando os resultados novos a onResult
+  async function pollExtractionJob(jobId, onResult, offset = 0, interval = 2000) {
+    while (true) {
+      const response = await fetch(`/api/jobs/${jobId}?offset=${offset}`, {
+        credentials: "include",
+      });
+      const payload = await response.json();
+      if (payload.status !== "success") {
+        throw new Error(payload.message || "Erro ao consultar a extração");
+      }
+
+      const job = payload.job;
+      job.results.forEach((processDetails, index) => {
+        onResult(processDetails, job.grid_data[index]);
+      });
+      offset = job.next_offset;
+      updateExtractionProgress(job);
+
+      if (["completed", "failed", "cancelled"].includes(job.status)) {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+  }
+
+  // Mostra o progresso do job no overlay de carregamento
+  function updateExtractionProgress(job) {
+    const progressText = document.getElementById("extractionProgress");
+    if (!progressText) return;
+
+    if (!job) {
+      progressText.textContent = "Extraindo processos...";
+      return;
+    }
+
+    const progress = job.progress;
+    let text;
+    if (job.phase === "catalog") {
+      text = `Catalogando: ${progress.pages_catalogued} página(s), ${progress.processes_catalogued} processos`;
+    } else {
+      text = `Processos: ${progress.processes_done}/${progress.processes_total}`;
+    }
+    if (job.eta_seconds !== null && job.eta_seconds !== undefined) {
+      const minutes = Math.floor(job.eta_seconds / 60);
+      const seconds = Math.round(job.eta_seconds % 60);
+      text += ` | Restante: ${minutes}min ${seconds}s`;
+    }
+    progressText.textContent = text;
+  }
+
+  // Solicita o cancelamento da extração em andamento (botão "Parar Extração")
+  window.stopExtraction = async function () {
+    if (!currentJobId) return;
+    try {
+      const response = await fetch(`/api/jobs/${currentJobId}/cancel`, {
+        method: "POST",
+        credentials: "include",
+      });
+      const payload = await response.json();
+      if (payload.status === "success") {
+        showToast("Cancelamento solicitado, aguardando o processo atual", "warning");
+      } else {
+        showToast(payload.message || "Erro ao cancelar a extração", "error");
+      }
+    } catch (error) {
+      console.error("Erro ao cancelar extração:", error);
+      showToast("Erro ao cancelar extração: " + error.message, "error");
+    }
+  };
+
   // Event Listeners
   document
     .getElementById("extract")
@@ -941,150 +1123,160 @@ document.addEventListener("DOMContentLoaded", function () {
     console.log("Grid data disponível:", data.grid_data);
 
     data.data.forEach((processDetails, index) => {
-      const processId = processDetails.processo.id;
-
-      // Verifica se tem acordo e se é fraude
-      let suspeitaFraude = "Não";
-      let hasAcordo = false;
-
-      // Verifica acordos
-      if (processDetails.acordo?.length > 0) {
-        hasAcordo = true;
-        if (
-          processDetails.acordo.some(
-            (acordo) => acordo.suspeita_fraude === true || acordo.suspeita_fraude === "Sim"
-          )
-        ) {
-          suspeitaFraude = "Sim";
-        }
-      }
+      // Busca dados do grid_data se disponível
+      appendProcessRow(processDetails, data.grid_data?.[index]);
+    });
 
-      // Verifica lançamentos financeiros
-      if (!hasAcordo && processDetails.financeiro?.lancamentos?.length > 0) {
-        hasAcordo = processDetails.financeiro.lancamentos.some(
-          (reg) =>
-            reg &&
-            (reg.is_acordo === "Sim" ||
-              (reg.tipo && reg.tipo.toUpperCase().includes("ACORDO")))
-        );
+    console.log("Tabela atualizada com sucesso");
+  }
+
+  // Adiciona a linha de um processo (e a linha de detalhes) ao final da tabela
+  function appendProcessRow(processDetails, gridData) {
+    const tbody = document.querySelector("#processTable tbody");
+    if (!tbody) {
+      console.error("Elemento tbody não encontrado!");
+      return;
+    }
+
+    const processId = processDetails.processo.id;
+
+    // Verifica se tem acordo e se é fraude
+    let suspeitaFraude = "Não";
+    let hasAcordo = false;
+
+    // Verifica acordos
+    if (processDetails.acordo?.length > 0) {
+      hasAcordo = true;
+      if (
+        processDetails.acordo.some(
+          (acordo) => acordo.suspeita_fraude === true || acordo.suspeita_fraude === "Sim"
+        )
+      ) {
+        suspeitaFraude = "Sim";
       }
+    }
 
-      // Busca dados do grid_data se disponível
-      const gridData = data.grid_data?.[index];
-      console.log("Grid Data para processo:", processId, gridData);
-
-      console.log("Criando linha da tabela com dados:", {
-        id: processId,
-        numero: processDetails.processo.numero,
-        parteAdversa: processDetails.partes?.parte_adversa,
-        cpf: processDetails.partes?.cpf_cnpj_parte_adverso,
-        comarca: processDetails.processo.comarca,
-        estado: processDetails.processo.estado,
-        escritorio: processDetails.processo.escritorio,
-        status: processDetails.processo.status,
-        fase: processDetails.processo.fase,
-        hasAcordo,
-        suspeitaFraude,
-      });
+    // Verifica lançamentos financeiros
+    if (!hasAcordo && processDetails.financeiro?.lancamentos?.length > 0) {
+      hasAcordo = processDetails.financeiro.lancamentos.some(
+        (reg) =>
+          reg &&
+          (reg.is_acordo === "Sim" ||
+            (reg.tipo && reg.tipo.toUpperCase().includes("ACORDO")))
+      );
+    }
 
-      const tr = document.createElement("tr");
-      tr.innerHTML = `
-        <td>${processId}</td>
-        <td>${processDetails.processo.numero || "N/A"}</td>
-        <td>${processDetails.partes?.parte_adversa || "N/A"}</td>
-        <td>${processDetails.partes?.cpf_cnpj_parte_adverso || "N/A"}</td>
-        <td>${processDetails.processo.comarca || "N/A"}</td>
-        <td>${processDetails.processo.estado || "N/A"}</td>
-        <td>${processDetails.processo.escritorio || "N/A"}</td>
-        <td>${processDetails.processo.status || "N/A"}</td>
-        <td>${processDetails.processo.fase || "N/A"}</td>
-        <td>${hasAcordo ? "Sim" : "Não"}</td>
-        <td>${suspeitaFraude}</td>
-        <td>
-          <button class="btn btn-details" data-process-id="${processId}">
-            Detalhes
-          </button>
-        </td>
-      `;
+    console.log("Grid Data para processo:", processId, gridData);
+
+    console.log("Criando linha da tabela com dados:", {
+      id: processId,
+      numero: processDetails.processo.numero,
+      parteAdversa: processDetails.partes?.parte_adversa,
+      cpf: processDetails.partes?.cpf_cnpj_parte_adverso,
+      comarca: processDetails.processo.comarca,
+      estado: processDetails.processo.estado,
+      escritorio: processDetails.processo.escritorio,
+      status: processDetails.processo.status,
+      fase: processDetails.processo.fase,
+      hasAcordo,
+      suspeitaFraude,
+    });
 
-      tbody.appendChild(tr);
-
-      // Cria a linha para os detalhes (inicialmente oculta)
-      const detailsRow = document.createElement("tr");
-      detailsRow.className = "details-row d-none";
-      detailsRow.innerHTML = `
-        <td colspan="12">
-          <div class="accordion" id="accordion-${processId}">
-            <div class="accordion-item">
-              <div class="accordion-header">
-                <button class="accordion-button collapsed" type="button" data-bs-toggle="collapse" data-bs-target="#collapse-${processId}">
-                  Detalhes do Processo
-                </button>
-              </div>
-              <div id="collapse-${processId}" class="accordion-collapse collapse" data-bs-parent="#accordion-${processId}">
-                <div class="accordion-body">
-                  <div id="details-content-${processId}">Carregando...</div>
-                </div>
+    const tr = document.createElement("tr");
+    tr.innerHTML = `
+      <td>${processId}</td>
+      <td>${processDetails.processo.numero || "N/A"}</td>
+      <td>${processDetails.partes?.parte_adversa || "N/A"}</td>
+      <td>${processDetails.partes?.cpf_cnpj_parte_adverso || "N/A"}</td>
+      <td>${processDetails.processo.comarca || "N/A"}</td>
+      <td>${processDetails.processo.estado || "N/A"}</td>
+      <td>${processDetails.processo.escritorio || "N/A"}</td>
+      <td>${processDetails.processo.status || "N/A"}</td>
+      <td>${processDetails.processo.fase || "N/A"}</td>
+      <td>${hasAcordo ? "Sim" : "Não"}</td>
+      <td>${suspeitaFraude}</td>
+      <td>
+        <button class="btn btn-details" data-process-id="${processId}">
+          Detalhes
+        </button>
+      </td>
+    `;
+
+    tbody.appendChild(tr);
+
+    // Cria a linha para os detalhes (inicialmente oculta)
+    const detailsRow = document.createElement("tr");
+    detailsRow.className = "details-row d-none";
+    detailsRow.innerHTML = `
+      <td colspan="12">
+        <div class="accordion" id="accordion-${processId}">
+          <div class="accordion-item">
+            <div class="accordion-header">
+              <button class="accordion-button collapsed" type="button" data-bs-toggle="collapse" data-bs-target="#collapse-${processId}">
+                Detalhes do Processo
+              </button>
+            </div>
+            <div id="collapse-${processId}" class="accordion-collapse collapse" data-bs-parent="#accordion-${processId}">
+              <div class="accordion-body">
+                <div id="details-content-${processId}">Carregando...</div>
               </div>
             </div>
           </div>
-        </td>
-      `;
-      tbody.appendChild(detailsRow);
-
-      // Adiciona o evento de click no botão de detalhes
-      const detailsBtn = tr.querySelector(".btn-details");
-      detailsBtn.addEventListener("click", function () {
-        const currentDetailsRow = this.closest("tr").nextElementSibling;
-        const accordionButton = currentDetailsRow.querySelector(".accordion-button");
-        const accordionCollapse = currentDetailsRow.querySelector(".accordion-collapse");
-
-        // Fecha todos os outros detalhes abertos e reseta os botões
-        document.querySelectorAll(".details-row").forEach((row) => {
-          if (row !== currentDetailsRow) {
-            row.classList.add("d-none");
-            const accordion = row.querySelector(".accordion-collapse");
-            if (accordion) {
-              accordion.classList.remove("show");
-            }
-            const button = row.querySelector(".accordion-button");
-            if (button) {
-              button.classList.add("collapsed");
-            }
-            // Remove a classe active do botão
-            const prevBtn = row.previousElementSibling.querySelector(".btn-details");
-            if (prevBtn) {
-              prevBtn.classList.remove("active");
-            }
+        </div>
+      </td>
+    `;
+    tbody.appendChild(detailsRow);
+
+    // Adiciona o evento de click no botão de detalhes
+    const detailsBtn = tr.querySelector(".btn-details");
+    detailsBtn.addEventListener("click", function () {
+      const currentDetailsRow = this.closest("tr").nextElementSibling;
+      const accordionButton = currentDetailsRow.querySelector(".accordion-button");
+      const accordionCollapse = currentDetailsRow.querySelector(".accordion-collapse");
+
+      // Fecha todos os outros detalhes abertos e reseta os botões
+      document.querySelectorAll(".details-row").forEach((row) => {
+        if (row !== currentDetailsRow) {
+          row.classList.add("d-none");
+          const accordion = row.querySelector(".accordion-collapse");
+          if (accordion) {
+            accordion.classList.remove("show");
+          }
+          const button = row.querySelector(".accordion-button");
+          if (button) {
+            button.classList.add("collapsed");
+          }
+          // Remove a classe active do botão
+          const prevBtn = row.previousElementSibling.querySelector(".btn-details");
+          if (prevBtn) {
+            prevBtn.classList.remove("active");
           }
-        });
-
-        // Alterna a visibilidade da linha de detalhes atual
-        const isHidden = currentDetailsRow.classList.contains("d-none");
-        currentDetailsRow.classList.toggle("d-none");
-
-        // Alterna a classe active do botão
-        this.classList.toggle("active");
-
-        // Se estiver mostrando os detalhes
-        if (isHidden) {
-          // Remove a classe collapsed do botão e adiciona show ao collapse
-          accordionButton.classList.remove("collapsed");
-          accordionCollapse.classList.add("show");
-          renderFormattedDetails(
-            processId,
-            document.getElementById(`details-content-${processId}`),
-            gridData
-          );
-        } else {
-          // Adiciona a classe collapsed ao botão e remove show do collapse
-          accordionButton.classList.add("collapsed");
-          accordionCollapse.classList.remove("show");
         }
       });
-    });
 
-    console.log("Tabela atualizada com sucesso");
+      // Alterna a visibilidade da linha de detalhes atual
+      const isHidden = currentDetailsRow.classList.contains("d-none");
+      currentDetailsRow.classList.toggle("d-none");
+
+      // Alterna a classe active do botão
+      this.classList.toggle("active");
+
+      // Se estiver mostrando os detalhes
+      if (isHidden) {
+        // Remove a classe collapsed do botão e adiciona show ao collapse
+        accordionButton.classList.remove("collapsed");
+        accordionCollapse.classList.add("show");
+        renderFormattedDetails(
+          processId,
+          document.getElementById(`details-content-${processId}`),
+          gridData
+        );
+      } else {
+        // Adiciona a classe collapsed ao botão e remove show do collapse
+        accordionButton.classList.add("collapsed");
+        accordionCollapse.classList.remove("show");
+      }
+    });
   }
 
   // Função para renderizar detalhes formatados
@@ -0,0 +1,293 @@
+"""
+Paridade entre a busca por HTTP (HttpPageFetcher + page_parsers) e a leitura pelo navegador
+
+As páginas de tests/fixtures são servidas por um servidor HTTP local. O caminho HTTP busca
+cada página com HttpPageFetcher.fetch e a interpreta com os parsers; o caminho do navegador
+roda o código do Selenium (_capture_details_snapshot, _fetch_acordo_in_tab e
+GridScraper._read_page_rows) sobre um WebDriver local que expõe o mesmo HTML. Os dois
+precisam devolver os mesmos dicionários, e a página de login (ou um conteúdo montado por
+JavaScript) precisa fazer fetch retornar None para o chamador recorrer ao navegador.
+
+    python -m pytest tests
+"""
+import logging
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scraper.grid_scraper import GridScraper
+from scraper.http_fetcher import HttpPageFetcher
+from scraper.page_parsers import (
+    parse_acordo_details, parse_grid_rows, parse_label_values, parse_parties, parse_process_fields
+)
+from scraper.process_details_scraper import ProcessDetailsScraper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Caminho -> (status, fixture ou destino do redirecionamento)
+ROUTES = {
+    '/processo/details/1001': (200, 'process_details.html'),
+    '/acordo/details/5501': (200, 'acordo_details.html'),
+    '/processo': (200, 'grid_page.html'),
+    '/Account/Login': (200, 'login.html'),
+    '/processo/details/2002': (302, '/Account/Login?ReturnUrl=%2Fprocesso%2Fdetails%2F2002'),
+    '/processo/details/2003': (200, 'login.html'),
+    '/processo/details/3003': (200, 'process_details_js.html'),
+    '/acordo/details/5599': (500, None),
+}
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, target = ROUTES.get(self.path.split('?')[0], (404, None))
+        if status == 302:
+            self.send_response(302)
+            self.send_header('Location', target)
+            self.end_headers()
+            return
+        body = _fixture(target).encode('utf-8') if target else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FixtureElement:
+    """Elemento do WebDriver local, sobre uma tag do BeautifulSoup"""
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    @property
+    def text(self):
+        return ' '.join(self.tag.get_text(' ').split())
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def get_attribute(self, name):
+        if name == 'outerHTML':
+            return str(self.tag)
+        return self.tag.get(name)
+
+    def find_elements(self, by, value):
+        return [_FixtureElement(tag) for tag in _select(self.tag, by, value)]
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+
+
+def _select(root, by, value):
+    if by == By.CSS_SELECTOR:
+        return root.select(value)
+    if by == By.ID:
+        return root.select(f'#{value}')
+    if by == By.TAG_NAME:
+        return root.find_all(value)
+    raise NotImplementedError(by)
+
+
+class _FixtureSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def new_window(self, type_hint=None):
+        self.driver._windows.append(None)
+        self.driver._current = len(self.driver._windows) - 1
+
+    def window(self, handle):
+        self.driver._current = handle
+
+
+class _FixtureDriver:
+    """
+    WebDriver local: cada URL aberta mostra o HTML da fixture correspondente (o DOM que o
+    Chrome entregaria para essas páginas, que não dependem de JavaScript)
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._windows = [None]
+        self._current = 0
+        self.switch_to = _FixtureSwitchTo(self)
+
+    def get(self, url):
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        self._windows[self._current] = (url, _fixture(ROUTES[path][1]))
+
+    @property
+    def current_url(self):
+        return self._windows[self._current][0]
+
+    @property
+    def page_source(self):
+        return self._windows[self._current][1]
+
+    @property
+    def current_window_handle(self):
+        return self._current
+
+    def close(self):
+        self._windows[self._current] = None
+
+    def execute_script(self, script, *args):
+        return None
+
+    def find_elements(self, by, value):
+        soup = BeautifulSoup(self.page_source, 'html.parser')
+        return [_FixtureElement(tag) for tag in _select(soup, by, value)]
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+
+
+class HttpFetcherParityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _FixtureHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.fetcher = HttpPageFetcher(timeout=5)
+        self.driver = _FixtureDriver(self.base_url)
+
+    def tearDown(self):
+        self.fetcher.close()
+
+    def url(self, path):
+        return self.base_url + path
+
+    def test_process_fields_and_parties_match_browser_snapshot(self):
+        html = self.fetcher.fetch(self.url('/processo/details/1001'), required_id='box-dadosprincipais')
+        self.assertIsNotNone(html)
+        labels = parse_label_values(html)
+
+        self.driver.get(self.url('/processo/details/1001'))
+        snapshot = ProcessDetailsScraper(self.driver, backend='browser')._capture_details_snapshot(timeout=1)
+        self.assertIsNotNone(snapshot)
+        browser_labels = parse_label_values(snapshot)
+
+        self.assertEqual(parse_process_fields(labels), parse_process_fields(browser_labels))
+        self.assertEqual(parse_process_fields(labels), {
+            'status': 'Ativo',
+            'escritorio_celula': 'Escritório Central / Célula 3',
+            'data_cadastro': '15/03/2023',
+            'comarca': 'São Paulo',
+            'fase': 'Conhecimento',
+            'numero': '0001234-56.2023.8.26.0100',
+        })
+
+        self.assertEqual(parse_parties(html, labels=labels), parse_parties(snapshot, labels=browser_labels))
+        self.assertEqual(parse_parties(html, labels=labels), {
+            'parte_adversa': 'AUTOR - MARIA APARECIDA DA SILVA',
+            'cpf_cnpj_parte_adverso': '529.982.247-25',
+            'advogado_interno': 'Carlos Eduardo Pereira',
+            'advogados_adversos': [
+                {'nome': 'JOÃO BATISTA DE OLIVEIRA'},
+                {'nome': 'ANA PAULA SOUZA'},
+                {'nome': 'PEDRO HENRIQUE LIMA'},
+            ],
+        })
+
+    def test_acordo_details_match_browser_tab(self):
+        link = self.url('/acordo/details/5501')
+        html = self.fetcher.fetch(link)
+        self.assertIsNotNone(html)
+
+        self.driver.get(self.url('/processo/details/1001'))
+        browser_html = ProcessDetailsScraper(self.driver, backend='browser')._fetch_acordo_in_tab(link, timeout=1)
+        self.assertIsNotNone(browser_html)
+        # A aba do acordo é fechada e o navegador volta para a página do processo
+        self.assertEqual(self.driver.current_url, self.url('/processo/details/1001'))
+
+        self.assertEqual(parse_acordo_details(html), parse_acordo_details(browser_html))
+        self.assertEqual(parse_acordo_details(html), {
+            'numero': '0001234-56.2023.8.26.0100',
+            'status': 'Ativo',
+            'parte_adversa': 'MARIA APARECIDA DA SILVA',
+            'cpf_cnpj_parte_adverso': '529.982.247-25',
+            'escritorio_celula': 'Escritório Central / Célula 3',
+            'comarca': 'São Paulo',
+            'estado': 'SP',
+            'fase': 'Conhecimento',
+            'valor': 'R$ 5.500,00',
+            'data_pagamento': '28/04/2023',
+            'advogado_adverso': 'JOÃO BATISTA DE OLIVEIRA',
+            'nome_titular': 'Maria Aparecida da Silva',
+            'cpf_titular': '529.982.247-25',
+        })
+
+    def test_grid_rows_match_browser_table(self):
+        html = self.fetcher.fetch(self.url('/processo'))
+        self.assertIsNotNone(html)
+
+        self.driver.get(self.url('/processo'))
+        # Sem o __init__: a leitura do grid não usa o banco
+        grid_scraper = GridScraper.__new__(GridScraper)
+        grid_scraper.driver = self.driver
+        browser_rows = grid_scraper._read_page_rows(self.driver.find_element(By.CSS_SELECTOR, 'table.table'))
+
+        rows = parse_grid_rows(html, self.url('/processo'))
+        self.assertEqual(rows, browser_rows)
+        self.assertEqual([(process_id, url) for process_id, url, _ in rows], [
+            ('1001', self.url('/processo/details/1001')),
+            ('0009876-12.2022.8.19.0001', self.url('/processo/details/1002')),
+        ])
+        self.assertEqual(rows[0][2][1:4], ['0001234-56.2023.8.26.0100', 'MARIA APARECIDA DA SILVA', '529.982.247-25'])
+
+    def test_login_page_falls_back_to_browser(self):
+        # Sessão expirada: redirecionamento para o login
+        self.assertIsNone(self.fetcher.fetch(self.url('/processo/details/2002'), required_id='box-dadosprincipais'))
+        # Formulário de login devolvido na própria URL do processo
+        self.assertIsNone(self.fetcher.fetch(self.url('/processo/details/2003'), required_id='box-dadosprincipais'))
+
+    def test_javascript_content_and_errors_fall_back_to_browser(self):
+        self.assertIsNone(self.fetcher.fetch(self.url('/processo/details/3003'), required_id='box-dadosprincipais'))
+        self.assertIsNone(self.fetcher.fetch(self.url('/acordo/details/5599')))
+
+    def test_http_extraction_returns_none_on_login_page(self):
+        scraper = ProcessDetailsScraper(None, backend='browser')
+        scraper.http_fetcher = self.fetcher
+        scraper.DETAILS_URL = self.url('/processo/details/{process_id}')
+        self.assertIsNone(scraper._extract_process_details_http('2002', []))
+
+
+if __name__ == '__main__':
+    unittest.main()